@@ -1,3 +1,3 @@
-from .model import ModelConstructor, IlluminatorModel
+from .model import ModelConstructor, BatchedModelConstructor, IlluminatorModel, Message
 
-__all__ = ['ModelConstructor', 'IlluminatorModel']
+__all__ = ['ModelConstructor', 'BatchedModelConstructor', 'IlluminatorModel', 'Message']
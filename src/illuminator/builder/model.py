@@ -1,11 +1,36 @@
 from abc import ABC, abstractmethod
+import copy
 from typing import Dict, List, Optional
 from dataclasses import dataclass, field
 from enum import Enum
 from datetime import datetime
+from operator import itemgetter
+import numpy as np
 import illuminator.engine as engine
+import illuminator.profiling as profiling
 from mosaik_api_v3 import Simulator
 
+class Message(tuple):
+    """A message sent over a connection: an immutable `(origin, value)` pair, where
+    origin is 'output' (physical) or 'state' (data).
+
+    Messages are created by `set_outputs()` and `set_states()`. Being plain tuples they are
+    cheap to build and are sent to remote simulators as two-element lists.
+    """
+    __slots__ = ()
+    origin = property(itemgetter(0))
+    value = property(itemgetter(1))
+
+    def __repr__(self) -> str:
+        return f"Message(origin={self[0]!r}, value={self[1]!r})"
+
+
+def is_message(message) -> bool:
+    """Returns True if `message` has the (origin, value) layout of a Message, which also
+    holds for messages that were serialized to lists by remote simulators."""
+    return isinstance(message, (tuple, list)) and len(message) == 2 and message[0] in ('output', 'state')
+
+
 class SimulatorType(Enum):
     TIME_BASED = 'time-based'
     EVENT_BASED = 'event-based'
@@ -121,6 +146,11 @@ class IlluminatorModel():
 # Ideas:
 # - add model definition as a method of the ModelConstructor class. will it work?
 
+# attributes of a model that reset() leaves as they are: its definition, the values it
+# restores, and the connection to Mosaik, which Mosaik sets on in-process simulators
+_KEPT_ON_RESET = ('_definition', '_initial', 'mosaik')
+
+
 class ModelConstructor(ABC, Simulator):
     """A common interface for constructing models in the Illuminator"""
     parameters: Dict = {}
@@ -128,6 +158,8 @@ class ModelConstructor(ABC, Simulator):
     outputs: Dict = {}
     states: Dict = {}
     time_step_size: int = 1
+    debug: bool = False  # validate all input messages on every step
+    runtime_attributes: bool = False  # attributes are added during __init__, e.g. the columns of a CSV file
 
     # TODO: make this work
     # def multipleModelDecorator(self, function, **kwargs):
@@ -144,6 +176,7 @@ class ModelConstructor(ABC, Simulator):
         self.states = model_vals.get('states', self.states)
         self.time_step_size = model_vals.get('time_step_size', self.time_step_size)
         self.model_type = model_vals.get('type', 'Model')
+        self.debug = model_vals.get('debug', self.debug)
 
         model = IlluminatorModel(
                 parameters=self.parameters, # get the yaml values or the default from the model
@@ -159,6 +192,10 @@ class ModelConstructor(ABC, Simulator):
         self.time = 0  # time is an integer without a unit
         self.sid = None
         self.time_resolution = None
+        self._input_plan = {}  # (input, fan-in) -> message origin, see unpack_inputs()
+        self._definition = copy.deepcopy(model_vals)  # the definition the model is constructed with, see reset()
+        self._initial = None  # the attributes after construction, see reset()
+        profiling.instrument(self, model_vals.get('name') or self.model_type, self.model_type)
 
     @abstractmethod
     def step(self, time:int, inputs:dict=None, max_advance:int=None) -> int:
@@ -189,6 +226,10 @@ class ModelConstructor(ABC, Simulator):
         # TODO: from engine.py, time_resolution is never passed. hint: check engine self.start call
 
         print(f"running extra init")
+        if self._initial is None and type(self).reset is ModelConstructor.reset:
+            # the constructor of the model class has run, remember its values for reset()
+            self._initial = copy.deepcopy({key: value for key, value in vars(self).items()
+                                           if not callable(value) and key not in _KEPT_ON_RESET})
         # This is the standard Mosaik init method signature
         self.sid = sid
         self.time_resolution = time_resolution
@@ -203,7 +244,33 @@ class ModelConstructor(ABC, Simulator):
         # self.model_name, self.model_data = next(iter(sim_params.items()))
         # self.model = self.load_model_class(self.model_data['model_path'], self.model_data['model_type'])
         return self._model.simulator_meta
-    
+
+    def reset(self) -> None:
+        """
+        Restores the model to its definition in the configuration file, as it is
+        after construction, so that the same instance can run another simulation.
+        `init` and `create` are called again after the reset.
+
+        The attributes of the model after construction, i.e. its initial inputs,
+        outputs and states, its time and the values its constructor derives from
+        them, are remembered when the model is first initialized and restored
+        without constructing the model again. The definition of the next simulation
+        is read from the current model of the engine, like in the constructor. If it
+        differs from the definition the model was constructed with, e.g. in the
+        parameters of another scenario, the constructor runs again with it.
+
+        Models that hold external resources, e.g. open files, release them in
+        `finalize`, which is called at the end of every simulation, and override
+        this method to acquire them again.
+        """
+        if self._initial is None or engine.current_model != self._definition:
+            type(self).__init__(self)
+            return
+        for key in [key for key, value in vars(self).items() if not (callable(value) or key in _KEPT_ON_RESET)]:
+            del self.__dict__[key]  # including the attributes added while running
+        self.__dict__.update(copy.deepcopy(self._initial))
+        profiling.instrument(self, self._definition.get('name') or self.model_type, self.model_type)
+
     def create(self, num:int, model:str, **model_params) -> List[dict]: # This change is mandatory. It MUST contain num and model as parameters otherwise it receives an incorrect number of parameters
         """Creates an instance of the model"""
         new_entities = [] # See below why this was created
@@ -269,8 +336,8 @@ class ModelConstructor(ABC, Simulator):
             The current value of the requested state attribute
         """
         if attr in self._model.states:
-            if isinstance(self._model.states[attr], dict):  # in the case it was prepared for a connection previously
-                return self._model.states[attr]['value']
+            if isinstance(self._model.states[attr], Message):  # in the case it was prepared for a connection previously
+                return self._model.states[attr][1]
             
             # TODO instead of doing this, convert all initial values to the connection format somewhere early on
             else: # in the case it was set by an initital value
@@ -296,7 +363,7 @@ class ModelConstructor(ABC, Simulator):
         """
         for attr, value in states.items():
             if attr in self._model.states:
-                self._model.states[attr] ={'message_origin': 'state', 'value': value}
+                self._model.states[attr] = Message(('state', value))
             else:
                 raise RuntimeError(f"simulator {self.sid} does not have '{attr}' as state")
 
@@ -317,7 +384,7 @@ class ModelConstructor(ABC, Simulator):
         """
         for attr, value in outputs.items():
             if attr in self._model.outputs:
-                self._model.outputs[attr] = {'message_origin': 'output', 'value': value}
+                self._model.outputs[attr] = Message(('output', value))
             else:
                 raise RuntimeError(f"simulator {self.sid} does not have '{attr}' as output")
 
@@ -326,6 +393,11 @@ class ModelConstructor(ABC, Simulator):
         """
         Unpacks input values from connected simulators and processes them based on their message origin.
 
+        The messages of an input are validated the first time the input is received with a given
+        number of connections (fan-in). The result is kept in an input plan, so later steps only
+        unpack the values. Set `debug` (e.g. `debug: True` for the model in the configuration file)
+        to validate the messages on every step.
+
         Parameters
         ----------
         inputs : dict
@@ -338,42 +410,214 @@ class ModelConstructor(ABC, Simulator):
         data : dict
             Dictionary containing processed input values, summed for outputs or single values for states
         """
+        plan = self._input_plan
         data = {}
         for attrs in inputs.values():
             for attr, sources in attrs.items():
-                messages = list(sources.values())
-                if not all(isinstance(message, dict) and 'message_origin' in message for message in messages):
-                    raise RuntimeError(f"All messages sent over connections must have an attribute 'message_origin'. Connection: from: {sources}, to: {self.sid},  messages {messages}, input {attr}, make sure to use set_states or set_outputs() and set_states()")
-                
-                # check if all connections are with the same type, either output (physical) or state (data)
-                if not all(message['message_origin'] == messages[0]['message_origin'] for message in messages):
-                    raise RuntimeError(f"All values must have the same type: values: {messages}, input {attr}")
+                fan_in = len(sources)
+                origin = plan.get((attr, fan_in))
+                if origin is None or self.debug:
+                    origin = plan[attr, fan_in] = self._check_input_messages(attr, sources)
 
                 # if the attribute is coming from a connection with an output
-                if messages[0]['message_origin'] == 'output':
-                    data[attr] = sum(message['value'] for message in messages)
-                    if return_sources:
-                        data[attr] = {'value': data[attr]
-                                        , 'sources': [source for source in sources.keys()]
-                                        }
-                
+                if origin == 'output':
+                    value = sum(message[1] for message in sources.values())
                 # if the attribute is coming from a connection with a state
-                elif messages[0]['message_origin'] == 'state':
-                    if len(messages) > 1:
-                        data[attr] = [message['value'] for message in messages]
-                    else:
-                        data[attr] = messages[0]['value']
-
-                    if return_sources:
-                        data[attr] = {'value': data[attr]
-                                        , 'sources': [source for source in sources.keys()]
-                                        }
-
-                # if not coming from output nor from state
+                elif fan_in > 1:
+                    value = [message[1] for message in sources.values()]
+                else:
+                    value = next(iter(sources.values()))[1]
+
+                if return_sources:
+                    value = {'value': value, 'sources': list(sources.keys())}
+                data[attr] = value
+        return data
+
+    def _check_input_messages(self, attr, sources) -> str:
+        """
+        Validates the messages received for an input and returns their origin.
+
+        Parameters
+        ----------
+        attr : str
+            Name of the input
+        sources : dict
+            Messages received for the input, keyed by their source
+
+        Returns
+        -------
+        str
+            The origin of the messages, either 'output' (physical) or 'state' (data)
+        """
+        messages = list(sources.values())
+        if not all(is_message(message) for message in messages):
+            raise RuntimeError(f"All messages sent over connections must be (origin, value) pairs with origin 'output' or 'state'. Connection: from: {sources}, to: {self.sid},  messages {messages}, input {attr}, make sure to use set_outputs() and set_states()")
+
+        # check if all connections are with the same type, either output (physical) or state (data)
+        if not all(message[0] == messages[0][0] for message in messages):
+            raise RuntimeError(f"All values must have the same type: values: {messages}, input {attr}")
+        return messages[0][0]
+
+
+def to_array(value, num: int) -> np.ndarray:
+    """
+    Converts the value of a parameter, input, output or state to an array with one
+    element per entity. Lists must contain one value per entity, any other value is
+    used for all entities. Numerical values are stored as floats (None becomes NaN),
+    other values keep their type.
+    """
+    if isinstance(value, (list, tuple, np.ndarray)):
+        if len(value) != num:
+            raise ValueError(f"Expected {num} values, one per entity, got {len(value)}: {value}")
+        values = list(value)
+    else:
+        values = [value] * num
+
+    try:
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    except (TypeError, ValueError):
+        array = np.empty(num, dtype=object)
+        array[:] = values
+        return array
+
+
+class BatchedModelConstructor(ModelConstructor):
+    """A common interface for models that simulate many entities of the same type
+    in a single simulator.
+
+    The parameters, inputs, outputs and states of all entities are stored as NumPy
+    arrays with one element per entity, and all entities are stepped by a single
+    vectorized call to `step_batch`. The number of entities is set with `entities`
+    in the model section of the configuration file. Values in the configuration file
+    are either a single value shared by all entities or a list with one value per entity.
+
+    Entities can still be addressed one by one in connections and in the monitor as
+    `<model>[<index>].<attribute>`.
+    """
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.num_entities = 0
+        self.entity_index = {}  # eid -> position in the arrays
+        self.parameter_values = {}
+        self.input_values = {}
+        self.output_values = {}
+        self.state_values = {}
+
+    def create(self, num:int, model:str, **model_params) -> List[dict]:
+        """Creates `num` entities and the arrays that hold their values"""
+        if self.num_entities:
+            raise RuntimeError(f"Entities of {self.sid} can only be created once")
+
+        new_entities = super().create(num, model, **model_params)
+        self.entity_index = {entity['eid']: i for i, entity in enumerate(new_entities)}
+        self.num_entities = num
+
+        # parameters left out of the configuration file take the defaults of the model class
+        parameters = {**type(self).parameters, **self._model.parameters}
+        self.parameter_values = {attr: to_array(value, num) for attr, value in parameters.items()}
+        self.input_values = {attr: to_array(value, num) for attr, value in self._model.inputs.items()}
+        self.output_values = {attr: to_array(value, num) for attr, value in self._model.outputs.items()}
+        self.state_values = {attr: to_array(value, num) for attr, value in self._model.states.items()}
+        return new_entities
+
+    def step(self, time:int, inputs:dict=None, max_advance:int=None) -> int:
+        """Collects the inputs of all entities into arrays and steps all entities at once"""
+        for eid, attrs in (inputs or {}).items():
+            i = self.entity_index[eid]
+            for attr, value in self.unpack_inputs({eid: attrs}).items():
+                if attr not in self.input_values:
+                    raise RuntimeError(f"{self.sid}.{eid} does not have '{attr}' as input")
+                self.input_values[attr][i] = value
+
+        self.step_batch(time, self.input_values)
+        return time + self._model.time_step_size
+
+    @abstractmethod
+    def step_batch(self, time:int, inputs:Dict[str, np.ndarray]) -> None:
+        """Defines the computations of one simulation step for all entities.
+
+        Parameters
+        ----------
+        time: int
+            The current time of the simulation.
+        inputs: dict
+            The inputs of the model, as arrays with one value per entity.
+            Entities that received no new value keep their previous value.
+
+        Use `set_outputs` and `set_states` with arrays (or a single value for
+        all entities) to update the results.
+        """
+        pass
+
+    def get_data(self, outputs) -> Dict:
+        """
+        Gets data for the requested entities and attributes. Used by MOSAIK.
+
+        Parameters
+        ----------
+        outputs : dict
+            Dictionary mapping entity IDs to lists of requested output attributes
+
+        Returns
+        -------
+        data : dict
+            Dictionary containing the requested output values for each entity
+        """
+        data = {}
+        for eid, attrs in outputs.items():
+            i = self.entity_index[eid]
+            data[eid] = {}
+            for attr in attrs:
+                if attr in self.output_values:
+                    data[eid][attr] = Message(('output', self.output_values[attr].item(i)))
+                elif attr in self.state_values:
+                    data[eid][attr] = Message(('state', self.state_values[attr].item(i)))
+                elif attr in self.input_values:
+                    raise RuntimeError(f"'{attr}' is an input of {self.sid}.{eid}, connection reversed?")
                 else:
-                    raise RuntimeError(f"Connection coming from {messages[0]['message_origin']} not implemented yet")
+                    raise RuntimeError(f"{self.sid}.{eid} does not have '{attr}' as input, output or state")
         return data
 
+    def get_state(self, attr) -> np.ndarray:
+        """
+        Returns the values of a state attribute for all entities.
+        """
+        if attr in self.state_values:
+            return self.state_values[attr]
+        raise RuntimeError(f"simulator {self.sid} does not have '{attr}' as state")
+
+    def set_states(self, states):
+        """
+        Sets state values for all entities.
+
+        Parameters
+        ----------
+        states : dict
+            Dictionary containing state names and an array of values, or a single value for all entities
+        """
+        for attr, value in states.items():
+            if attr in self.state_values:
+                self.state_values[attr][:] = value
+            else:
+                raise RuntimeError(f"simulator {self.sid} does not have '{attr}' as state")
+
+    def set_outputs(self, outputs):
+        """
+        Sets output values for all entities.
+
+        Parameters
+        ----------
+        outputs : dict
+            Dictionary containing output names and an array of values, or a single value for all entities
+        """
+        for attr, value in outputs.items():
+            if attr in self.output_values:
+                self.output_values[attr][:] = value
+            else:
+                raise RuntimeError(f"simulator {self.sid} does not have '{attr}' as output")
+
+
 if __name__ == "__main__":
 
     pass
\ No newline at end of file
@@ -4,6 +4,7 @@ By: M. Rom & M. Garcia Alvarez
 """
 
 import typer
+from typing import List, Optional
 from typing_extensions import Annotated
 import illuminator.engine as engine
 from pathlib import Path
@@ -23,21 +24,45 @@ scenario_app = typer.Typer()
 app.add_typer(scenario_app, name="scenario", help="Run simulation scenarios.")
 cluster_app = typer.Typer()
 app.add_typer(cluster_app, name="cluster", help="Utilities for a RaspberryPi cluster.")
+data_app = typer.Typer()
+app.add_typer(data_app, name="data", help="Utilities for input data.")
 
 @scenario_app.command("run")
-def scenario_run(config_file: Annotated[str, typer.Argument(help="Path to scenario configuration file.")] = "config.yaml"):
+def scenario_run(config_file: Annotated[str, typer.Argument(help="Path to scenario configuration file.")] = "config.yaml",
+                 engine: Annotated[str, typer.Option(help="Simulation engine: 'mosaik' or 'direct'.")] = "mosaik",
+                 windows: Annotated[int, typer.Option(help="Split the simulation in this many time windows that run in parallel processes.")] = 1,
+                 workers: Annotated[Optional[int], typer.Option(help="Number of processes for the time windows. Defaults to the number of CPUs.")] = None,
+                 profile: Annotated[Optional[str], typer.Option(help="Time the calls of every model, print a summary and write it to this JSON file.")] = None,
+                 trace: Annotated[Optional[str], typer.Option(help="Write a timeline of the steps of the simulators to this JSON file, in the Chrome trace-event format.")] = None):
     "Runs a simulation scenario using a YAML file."
 
+    if windows > 1:
+        # the windows run in other processes, which neither time nor trace their models
+        for option, value in (('--profile', profile), ('--trace', trace)):
+            if value is not None:
+                raise typer.BadParameter("cannot be combined with --windows.", param_hint=option)
     simulation = Simulation(config_file)
-    simulation.run()
+    if windows > 1:
+        simulation.run_time_parallel(windows, workers=workers, engine=engine)
+    else:
+        simulation.run(engine=engine, profile=profile, trace=trace)
 
 
 @scenario_app.command("run_parallel")
-def scenario_run_parallel(config_file: Annotated[str, typer.Argument(help="Path to base scenario configuration file.")] = "config.yaml"):
+def scenario_run_parallel(config_file: Annotated[str, typer.Argument(help="Path to base scenario configuration file.")] = "config.yaml",
+                          schedule: Annotated[str, typer.Option(help="'static' splits the scenarios evenly over the MPI processes, 'dynamic' hands them out from rank 0 to idle processes.")] = "static",
+                          backend: Annotated[str, typer.Option(help="'mpi' runs the scenarios on the processes started by mpirun, 'processes' in a pool of local processes without MPI.")] = "mpi",
+                          workers: Annotated[Optional[int], typer.Option(help="Number of processes of the 'processes' backend. Defaults to the number of CPUs.")] = None,
+                          create_scenario_files: Annotated[bool, typer.Option(help="Write the scenario of each combination next to the configuration file.")] = False,
+                          result_store: Annotated[Optional[str], typer.Option(help="Directory of a Parquet dataset that gathers the results and parameters of all scenarios.")] = None,
+                          cache: Annotated[Optional[str], typer.Option(help="Directory with the results of completed scenarios. Scenarios found in it are not run again.")] = None,
+                          warm: Annotated[bool, typer.Option(help="Run the scenarios of each process on a warm world that reuses the models, instead of a new Mosaik world per scenario.")] = True):
     "Runs a simulation scenario using a YAML file with multi_parameters and multi_states."
     # We put the import here to avoid dependency on MPI system installation when using the other cli functions
     from illuminator.parallel_scenarios import run_parallel_file
-    run_parallel_file(config_file)
+    run_parallel_file(config_file, schedule=schedule, backend=backend, workers=workers,
+                      create_scenario_files=create_scenario_files, result_store=result_store, cache=cache,
+                      warm=warm)
     
 
 @cluster_app.command("build")
@@ -56,6 +81,29 @@ def cluster_build(config_file: Annotated[str, typer.Argument(help="Path to scena
         print(f"Commands have been written to {output_file}")
 
 
+@data_app.command("convert")
+def data_convert(paths: Annotated[List[str], typer.Argument(help="Time series files, or directories with .txt and .csv files, to convert.")],
+                 delimiter: Annotated[str, typer.Option(help="Column delimiter of the files.")] = ",",
+                 date_format: Annotated[str, typer.Option(help="Format of the timestamps in the files.")] = "YYYY-MM-DD HH:mm:ss"):
+    """Converts time series text files to the binary format read by the CSV model."""
+    from illuminator.models.time_series import convert_time_series
+
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files += sorted(p for p in path.iterdir() if p.suffix in ('.txt', '.csv'))
+        else:
+            files.append(path)
+
+    for file in files:
+        try:
+            output_file = convert_time_series(str(file), delimiter, date_format)
+        except (ValueError, StopIteration) as e:
+            print(f"Skipped {file}: {e or 'not a time series'}")
+        else:
+            print(f"Converted {file} to {output_file}")
+
+
 if __name__ == "__main__":
 
     # import importlib.util
@@ -0,0 +1,273 @@
+"""
+A direct-execution engine for Illuminator simulations. It runs the
+simulators of a scenario in-process, in a single loop, without the
+scheduling and data routing of Mosaik.
+"""
+
+import importlib
+import warnings
+from dataclasses import dataclass
+from mosaik_api_v3 import check_api_compliance
+
+
+class UnsupportedSimulatorError(ValueError):
+    """Raised for a simulator that the direct engine can not run."""
+
+
+@dataclass(frozen=True)
+class DirectEntity:
+    """An entity created by a simulator of a DirectWorld."""
+    sid: str
+    eid: str
+    type: str
+
+    @property
+    def full_id(self) -> str:
+        return f'{self.sid}.{self.eid}'
+
+
+class DirectModel:
+    """Creates entities of a model, mirroring Mosaik's model factories:
+    `factory.Model.create(num, **params)` returns a list of entities and
+    `factory.Model(**params)` a single entity."""
+
+    def __init__(self, sim: 'DirectSimulator', model: str) -> None:
+        self._sim = sim
+        self._model = model
+
+    def create(self, num: int, **model_params) -> list[DirectEntity]:
+        entities = self._sim.instance.create(num, self._model, **model_params)
+        return [DirectEntity(self._sim.sid, entity['eid'], entity['type']) for entity in entities]
+
+    def __call__(self, **model_params) -> DirectEntity:
+        return self.create(1, **model_params)[0]
+
+
+class DirectSimulator:
+    """A simulator started in a DirectWorld, with the connection data needed to step it."""
+
+    def __init__(self, sid: str, instance, meta: dict, name: str = None) -> None:
+        self.sid = sid
+        self.name = name  # name of the simulator in the simulation configuration
+        self.instance = instance
+        self.meta = meta
+        version = [int(v) for v in meta.get('api_version', '1').split('.')]
+        self.supports_setup_done = version >= [2, 2]
+        self.supports_max_advance = version >= [3]
+        self.type = meta.get('type', 'time-based')
+        self.next_step = 0
+        # (source simulator, delay) -> [(source eid, source attr, destination eid, destination attr)]
+        self.inputs = {}
+        self.output_request = {}  # eid -> requested attributes, passed to get_data()
+        self.outputs = []  # [(time, data)] of the last steps, oldest first
+        self.max_delay = 0  # largest delay of the connections that read the outputs
+
+    def __getattr__(self, model: str) -> DirectModel:
+        if model.startswith('_') or model not in self.__dict__.get('meta', {}).get('models', {}):
+            raise AttributeError(f"Simulator {self.sid} has no model '{model}'")
+        return DirectModel(self, model)
+
+    def get_output_for(self, time: int) -> dict:
+        """Returns the outputs of the last step at or before `time`."""
+        for data_time, data in reversed(self.outputs):
+            if data_time <= time:
+                return data
+        return {}
+
+    def prune_outputs(self, time: int) -> None:
+        """Forgets outputs that are no longer needed for steps from `time` onwards."""
+        while len(self.outputs) > 1 and self.outputs[1][0] <= time - self.max_delay:
+            self.outputs.pop(0)
+
+
+class DirectWorld:
+    """A replacement for `mosaik.World` that steps time-based simulators directly.
+
+    The simulators are instantiated in-process and stepped in the topological order of
+    their (not time-shifted) connections, once for every step they request. Inputs are
+    gathered in the same way as Mosaik does for persistent attributes, so the results
+    are identical to a run with Mosaik. Only simulators that are started from Python
+    classes (`{'python': 'module:Class'}`) are supported, and only the monitor may be
+    a hybrid simulator.
+
+    After a run, `reset` prepares the world for another run, e.g. of another scenario.
+    The instances of simulators that implement `reset()` (see
+    `ModelConstructor.reset`) are kept, and reused by the next simulators started
+    with the same name and class.
+
+    Attributes
+    ----------
+    reused : int
+        Number of simulators started since the last reset that reused the instance of
+        a previous run.
+    """
+
+    def __init__(self, sim_config: dict, time_resolution: int = 1) -> None:
+        self.sim_config = sim_config
+        self.time_resolution = time_resolution
+        self.sims = {}
+        self._sim_ids = {}
+        self._idle = {}  # (simulator name, class) -> instances of the previous run to reuse
+        self._finalized = False
+        self.reused = 0
+
+    def start(self, sim_name: str, **sim_params) -> DirectSimulator:
+        """Instantiates and initializes a simulator of the simulation configuration."""
+        try:
+            import_string = self.sim_config[sim_name]['python']
+        except KeyError:
+            raise UnsupportedSimulatorError(f"Simulator '{sim_name}' must be a python simulator to run it "
+                                            "with engine='direct'")
+        idle = self._idle.get((sim_name, import_string))
+        if idle:
+            instance = idle.pop()
+            instance.reset()
+            self.reused += 1
+        else:
+            module_name, class_name = import_string.split(':')
+            instance = getattr(importlib.import_module(module_name), class_name)()
+
+        sim_id = self._sim_ids.get(sim_name, 0)
+        self._sim_ids[sim_name] = sim_id + 1
+        sid = f'{sim_name}-{sim_id}'
+
+        sim_params = {'time_resolution': self.time_resolution, **sim_params}
+        if not check_api_compliance(instance):
+            del sim_params['time_resolution']
+        meta = instance.init(sid, **sim_params)
+
+        sim = self.sims[sid] = DirectSimulator(sid, instance, meta, name=sim_name)
+        return sim
+
+    def connect(self, src: DirectEntity, dest: DirectEntity, *attr_pairs, time_shifted=False,
+                initial_data: dict = None) -> None:
+        """Connects the attributes of two entities, see `mosaik.World.connect`."""
+        src_sim, dest_sim = self.sims[src.sid], self.sims[dest.sid]
+        delay = int(time_shifted)
+        for attr_pair in attr_pairs:
+            src_attr, dest_attr = (attr_pair, attr_pair) if isinstance(attr_pair, str) else attr_pair
+            if time_shifted and src_attr not in (initial_data or {}):
+                raise ValueError(f"Time-shifted connection from {src.full_id}.{src_attr} to "
+                                 f"{dest.full_id}.{dest_attr} requires initial data")
+
+            src_sim.output_request.setdefault(src.eid, []).append(src_attr)
+            dest_sim.inputs.setdefault((src_sim, delay), []).append((src.eid, src_attr, dest.eid, dest_attr))
+            src_sim.max_delay = max(src_sim.max_delay, delay)
+            if time_shifted:
+                # the initial data is the output of a step before the start of the simulation
+                if not src_sim.outputs:
+                    src_sim.outputs.append((-delay, {}))
+                src_sim.outputs[0][1].setdefault(src.eid, {})[src_attr] = initial_data[src_attr]
+
+    def step_order(self) -> list[DirectSimulator]:
+        """Returns the simulators in the topological order of their connections without delay,
+        keeping the order in which they were started where possible."""
+        predecessors = {sim: {src for src, delay in sim.inputs if delay == 0} for sim in self.sims.values()}
+        order = []
+        while predecessors:
+            ready = [sim for sim, preds in predecessors.items() if preds.issubset(order)]
+            if not ready:
+                raise ValueError(f"Connections without time shift form a cycle between: "
+                                 f"{', '.join(sim.sid for sim in predecessors)}. Set 'time_shifted' in one of them.")
+            order.append(ready[0])
+            del predecessors[ready[0]]
+        return order
+
+    def _validate(self) -> None:
+        """Checks that the simulators can be stepped directly."""
+        for sim in self.sims.values():
+            if sim.type == 'time-based':
+                continue
+            if sim.type == 'hybrid' and not sim.output_request and \
+                    not any(model.get('trigger') for model in sim.meta.get('models', {}).values()):
+                continue  # a hybrid simulator without outputs nor triggers is stepped like a time-based one
+            raise UnsupportedSimulatorError(f"Simulator {sim.sid} is {sim.type}, engine='direct' only supports "
+                                            "time-based models")
+
+    def get_input_data(self, sim: DirectSimulator, time: int) -> dict:
+        """Returns the inputs of `sim` for a step at `time`, in the format used by Mosaik."""
+        input_data = {}
+        for (src_sim, delay), connections in sim.inputs.items():
+            outputs = src_sim.get_output_for(time - delay)
+            src_sid = src_sim.sid
+            for src_eid, src_attr, dest_eid, dest_attr in connections:
+                try:
+                    value = outputs[src_eid][src_attr]
+                except KeyError:
+                    warnings.warn(f"Simulator {src_sid}'s entity {src_eid} did not produce output on "
+                                  f"{src_attr}, which is required by simulator {sim.sid}. Supplying None.")
+                    value = None
+                input_data.setdefault(dest_eid, {}).setdefault(dest_attr, {})[f'{src_sid}.{src_eid}'] = value
+        return input_data
+
+    def step(self, sim: DirectSimulator, time: int, until: int) -> None:
+        """Steps a simulator and stores the outputs requested by its connections."""
+        inputs = self.get_input_data(sim, time)
+        if sim.supports_max_advance:
+            next_step = sim.instance.step(time, inputs, until)
+        else:
+            next_step = sim.instance.step(time, inputs)
+
+        if not isinstance(next_step, int) or next_step <= time:
+            raise RuntimeError(f"Simulator {sim.sid} must return a next step later than {time}, got {next_step}")
+        sim.next_step = next_step
+
+        if sim.output_request:
+            data = sim.instance.get_data(sim.output_request)
+            output_time = data.pop('time', time)
+            sim.outputs.append((output_time, data))
+
+    def run(self, until: int) -> None:
+        """Runs the simulation until (excluding) the time step `until` and finalizes all simulators."""
+        self._validate()
+        order = self.step_order()
+        for sim in order:
+            if sim.supports_setup_done:
+                sim.instance.setup_done()
+
+        try:
+            time = 0
+            while time < until:
+                for sim in order:
+                    if sim.next_step == time:
+                        self.step(sim, time, until)
+                time = min(sim.next_step for sim in order)
+                for sim in order:
+                    sim.prune_outputs(time)
+        finally:
+            self.finalize()
+
+    def finalize(self) -> None:
+        """Finalizes the simulators started since the last reset, unless a run already did."""
+        if not self._finalized:
+            for sim in self.sims.values():
+                sim.instance.finalize()
+            self._finalized = True
+
+    def reset(self, sim_config: dict = None, time_resolution: int = None) -> None:
+        """
+        Removes the simulators and connections of the last run, so that the world can be
+        set up and run again. The instances of the simulators that implement `reset()`
+        are kept for the next run, if the run finalized them.
+
+        Parameters
+        ----------
+        sim_config : dict, optional
+            The simulator configuration of the next run, the current one by default.
+        time_resolution : int, optional
+            The time resolution of the next run, the current one by default.
+        """
+        self._idle = {}
+        if self._finalized:
+            for sim in self.sims.values():
+                if callable(getattr(sim.instance, 'reset', None)):
+                    import_string = self.sim_config[sim.name]['python']
+                    self._idle.setdefault((sim.name, import_string), []).append(sim.instance)
+        if sim_config is not None:
+            self.sim_config = sim_config
+        if time_resolution is not None:
+            self.time_resolution = time_resolution
+        self.sims = {}
+        self._sim_ids = {}
+        self._finalized = False
+        self.reused = 0
@@ -10,6 +10,8 @@ from mosaik.scenario import Entity as MosaikEntity
 from mosaik.scenario import World as MosaikWorld
 from datetime import datetime
 from illuminator.schema.simulation import load_config_file
+import illuminator.profiling as profiling
+import illuminator.tracing as tracing
 import os
 
 current_model = {}
@@ -92,7 +94,8 @@ def generate_mosaik_configuration(config_simulation:dict,  collector:str =None)
         valid Illuminator's simulation configuration
     collector: str
         command and path to a custom collector. If None
-        the default collector is used. 
+        the default collector is used. The default collector runs in-process
+        when 'in_process' is set in the monitor section of the configuration.
         Example: '%(python)s Illuminator_Engine/collector.py %(addr)s'
     
     Returns
@@ -115,24 +118,23 @@ def generate_mosaik_configuration(config_simulation:dict,  collector:str =None)
 
     mosaik_configuration = {}
 
-    default_collector = get_collector_path()
-    # print(default_collector)
+    if collector is not None:
+        collector_config = {'cmd': collector}
+    elif config_simulation['monitor'].get('in_process', False):
+        # the collector runs in the same process as mosaik
+        collector_config = {'python': 'illuminator.models.collector:ColumnarCollector'}
+    else:
+        default_collector = get_collector_path()
 
-    if collector is None:
         if os.name == 'nt':
             # Windows
             _collector = '"%(python)s" "' + default_collector.replace('\\', '/') + '" %(addr)s'
         else:
             # Linux (GitHub Actions) / macOS
             _collector = '%(python)s ' + default_collector.replace('\\', '/') + ' %(addr)s'
-    else:
-        _collector = collector
+        collector_config = {'cmd': _collector}
 
-    mosaik_configuration.update({'Collector':
-                                 {
-                                     'cmd': _collector
-                                 }
-                                 })
+    mosaik_configuration.update({'Collector': collector_config})
 
     
     for model in config_simulation['models']:
@@ -145,6 +147,19 @@ def generate_mosaik_configuration(config_simulation:dict,  collector:str =None)
     return mosaik_configuration
 
 
+def generate_engine_configuration(config_simulation: dict, engine: str = 'mosaik') -> dict:
+    """
+    Returns the simulator configuration of a world of the given engine, see
+    `generate_mosaik_configuration`. With engine='direct', the default collector
+    runs in-process instead of as a separate process.
+    """
+    sim_config = generate_mosaik_configuration(config_simulation)
+    if engine == 'direct' and 'cmd' in sim_config['Collector']:
+        # the default collector is not started as a separate process
+        sim_config['Collector'] = {'python': 'illuminator.models.collector:Collector'}
+    return sim_config
+
+
 def start_simulators(world: MosaikWorld, models: list) -> dict:
         """
         Instantiates simulators in the Mosaik world based on the model configurations .
@@ -223,7 +238,8 @@ def start_simulators(world: MosaikWorld, models: list) -> dict:
         #                                     cap=500,
         #                                     output_type='power'
         #                                     )
-                entity = model_factory.create(num=1, **model_parameters) 
+                # batched models create several entities in a single simulator
+                entity = model_factory.create(num=model.get('entities', 1), **model_parameters) 
 
             model_entities[model_name] = entity
             print(model_entities)
@@ -231,11 +247,159 @@ def start_simulators(world: MosaikWorld, models: list) -> dict:
         return model_entities
 
 
+def split_item(item: str) -> tuple:
+    """
+    Splits a connection or monitor item into its model name, entity index and
+    attribute. Items are declared as `<model>.<attr>`, or as `<model>[<index>].<attr>`
+    to address a single entity of a batched model.
+
+    Parameters
+    ----------
+    item: str
+        The item to split, e.g. 'Houses[3].load_dem'
+
+    Returns
+    -------
+    tuple
+        (model name, entity index or None, attribute name)
+    """
+
+    model, attr = item.split('.')
+    index = None
+    if model.endswith(']'):
+        model, index = model[:-1].split('[')
+        index = int(index)
+    return model, index, attr
+
+
+def select_entities(model_entities: dict[MosaikEntity], model: str, index: int=None) -> list:
+    """
+    Returns all entities of a model, or only the entity at `index`.
+    """
+
+    entities = model_entities[model]
+    if index is None:
+        return entities
+    if index >= len(entities):
+        raise ValueError(f"Model '{model}' has {len(entities)} entities, entity {index} does not exist.")
+    return [entities[index]]
+
+
+def pair_entities(from_entities: list, to_entities: list) -> list:
+    """
+    Pairs the source and destination entities of a connection. Lists of the
+    same length are connected element-wise, a single entity is connected to
+    every entity on the other side.
+
+    Parameters
+    ----------
+    from_entities: list
+        Entities at the origin of the connection.
+    to_entities: list
+        Entities at the destination of the connection.
+
+    Returns
+    -------
+    list
+        A list of (from_entity, to_entity) tuples.
+    """
+
+    if len(from_entities) == len(to_entities):
+        return list(zip(from_entities, to_entities))
+    if len(from_entities) == 1:
+        return [(from_entities[0], to_entity) for to_entity in to_entities]
+    if len(to_entities) == 1:
+        return [(from_entity, to_entities[0]) for from_entity in from_entities]
+    raise ValueError(f"Cannot connect {len(from_entities)} entities to {len(to_entities)} entities. "
+                     "Use the same number of entities, a single entity or select entities with <model>[<index>].<item>")
+
+
+def expand_monitor_items(items: list, models: list[dict]) -> list:
+    """
+    Replaces monitor items of batched models by one item per entity, e.g.
+    'Houses.load_dem' becomes 'Houses[0].load_dem', 'Houses[1].load_dem', ...
+
+    Parameters
+    ----------
+    items: list
+        The items in the monitor section of the configuration file.
+    models: list
+        The models in the configuration file.
+
+    Returns
+    -------
+    list
+        The monitor items with one item per monitored entity.
+    """
+
+    entities = {model['name']: model.get('entities', 1) for model in models}
+    expanded = []
+    for item in items:
+        model, index, attr = split_item(item)
+        if index is None and entities.get(model, 1) > 1:
+            expanded.extend(f"{model}[{i}].{attr}" for i in range(entities[model]))
+        else:
+            expanded.append(item)
+    return expanded
+
+
+def plan_connections(connections: list[dict], models: list[dict]) -> list:
+    """
+    Validates the connections of a configuration in a single pass, with the models
+    indexed by name (see `illuminator.scenario_graph.ScenarioGraph`), and resolves
+    them for `build_connections`.
+
+    Parameters
+    ----------
+    connections: list
+        The connections in the configuration file.
+    models: list
+        The models in the configuration file.
+
+    Returns
+    -------
+    list
+        One (from model, from index, from attribute, to model, to index, to attribute,
+        initial data) tuple per connection. The initial data of the attribute is None
+        unless the connection is time shifted.
+
+    Raises
+    ------
+    ValueError
+        Listing every invalid connection: connections of unknown models, entities or
+        attributes, physical splits, and time-shifted connections without an initial value.
+    """
+    from illuminator.builder.model import Message  # local import, the builder imports this module
+    from illuminator.scenario_graph import ScenarioGraph
+
+    graph = ScenarioGraph(models)
+    errors = graph.errors + graph.connection_errors(connections)
+    if errors:
+        raise ValueError("Check the 'connections' in the configuration file for errors:\n - " + "\n - ".join(errors))
+
+    plan = []
+    for connection in connections:
+        from_model, from_index, from_attr = split_item(connection['from'])
+        to_model, to_index, to_attr = split_item(connection['to'])
+        initial_message = None
+        # IMPORTANT: The attribute might not exist in the config, e.g. CSV reader states/outputs are set during their __init__()
+        # if the model is time_shifted, we DO require the attribute to be in the config as we need to access its initial value.
+        # Checking for douplicate attributes is done in the __post_init__()
+        if connection['time_shifted']:
+            message_type = 'output' if from_attr in graph.models[from_model].get('outputs', {}) else 'state'
+            # the initial value of the connection equals the initial value of the input
+            initial_message = Message((message_type, graph.models[to_model]['inputs'][to_attr]))
+        plan.append((from_model, from_index, from_attr, to_model, to_index, to_attr, initial_message))
+    return plan
+
+
 def build_connections(world:MosaikWorld, model_entities: dict[MosaikEntity], connections: list[dict], 
-                      models: list[dict]) -> MosaikWorld: # TODO: limit model_config to only models
+                      models: list[dict]) -> MosaikWorld:
     """
     Connects the model entities in the Mosaik world based on the connections specified in the 
-    YAML configuration file.
+    YAML configuration file. All connections are validated before the first is made
+    (see `plan_connections`), and the attributes connected between the same two
+    entities are handed to the world in a single call.
     
     Parameters
     ----------
@@ -254,72 +418,28 @@ def build_connections(world:MosaikWorld, model_entities: dict[MosaikEntity], con
         The Mosaik world object with the connections established.
     
     """
-    from_list = []  # for checking physical splits
-    for connection in connections:
-        from_model, from_attr =  connection['from'].split('.')
-        to_model, to_attr =  connection['to'].split('.')
 
-        # check if the model names are unique (assumption 1 model per Simulator is valid)
-        if len([m for m in models if m['name'] == from_model]) > 1:
-            raise ValueError(f"Multiple models found with name '{from_model}'.")
-
-        # retrieve the first model from the models list whose name matches from_model (assumes 1 model per Simulator).
-        try:
-            from_model_config = next(m for m in models if m['name'] == from_model)
-        except StopIteration:
-            raise ValueError(f"Model with name '{from_model}' not found in models list.")
-        try:
-            to_model_config = next(m for m in models if m['name'] == to_model)
-        except StopIteration:
-            raise ValueError(f"Model with name '{to_model}' not found in models list.")
-        time_shifted = connection['time_shifted']
-            
-        # check if the connection is a physical split
-        if connection['from'] in from_list:
-            if from_attr in from_model_config.get('outputs', {}):
-                raise ValueError(f"Split detected in physical connection for {connection['from']}.")
-            elif from_attr in from_model_config.get('states', {}):
-                pass  # it is okay if a non-physical connection (state) goes to multiple destinations
+    bulk = {}  # (from entity id, to entity id) -> (from entity, to entity, attribute pairs)
+    for from_model, from_index, from_attr, to_model, to_index, to_attr, initial_message in plan_connections(connections, models):
+        # entities for the same model type are handled separately, unless the model is batched.
+        # Therefore, the entities list of a model usually contains a single entity
+        entity_pairs = pair_entities(select_entities(model_entities, from_model, from_index),
+                                     select_entities(model_entities, to_model, to_index))
+        for from_entity, to_entity in entity_pairs:
+            if initial_message is not None:
+                # time-shifted connections are made one by one, each has its own initial data
+                world.connect(from_entity, 
+                              to_entity, 
+                              (from_attr, to_attr),
+                              time_shifted=True,
+                              initial_data={from_attr: initial_message})
             else:
-                raise ValueError(f"Split detected for connection {connection['from']}. "\
-                                "I can't check if this is a non-physical connection (states). "\
-                                "If so, add the attribute to the states of the model configuration. (e.g., in the .yaml file)")
-        from_list.append(connection['from'])
+                key = (from_entity.full_id, to_entity.full_id)
+                bulk.setdefault(key, (from_entity, to_entity, []))[2].append((from_attr, to_attr))
 
-        # Establish connections in the Mosaik world
-        try:
-            # IMPORTANT: The attribute might not exist in the config, e.g. CSV reader states/outputs are set during their __init__()
-            # for this reason, we cannot check if the attribute exists in the config here. This is anyways handled by Mosaik
-            # if the model is time_shifted, we DO require the attribute to be in the config as we need to access its initial value.
-            # Checking for douplicate attributes is done in the __post_init__()
-
-            if time_shifted:
-                if from_attr in from_model_config.get('outputs', {}):
-                    message_type = 'output'
-                elif from_attr in from_model_config.get('states', {}):
-                    message_type = 'state'
-                else:
-                    raise ValueError(f"Attribute {from_attr} not found in outputs or states of model {from_model}")
-
-                initial_message = {'message_origin': message_type,
-                                   'value': to_model_config['inputs'][to_attr]}
-
-                world.connect(model_entities[from_model][0], 
-                            model_entities[to_model][0], 
-                            (from_attr, to_attr),
-                            time_shifted=True,
-                            initial_data={from_attr: initial_message})
-                            # set the initial value for the connection to equal the initial value of the model
-            else:
-                world.connect(model_entities[from_model][0], # entities for the same model type
-                        # are handled separately. Therefore, the entities list of a model only contains a single entity
-                        model_entities[to_model][0], 
-                        (from_attr, to_attr))
-        except KeyError as e:
-            print(f"\nError: {e}. Check the 'connections' in the configuration file for errors.")
-            exit(1)
+    for from_entity, to_entity, attr_pairs in bulk.values():
+        world.connect(from_entity, to_entity, *attr_pairs)
 
-    # TODO: write a unit test for this. Cases: 1) all connections were established, 2) exception raised
     return world
 
 
@@ -353,6 +473,7 @@ def compute_mosaik_end_time(start_time:str, end_time:str, time_resolution:int =
 
 def set_current_model(model):
     global current_model
+    current_model['name'] = model.get('name')
     try:
         current_model["type"] = model['type']
     except KeyError as e:
@@ -394,12 +515,16 @@ def set_current_model(model):
         print(f"Warning: Missing 'time_step_size' key in model. {e}")
     except Exception as e:
         print(f"Warning: An error occurred while assigning 'time_step_size'. {e}")
+
+    # validation of input messages on every step is opt-in
+    current_model['debug'] = model.get('debug', False)
     
 
 def connect_monitor(world: MosaikWorld,  model_entities: dict[MosaikEntity], 
                     monitor:MosaikEntity, monitor_config: dict) -> MosaikWorld:
     """
-    Connects model entities to the monitor in the Mosaik world.
+    Connects model entities to the monitor in the Mosaik world, with a single
+    connection per monitored entity.
 
     Parameters
     ----------
@@ -418,30 +543,108 @@ def connect_monitor(world: MosaikWorld,  model_entities: dict[MosaikEntity],
         The Mosaik world object with model entities connected to the monitor.
     """
 
+    bulk = {}  # entity id -> (entity, monitored attributes)
     for item in monitor_config['items']:
-            from_model, from_attr =  item.split('.')
-
-            to_attr = from_attr # enforce connecting attributes have the same name  # TODO, what if its not?
-            try:
-                model_entity = model_entities[from_model][0]
-            except KeyError as e:
-                print(f"Error: {e}. Check the 'monitor' section in the configuration file for errors.")
-                exit(1)
+        from_model, from_index, from_attr =  split_item(item)
+        try:
+            model_entity = model_entities[from_model][from_index or 0]
+        except (KeyError, IndexError) as e:
+            print(f"Error: {e}. Check the 'monitor' section in the configuration file for errors.")
+            exit(1)
+        # enforce connecting attributes have the same name
+        bulk.setdefault(model_entity.full_id, (model_entity, []))[1].append(from_attr)
 
-            # Establish connections in the Mosaik world
-            try:
-                world.connect(model_entity, 
-                              monitor, 
-                              (from_attr, to_attr)
-                            )
-            except Exception as e:
-                print(f"Error: {e}. Connection could not be established for {from_model} and the monitor.")
-                exit(1)
-        
-        # TODO: write a unit test for this. Cases: 1) all connections were established, 2) exception raised
+    # Establish connections in the Mosaik world
+    for model_entity, attrs in bulk.values():
+        try:
+            world.connect(model_entity, monitor, *attrs)
+        except Exception as e:
+            print(f"Error: {e}. Connection could not be established for {model_entity.full_id} and the monitor.")
+            exit(1)
     return world
 
 
+def setup_world(world: MosaikWorld, config: dict) -> int:
+    """
+    Starts the collector and the simulators of a scenario in a world, and connects
+    the models and the monitor.
+
+    Parameters
+    ----------
+    world: mosaik.World
+        The world, a Mosaik world or a `DirectWorld`, created with the simulator
+        configuration of the scenario and its start time.
+    config: dict
+        valid Illuminator's simulation configuration
+
+    Returns
+    -------
+    int
+        The number of time steps to run the world for, see `compute_mosaik_end_time`.
+    """
+
+    from illuminator.scenario_graph import validate_scenario  # local import, it imports this module
+
+    # fail before any simulator is started if the scenario is inconsistent
+    validate_scenario(config)
+
+    # simulation time
+    _start_time = config['scenario']['start_time']
+    _end_time = config['scenario']['end_time']
+    _time_resolution = config['scenario']['time_resolution']
+    # output file with forecast results
+    _results_file = config['monitor']['file']
+    # optional settings of the collector, its defaults are used when not given
+    _collector_params = {key: config['monitor'][key] for key in ('flush_every',) if key in config['monitor']}
+    if 'format' in config['monitor']:
+        _collector_params['output_format'] = config['monitor']['format']
+
+    # TODO: collectors are also customisable simulators, define in the same way as models.
+    # A way to define custom collectors should be provided by the Illuminator.
+    # batched models are monitored per entity
+    _monitor_items = expand_monitor_items(config['monitor']['items'], config['models'])
+    collector = world.start('Collector', 
+                            time_resolution=_time_resolution, 
+                            start_date=_start_time,
+                            items = _monitor_items,  
+                            results_show={'write2csv':True, 'dashboard_show':False, 
+                                        'Finalresults_show':False,'database':False, 'mqtt':False}, 
+                            output_file=_results_file,
+                            **_collector_params)
+    
+    # initialize monitor
+    monitor = collector.Monitor()
+
+    # Dictionary to keep track of created model entities
+    model_entities = start_simulators(world, config['models'])
+
+    # Connect the models based on the connections specified in the configuration
+    world = build_connections(world, model_entities, connections=config['connections'], models=config['models'])
+
+    # Connect monitor
+    world = connect_monitor(world, model_entities, monitor, {**config['monitor'], 'items': _monitor_items})
+
+    # the simulation runs until the specified end time
+    return compute_mosaik_end_time(_start_time, _end_time, _time_resolution)
+
+
+def results_in_memory(config: dict) -> dict:
+    """
+    Returns a copy of a configuration whose results are kept in memory by an in-process
+    collector (see `collector_instance`) instead of written to the monitor file.
+    """
+    return {**config, 'monitor': {**config['monitor'], 'in_process': True, 'format': 'memory'}}
+
+
+def collector_instance(world: MosaikWorld):
+    """
+    Returns the collector of a world (a Mosaik world or a `DirectWorld`) started by
+    `setup_world`, or None if it does not run in this process.
+    """
+    collector = world.sims['Collector-0']
+    return getattr(collector, 'instance', None) or tracing.local_instance(collector)
+
+
 class Simulation:
     """A simplified interface to run simulations with Illuminator."""
 
@@ -456,52 +659,91 @@ class Simulation:
         self.config_file = load_config_file(config) if type(config) == str else config
 
 
-    def run(self):
-        """Runs a simulation scenario"""
+    def run(self, engine: str = 'mosaik', profile: str = None, trace: str = None, return_results: bool = False):
+        """Runs a simulation scenario
+        
+        Parameters
+        ----------
+        engine: str
+            'mosaik' (default) runs the simulation with Mosaik. 'direct' steps the models
+            in-process in the order of their connections, which is faster for scenarios
+            that only contain time-based models and gives the same results.
+        profile: str
+            Path to a JSON file. If given, the calls of the models are timed, and a summary
+            per model is printed at the end of the simulation and written to the file.
+            See `illuminator.profiling`.
+        trace: str
+            Path to a JSON file. If given, a timeline of the steps of the simulators, their
+            data requests and the writes of the collector is written to the file in the
+            Chrome trace-event format, which opens in Perfetto. See `illuminator.tracing`.
+        return_results: bool
+            If True, the monitored items are kept in memory by an in-process collector and
+            returned, instead of written to the monitor file.
+
+        Returns
+        -------
+        pandas.DataFrame or None
+            With `return_results`, the results: a timestamp index named 'date' and one
+            column per monitored item, float64 for numerical items. Otherwise None.
+        """
+
+        if engine not in ('mosaik', 'direct'):
+            raise ValueError(f"Unknown engine '{engine}', use 'mosaik' or 'direct'")
 
         config = apply_default_values(self.config_file)
-        
+        if return_results:
+            config = results_in_memory(config)
+        if profile is not None:
+            with profiling.profile_steps() as profiler:
+                results = self._run(config, engine, trace)
+            print(profiler.table())
+            profiler.write(profile, scenario=config['scenario'].get('name'), engine=engine)
+        else:
+            results = self._run(config, engine, trace)
+        return results
+
+    def _run(self, config: dict, engine: str, trace: str = None):
+        """Sets up and runs the world of the scenario. Returns the results kept in memory, if any."""
         # Define the Mosaik simulation configuration
-        sim_config = generate_mosaik_configuration(config)
+        sim_config = generate_engine_configuration(config, engine)
 
-        # simulation time
+        # Initialize the Mosaik worlds
         _start_time = config['scenario']['start_time']
-        _end_time = config['scenario']['end_time']
         _time_resolution = config['scenario']['time_resolution']
-        # output file with forecast results
-        _results_file = config['monitor']['file']
-
-        # Initialize the Mosaik worlds
-        world = create_world(sim_config, time_resolution=_time_resolution, start_time=_start_time)
-        # TODO: collectors are also customisable simulators, define in the same way as models.
-        # A way to define custom collectors should be provided by the Illuminator.
-        collector = world.start('Collector', 
-                                time_resolution=_time_resolution, 
-                                start_date=_start_time,
-                                items = config['monitor']['items'],  
-                                results_show={'write2csv':True, 'dashboard_show':False, 
-                                            'Finalresults_show':False,'database':False, 'mqtt':False}, 
-                                output_file=_results_file)
-        
-        # initialize monitor
-        monitor = collector.Monitor()
-
-        # Dictionary to keep track of created model entities
-        model_entities = start_simulators(world, config['models'])
+        if engine == 'direct':
+            from illuminator.direct import DirectWorld
+            world = DirectWorld(sim_config, time_resolution=_time_resolution)
+            world._start_time = _start_time
+        else:
+            world = create_world(sim_config, time_resolution=_time_resolution, start_time=_start_time)
 
-        # Connect the models based on the connections specified in the configuration
-        world = build_connections(world, model_entities, connections=config['connections'], models=config['models'])
+        mosaik_end_time = setup_world(world, config)
+        collector = collector_instance(world) if config['monitor'].get('format') == 'memory' else None
+        if trace is not None:
+            recorder = tracing.TraceRecorder(config['scenario'].get('name'))
+            try:
+                with tracing.trace_world(world, recorder):
+                    world.run(until=mosaik_end_time)
+            finally:
+                recorder.write(trace)  # also the timeline until a failure
+        else:
+            world.run(until=mosaik_end_time)
+        return collector.results() if collector is not None else None
 
-        # Connect monitor
-        world = connect_monitor(world, model_entities, monitor, config['monitor'])
-        
-        # Run the simulation until the specified end time
-        mosaik_end_time =  compute_mosaik_end_time(_start_time,
-                                                _end_time,
-                                                _time_resolution
-                                            )
+    def run_time_parallel(self, windows: int, backend: str = 'processes', workers: int = None,
+                          engine: str = 'mosaik', tolerance: float = 1e-6, max_iterations: int = None) -> dict:
+        """Runs the simulation as consecutive time windows in parallel processes, handing
+        the states of the models from one window to the next until they converge.
+        See `illuminator.parallel_scenarios.run_time_parallel` for the parameters.
 
-        world.run(until=mosaik_end_time)
+        Returns
+        -------
+        dict
+            The convergence report of the windows.
+        """
+        from illuminator.parallel_scenarios import run_time_parallel  # it imports this module
+        return run_time_parallel(apply_default_values(self.config_file), windows, backend=backend, workers=workers,
+                                 engine=engine, tolerance=tolerance, max_iterations=max_iterations)
 
     @property
     def config(self)-> dict:
@@ -1,6 +1,7 @@
 from illuminator.builder import IlluminatorModel, ModelConstructor
 import arrow
 from illuminator.engine import current_model
+from illuminator.models.time_series import acquire_time_series, release_time_series, parse_timestamps, shift_wall_time
 
 
 # construct the model
@@ -8,8 +9,16 @@ class CSV(ModelConstructor):
     """
     A model for reading time series data from CSV files.
 
-    This model reads data from a CSV file line by line, synchronizing with simulation time.
+    This model reads data from a CSV file, synchronizing with simulation time.
     The CSV file should contain a header row with column names and a timestamp column.
+    The file is parsed once into arrays and each step is served by index. CSV models of
+    a process that read the same file share its parsed time series (see
+    `acquire_time_series`). Binary files (see `illuminator data convert`) are memory-mapped.
+
+    Timestamps are read in the time zone `tzinfo`, on the wall clock: the time of a
+    step is the start time shifted by the elapsed simulation time like `arrow.Arrow.shift`,
+    so a step that falls in the gap at the start of daylight saving time is expected
+    one hour later.
 
     Parameters
     ----------
@@ -21,6 +30,10 @@ class CSV(ModelConstructor):
         [list of] Path to the CSV file to read from
     send_row : bool
         If True, sends the entire row as a dictionary under the key 'row'. If False, sends individual columns as separate states.
+    tzinfo : str
+        Time zone of the timestamps in the CSV file (default 'Europe/Amsterdam')
+    preload : bool
+        Deprecated and ignored, every file is loaded once into arrays.
     
 
     Inputs
@@ -40,6 +53,8 @@ class CSV(ModelConstructor):
         The value of each column in the current row.
     """
 
+    runtime_attributes = True  # the columns of the file are added to the states
+
     # parameters={'date_format': '',
     #             'delimiter': ',',
     #             'datafile': '',             
@@ -50,37 +65,6 @@ class CSV(ModelConstructor):
     # time_step_size=1
     # time=None
     
-    def skip_header(self):
-        next(self.datafile).strip() # Skip header line
-        return
-
-
-    def go_to_start_date(self) -> None:
-        if self.start_date < self.next_row[0]:
-            raise ValueError('Start date "%s" not in CSV file.' %
-                             self.start_date.format(self.date_format))
-        
-        while self.start_date > self.next_row[0]:
-            self._read_next_row()
-            if self.next_row is None:
-                raise ValueError('Start date "%s" not in CSV file.' %
-                                 self.start_date.format(self.date_format))
-        
-        return
-    
-
-    def go_to_expected_date(self) -> None:
-        if self.expected_date < self.next_row[0]:
-            raise ValueError('Start date "%s" not in CSV file.' %
-                             self.expected_date.format(self.date_format))
-
-        while self.expected_date > self.next_row[0]:
-            self._read_next_row()
-            if self.next_row is None:
-                raise ValueError('Start date "%s" not in CSV file.' %
-                                 self.expected_date.format(self.date_format))
-        return
-
 
     def __init__(self, **kwargs) -> None:
         """
@@ -95,7 +79,7 @@ class CSV(ModelConstructor):
             start_date (Arrow): The start date as an Arrow object.
             next_date (Arrow): The next date as an Arrow object.
             file_path (str): The file path to the CSV file.
-            datafile (file object): The file object for the opened CSV file.
+            series (TimeSeries): The parsed time series of the CSV file, shared with other models.
             attrs (list): The list of attribute names from the CSV file.
         """
         super().__init__(**kwargs)
@@ -109,19 +93,17 @@ class CSV(ModelConstructor):
         self.send_row = self._model.parameters.get('send_row', False)
         self.cache = {}
         
-        # Open the CSV file for reading
         if type(self.file_path) is list:
             self.file_paths = self.file_path
         else:
             self.file_paths = [self.file_path]
         
         self.file_path = self.file_paths[self._model.inputs.get('file_index', 0)]
-        self.datafile = open(self.file_path, 'r', encoding='utf-8')
-        #self.modelname = 'CSV'
+        # the whole file is parsed at once and shared with other models, rows are served by index
+        self.series = acquire_time_series(self.file_path, self.delimiter, self.date_format)
+        self.start_timestamp = int(parse_timestamps([self._model.parameters.get('start')], self.date_format)[0])
+        self.columns = self.series.columns
 
-        self.skip_header()
-        # Get attribute names and strip optional comments
-        self.columns = next(self.datafile).strip().split(self.delimiter)
         if self.send_row:
             self.attrs = ['row']
             current_model.setdefault('states', {})['row'] = None  # add attribute to states (non-physical message)
@@ -140,8 +122,11 @@ class CSV(ModelConstructor):
 
         super().__init__(**kwargs)  # re-initialise the outputs now that new outputs are configured 
 
-        self._read_next_row()
-        self.go_to_start_date()
+        self.row_index = self.series.index_of(self.start_timestamp)
+        if self.row_index == len(self.series) or self.series.timestamps[0] > self.start_timestamp:
+            release_time_series(self.series)
+            raise ValueError('Start date "%s" not in CSV file.' %
+                             self.start_date.format(self.date_format))
     
     # 
     # run super().init(self, sid, time_resolution=1, **sim_params)
@@ -160,16 +145,10 @@ class CSV(ModelConstructor):
         if file_index < 0 or file_index >= len(self.file_paths):
             raise IndexError(f'file_index {file_index} out of range for available files.')
         if self.file_paths[file_index] != self.file_path:
-            # Close current file and open new one
-            self.datafile.close()
             self.file_path = self.file_paths[file_index]
-            self.datafile = open(self.file_path, 'r', encoding='utf-8')
-            self.skip_header()
-            self.next_row = next(self.datafile)  # skip the column header
-            self._read_next_row()
-            self.go_to_expected_date()
-            self._read_next_row()  # take one more step to be on the new time row
-        return
+            release_time_series(self.series)
+            self.series = acquire_time_series(self.file_path, self.delimiter, self.date_format)
+            self.row_index = None  # the row of the current step is looked up in the new file
 
 
     def step(self, time, inputs, max_advance=900) -> None:
@@ -196,53 +175,54 @@ class CSV(ModelConstructor):
         if 'file_index' in input_data:
             self.change_file(file_index=input_data['file_index'])
 
-        data = self.next_row
-        # print("NEW CSV DATA: ", data)
-        if data is None:
+        series = self.series
+        # start date  +  number of calls * iterations per call * time per iteration, aka time per call
+        expected = shift_wall_time(self.start_timestamp, time * self.time_step_size * self.time_resolution,
+                                   self.start_date.tzinfo)
+        index = self.row_index if self.row_index is not None else series.index_of(expected)
+        if index >= len(series):
             raise IndexError('End of CSV file reached.')
 
         # Check date
-        date = data[0]
-        self.expected_date = self.start_date.shift(seconds=time * self.time_step_size * self.time_resolution)  # start date  +  number of calls * iterations per call * time per iteration, aka time per call
-        if date != self.expected_date:
-            raise IndexError(f'Wrong date "{date}", expected "{self.expected_date}"')
+        if series.timestamps[index] != expected:
+            self.expected_date = self.start_date.shift(seconds=time * self.time_step_size * self.time_resolution)
+            raise IndexError(f'Wrong date "{series.date(index)}", expected "{self.expected_date}"')
 
         # Put data into the cache for get_data() calls
-        self.cache = {}
         if self.send_row:
-            row = {}
-            row[self.columns[0]] = date.format(self.date_format)  # make the date a string again to be able to send it as a json
-            for key, val in zip(self.columns[1:], data[1:]):
+            if series.text is None:
+                raise ValueError(f'send_row is not supported for binary files: {self.file_path}')
+            row = {self.columns[0]: series.dates[index]}
+            for key, val in zip(self.columns[1:], series.text[index]):
                 row[key] = val
-            self.cache['row'] = row
+            self.cache = {'row': row}
         else:
-            for attr, val in zip(self.attrs, data[1:]):
-                self.cache[attr] = float(val)
-            
+            if series.values is None:
+                raise ValueError(f'The columns of {self.file_path} are not numerical, use send_row')
+            self.cache = dict(zip(self.attrs, series.values[index].tolist()))
+
         self.set_states(self.cache)
 
-        self._read_next_row()
-        if self.next_row is not None:
+        self.row_index = index + 1
+        if self.row_index < len(series):
             return time + self.time_step_size  # int((self.next_row[0].int_timestamp - date.int_timestamp) / self.time_step_size)
         else:
             return max_advance
 
 
-    def _read_next_row(self) -> None:
+    def finalize(self) -> None:
         """
-        Reads the next row within the file object.
+        Releases the time series within `self.series`.
         """
-        try:
-            self.next_row = next(self.datafile).strip().split(self.delimiter)
-            self.next_row[0] = arrow.get(self.next_row[0], self.date_format, tzinfo=self.tzinfo)  # Convert the first column to an Arrow object
-        except StopIteration:
-            self.next_row = None
+        release_time_series(self.series)
 
-    def finalize(self) -> None:
+    def reset(self) -> None:
         """
-        Closes the file object within `self.datafile`.
+        Constructs the model again, since `finalize` released its time series and the
+        next simulation may start at another date. The file is not parsed again while
+        the runner holds it, see `hold_time_series`.
         """
-        self.datafile.close()
+        type(self).__init__(self)
 
 # if __name__ == '__main__':
 #     csv_model = CSV(csv)
@@ -0,0 +1,77 @@
+import numpy as np
+from illuminator.builder import BatchedModelConstructor
+
+class LoadBatch(BatchedModelConstructor):
+    """
+    Calculates the load demand of many loads at once. Behaves as a group of `Load`
+    models, each entity with its own number of houses and input load.
+
+    Parameters
+    ----------
+    houses : int or list
+        Number of houses that determine the total load demand of each entity
+    input_type : str or list
+        Type of input for load calculation ('energy' or 'power')
+    output_type : str or list
+        Type of output for consumption calculation ('energy' or 'power')
+
+    Inputs
+    ----------
+    load : float
+        Incoming energy or power demand per house in kW or kWh
+    
+    Outputs
+    -------
+    load_dem : float
+        Total energy or power consumption for all houses of the entity over the time step
+    consumption : float
+        Current energy or power consumption based on the number of houses and input load (kWh)
+    """
+
+    parameters={'houses': 1,  # number of houses that determine the total load demand
+                'input_type': 'energy',  # type of input for load calculation ('energy' or 'power')
+                'output_type': 'power',  # type of output for consumption calculation ('energy' or 'power')
+                }
+    inputs={'load': 0}  # incoming energy or power demand per house kW
+    outputs={'load_dem': 0,  # total energy or power consumption for all houses (kWh) over the time step
+             'consumption': 0,  # Current energy or power consumption based on the number of houses and input load (kWh)
+             }
+    states={}
+    time_step_size=1
+    time=None
+
+
+    def create(self, num:int, model:str, **model_params) -> list:
+        """
+        Creates the entities and validates their input and output types.
+        """
+        new_entities = super().create(num, model, **model_params)
+        for attr in ['input_type', 'output_type']:
+            invalid = set(self.parameter_values[attr]) - {'power', 'energy'}
+            if invalid:
+                raise ValueError(f"Invalid {attr}: {', '.join(map(str, invalid))}. Must be 'power' or 'energy'.")
+        return new_entities
+
+
+    def step_batch(self, time: int, inputs: dict) -> None:
+        """
+        Calculates the load demand of all entities.
+
+        Parameters
+        ----------
+        time : int
+            Current simulation time
+        inputs : dict
+            Dictionary containing the array 'load' with the load per house of each entity
+        """
+        deltaTime = self.time_resolution * self.time_step_size / 60 / 60  # in case of 15 min interval, deltaTime = 0.25 h
+
+        houses = self.parameter_values['houses']
+        input_type = self.parameter_values['input_type']
+        output_type = self.parameter_values['output_type']
+        load = houses * inputs['load']
+
+        consumption = np.where((input_type == 'power') & (output_type == 'energy'), load * deltaTime,  # kW -> kWh
+                               np.where((input_type == 'energy') & (output_type == 'power'), load / deltaTime,  # kWh -> kW
+                                        load))
+        self.set_outputs({'load_dem': consumption})
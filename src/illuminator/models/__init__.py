@@ -1,54 +1,99 @@
-# This is a temporary  fix to make models more accessible
-# In the future, a model will be contained in a single file, where the
-# name of the file matches the name of the model
-
-from .adder import Adder
-
-from .collector import Collector
-from .CSV_reader_v3 import CSV
-
-from .Gridconnection.grid_connection_v3 import GridConnection
-
-from .PV.pv_model_v3 import PV
-from .Wind.wind_v3 import Wind
-
-from .Load.load_v3 import Load
-from .Load.LoadEV.load_EV_v3 import LoadEV
-from .Load.LoadHeatpump.load_heatpump_v3 import LoadHeatpump
-
-from .ElectricVehicle.EV import EV
-
-from .Battery.battery_v3 import Battery
-
-from .Controllers.default_controller.controller_v3 import Controller
-from .Controllers.controller_T1.controller_T1_v3 import Controller_T1
-from .Controllers.controller_T3Congestion.controller_T3Congestion_v3 import ControllerT3Congestion
-from .Controllers.controller_ev.controller_EV import ControllerEV
-from .Controllers.controller_ev.controller_T4 import Controller_T4
-from .Controllers.controller_StoryMode.controller_StoryMode_v3 import Controller_StoryMode
-
-from .Agents.generators.generation_company_agent_v3 import GenerationCompanyAgent
-from .Agents.operators.operator_v3 import Operator_Market
-from .Agents.justice_agent.justice_agent_v3 import JusticeAgent
-
-__all__ = [ 'Adder', 
-            'Collector', 
-            'CSV',
-            'GridConnection',
-            'PV',
-            'Wind',
-            'Load',
-            'LoadEV',
-            'LoadHeatpump',
-            'EV',
-            'Battery', 
-            'Controller',
-            'Controller_T1',
-            'ControllerT3Congestion',
-            'ControllerEV',	
-            'Controller_T4',
-            'Controller_StoryMode',
-            'GenerationCompanyAgent',
-            'Operator_Market',
-            'JusticeAgent'
-            ]
+"""
+The registry of Illuminator's models. A model is imported when its type is first
+used, e.g. by `illuminator.models:PV` in the simulator configuration, so a scenario
+only imports the modules of the models it uses.
+
+Other packages can add models through an entry point in the group
+`illuminator.models`, with the model type as its name, e.g. in their pyproject.toml:
+
+    [project.entry-points."illuminator.models"]
+    MyModel = "my_package.my_model:MyModel"
+
+The type can then be used in a configuration file like any other model. The models
+of Illuminator take precedence over entry points with the same name.
+"""
+import importlib
+import sys
+import types
+from importlib import metadata
+
+ENTRY_POINT_GROUP = 'illuminator.models'
+
+# model type -> module that defines the model class of the same name
+MODELS = {
+    'Adder': 'illuminator.models.adder',
+    'Collector': 'illuminator.models.collector',
+    'CSV': 'illuminator.models.CSV_reader_v3',
+    'GridConnection': 'illuminator.models.Gridconnection.grid_connection_v3',
+    'PV': 'illuminator.models.PV.pv_model_v3',
+    'Wind': 'illuminator.models.Wind.wind_v3',
+    'Load': 'illuminator.models.Load.load_v3',
+    'LoadEV': 'illuminator.models.Load.LoadEV.load_EV_v3',
+    'LoadHeatpump': 'illuminator.models.Load.LoadHeatpump.load_heatpump_v3',
+    'LoadBatch': 'illuminator.models.Load.load_batch_v3',
+    'EV': 'illuminator.models.ElectricVehicle.EV',
+    'Battery': 'illuminator.models.Battery.battery_v3',
+    'Controller': 'illuminator.models.Controllers.default_controller.controller_v3',
+    'Controller_T1': 'illuminator.models.Controllers.controller_T1.controller_T1_v3',
+    'ControllerT3Congestion': 'illuminator.models.Controllers.controller_T3Congestion.controller_T3Congestion_v3',
+    'ControllerEV': 'illuminator.models.Controllers.controller_ev.controller_EV',
+    'Controller_T4': 'illuminator.models.Controllers.controller_ev.controller_T4',
+    'Controller_StoryMode': 'illuminator.models.Controllers.controller_StoryMode.controller_StoryMode_v3',
+    'GenerationCompanyAgent': 'illuminator.models.Agents.generators.generation_company_agent_v3',
+    'Operator_Market': 'illuminator.models.Agents.operators.operator_v3',
+    'JusticeAgent': 'illuminator.models.Agents.justice_agent.justice_agent_v3',
+}
+
+__all__ = list(MODELS)
+
+_entry_points = None  # model type -> entry point, read once
+
+
+def entry_points() -> dict:
+    """Returns the models registered by other packages, by type."""
+    global _entry_points
+    if _entry_points is None:
+        found = metadata.entry_points()
+        if hasattr(found, 'select'):
+            found = found.select(group=ENTRY_POINT_GROUP)
+        else:  # Python < 3.10
+            found = found.get(ENTRY_POINT_GROUP, [])
+        _entry_points = {entry_point.name: entry_point for entry_point in found}
+    return _entry_points
+
+
+def available_models() -> list:
+    """Returns the types of all models: those of Illuminator and those registered by other packages."""
+    return list(MODELS) + [name for name in entry_points() if name not in MODELS]
+
+
+def __getattr__(name: str):
+    if name in MODELS:
+        model = getattr(importlib.import_module(MODELS[name]), name)
+    elif not name.startswith('_') and name in entry_points():
+        model = entry_points()[name].load()
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = model  # later lookups do not call __getattr__
+    return model
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(available_models()))
+
+
+class _ModelRegistry(types.ModuleType):
+    """
+    The type of this module. When a subpackage with the name of a model is imported
+    (e.g. `illuminator.models.Battery.battery_v3`), the import system binds it to this
+    module, which would hide the model `Battery`. Such bindings are ignored, so that
+    the name always refers to the model.
+    """
+
+    def __setattr__(self, name: str, value) -> None:
+        if name in MODELS and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _ModelRegistry
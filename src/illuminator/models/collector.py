@@ -1,6 +1,9 @@
 import collections
+import datetime
+import numpy as np
 import pandas as pd
 import mosaik_api_v3 as mosaik_api
+import illuminator.profiling as profiling
 import os
 import sqlite3
 import paho.mqtt.client as mqtt
@@ -40,12 +43,13 @@ class Collector(mosaik_api.Simulator):
         super().__init__(META)
         self.eid = None
         self.data = collections.defaultdict(lambda: collections.defaultdict(dict))
+        profiling.instrument(self, 'Collector', 'Collector')
 
     def init(self, sid:str, time_resolution:int, start_date, items, results_show,output_file,
              date_format:str='%Y-%m-%d %H:%M:%S',
              db_file:str='Result/result.db',
              mqtt_broker:str='mqtt://192.168.10.90:1883', mqtt_topic:str='TGVFCBB75',
-             print_results:bool=False) -> dict:
+             print_results:bool=False, flush_every:int=1000, output_format:str='csv') -> dict:
         """
         Initialize the simulator with the ID `sid` and pass the `time_resolution` and additional parameters sent by mosaik.
         Because this method has an additional parameter `step_size` it is overriding the parent method init().
@@ -74,6 +78,11 @@ class Collector(mosaik_api.Simulator):
             ???
         print_results : bool
             Should the results be printed
+        flush_every : int
+            Number of steps buffered in memory before they are written to `output_file`
+        output_format : str
+            Format of `output_file`: 'csv', 'parquet' or 'arrow', or 'memory' to keep the
+            results in memory, see `results`
 
         Attributes
         ----------
@@ -95,6 +104,8 @@ class Collector(mosaik_api.Simulator):
             ???
         self.mqtt_broker : str
             ???
+        self.flush_every : int
+            Number of steps buffered in memory before they are written to `output_file`
 
         Returns
         -------
@@ -112,6 +123,15 @@ class Collector(mosaik_api.Simulator):
         self.mqtt_topic=mqtt_topic
         self.mqtt_broker=mqtt_broker
 
+        if flush_every < 1:
+            raise ValueError(f"flush_every must be a positive integer, got {flush_every}")
+        self.flush_every = flush_every
+        self._dates = np.empty(flush_every, dtype=object)
+        self._block = np.empty((flush_every, len(items)), dtype=object)  # one row per step, one column per item
+        self._row = 0
+        self._writer = create_result_writer(output_file, items, output_format) if results_show['write2csv'] else None
+        self._item_names = {}  # (source, attribute) -> monitor item, resolved on first use
+
         return self.meta
 
     def create(self, num:int, model:str) -> list:
@@ -216,23 +236,36 @@ class Collector(mosaik_api.Simulator):
         current_date = (self.start_date
                         + pd.Timedelta(time * self.time_resolution, unit='seconds'))
 
-        df_dict = {'date': current_date}
-
         data = inputs.get(self.eid, {})
 
-        for attr, values in data.items():
-            for src, value in values.items():
+        values = {}
+        for attr, attr_values in data.items():
+            for src, value in attr_values.items():
                 self.data[src][attr][time] = value
-                src = src.split('-0')[0]
-                df_dict[f'{src}.{attr}'] = [value['value']]
+                try:
+                    item = self._item_names[src, attr]
+                except KeyError:
+                    item = self._item_names[src, attr] = item_name(src, attr, self.items)
+                values[item] = value[1]  # (origin, value) message
+
+        if self.results_show['write2csv'] == True:
+            # rows are buffered and written to the file every `flush_every` steps
+            row = self._block[self._row]
+            for i, item in enumerate(self.items):  # put in the order as defined in the yaml file
+                row[i] = values[item]
+            self._dates[self._row] = current_date
+            self._row += 1
+            if self._row == self.flush_every:
+                self.flush()
+
+        if not (self.results_show['dashboard_show'] or self.results_show['database'] or self.results_show.get('mqtt', False)):
+            return time + 1 # TODO change +1 to +self.time_resolution do it's not hard coded
+
+        df_dict = {'date': current_date}
+        for item, value in values.items():
+            df_dict[item] = [value]
 
         df = pd.DataFrame.from_dict(df_dict)
-        columns = list(df.columns)
-        # columns.remove('Controller1-0.time-based_0-dump')
-        # columns.insert(3, 'Controller1-0.time-based_0-dump')
-        # columns.remove('Controller1-0.time-based_0-flow2b')
-        # columns.insert(1, 'Controller1-0.time-based_0-flow2b')
-        # df = df[columns]
         df = df.set_index('date')
         df = df[self.items]  # put in the order as defined in the yaml file
 
@@ -242,14 +275,6 @@ class Collector(mosaik_api.Simulator):
                 wandb.log({key: value[0],
                            "custom_step":time/900})  # TODO replace 900 by something better
 
-        if self.results_show['write2csv'] == True:
-            if self.results_show['write2csv']:
-                mode = 'w' if time == 0 else 'a'
-                header = (time == 0)
-                df.to_csv(self.output_file, mode=mode, header=header, index=True)
-
-
-
         if self.results_show['database']==True:
             today_date = pd.Timestamp.now().normalize()
 
@@ -267,10 +292,24 @@ class Collector(mosaik_api.Simulator):
 
         return time + 1 # TODO change +1 to +self.time_resolution do it's not hard coded
 
+    def flush(self) -> None:
+        """
+        Writes the buffered rows to the output file.
+        """
+        if self._row == 0:
+            return
+
+        self._writer.write(self._dates[:self._row], self._block[:self._row])
+        self._row = 0
+
     def finalize(self) -> None:
         """
-        Prints collected data
+        Writes the remaining buffered rows and prints collected data
         """
+        if self.results_show['write2csv'] == True:
+            self.flush()
+            self._writer.close()
+
         if self.print_results:
             print('Collected data:')
             for sim, sim_data in sorted(self.data.items()):
@@ -281,6 +320,397 @@ class Collector(mosaik_api.Simulator):
         if self.results_show['database']==True:
             self.conn.close()
 
+    def results(self) -> pd.DataFrame:
+        """
+        Returns the results of the simulation, see `MemoryResultWriter.results`.
+        Only available with output_format 'memory'.
+        """
+        if not isinstance(self._writer, MemoryResultWriter):
+            raise ValueError("Results are only kept in memory with output_format 'memory'")
+        return self._writer.results()
+
+
+
+def format_date(date: datetime.datetime) -> str:
+    """
+    Formats a time stamp the same way pandas writes a single-row date index
+    to CSV, i.e. time stamps at midnight are written without their time part.
+    """
+    if date.hour == 0 and date.minute == 0 and date.second == 0:
+        return date.strftime('%Y-%m-%d')
+    return date.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def item_name(src: str, attr: str, items: list) -> str:
+    """
+    Returns the name of the monitor item for attribute `attr` of the entity with the
+    full ID `src`, e.g. 'Battery1-0.time-based_0' -> 'Battery1.soc'. Entities of batched
+    models are monitored as '<model>[<index>].<attr>' when the item is in `items`.
+    """
+    model = src.split('-0')[0]
+    index = src.rsplit('_', 1)[-1]
+    entity_item = f'{model}[{index}].{attr}'
+    if entity_item in items:
+        return entity_item
+    return f'{model}.{attr}'
+
+
+class CSVResultWriter:
+    """
+    Writes blocks of buffered steps to a CSV file, one `to_csv` call per block.
+
+    Parameters
+    ----------
+    output_file : str
+        Path to the CSV file. The file is overwritten by the first block.
+    items : list
+        Names of the columns
+    """
+    def __init__(self, output_file: str, items: list) -> None:
+        self.output_file = output_file
+        self.items = items
+        self._header = True
+
+    def write(self, dates: np.ndarray, block: np.ndarray) -> None:
+        """
+        Appends a block to the file.
+
+        Parameters
+        ----------
+        dates : np.ndarray
+            Time stamp of each buffered step
+        block : np.ndarray
+            Two dimensional array with one row per step and one column per item
+        """
+        index = pd.Index([format_date(date) for date in dates], name='date')
+        df = pd.DataFrame(block, index=index, columns=self.items)
+        df.to_csv(self.output_file, mode='w' if self._header else 'a', header=self._header, index=True)
+        self._header = False
+
+    def close(self) -> None:
+        """The file is closed after every block, nothing to do."""
+        return
+
+
+class ArrowResultWriter:
+    """
+    Writes blocks of buffered steps to an Arrow IPC (Feather v2) or Parquet file.
+    Every block becomes a record batch (Arrow) or a row group (Parquet) with a
+    timestamp index named 'date' and one float64 column per item, so columns can be
+    read selectively, e.g. with `pandas.read_parquet(file, columns=[...])`.
+    Requires the optional dependency `pyarrow`.
+
+    Parameters
+    ----------
+    output_file : str
+        Path to the output file. The file is overwritten.
+    items : list
+        Names of the columns
+    output_format : str
+        Either 'arrow' or 'parquet'
+    """
+    def __init__(self, output_file: str, items: list, output_format: str = 'parquet') -> None:
+        if output_format not in ('arrow', 'parquet'):
+            raise ValueError(f"Unknown output format '{output_format}'. Must be 'arrow' or 'parquet'")
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError(f"Writing results as '{output_format}' requires pyarrow. "
+                              "Install it with 'pip install pyarrow' or use format 'csv'.")
+
+        self.output_file = output_file
+        self.items = items
+        self.output_format = output_format
+        self._pa = pyarrow
+        self._writer = None
+        self._schema = None
+
+    def write(self, dates: np.ndarray, block: np.ndarray) -> None:
+        """
+        Writes a block as a new record batch or row group.
+
+        Parameters
+        ----------
+        dates : np.ndarray
+            Time stamp of each buffered step
+        block : np.ndarray
+            Two dimensional array with one row per step and one column per item
+        """
+        try:
+            values = block.astype(np.float64)  # None becomes NaN
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Only numerical items can be written as '{self.output_format}', use format 'csv' instead. {e}")
+
+        index = pd.DatetimeIndex(list(dates), name='date')
+        df = pd.DataFrame(values, index=index, columns=self.items)
+
+        if self._writer is None:
+            table = self._pa.Table.from_pandas(df, preserve_index=True)
+            self._schema = table.schema
+            if self.output_format == 'parquet':
+                import pyarrow.parquet
+                self._writer = pyarrow.parquet.ParquetWriter(self.output_file, self._schema)
+            else:
+                import pyarrow.ipc
+                self._writer = pyarrow.ipc.new_file(self.output_file, self._schema)
+        else:
+            table = self._pa.Table.from_pandas(df, schema=self._schema, preserve_index=True)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        """Writes the file footer and closes the file."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class MemoryResultWriter:
+    """
+    Keeps the blocks of buffered steps in memory instead of writing them to a file,
+    for `Simulation.run(return_results=True)`.
+
+    Parameters
+    ----------
+    items : list
+        Names of the columns
+    """
+    def __init__(self, items: list) -> None:
+        self.items = items
+        self._dates = []
+        self._blocks = []
+
+    def write(self, dates: np.ndarray, block: np.ndarray) -> None:
+        """
+        Keeps a copy of a block, the collector reuses its buffers.
+
+        Parameters
+        ----------
+        dates : np.ndarray
+            Time stamp of each buffered step
+        block : np.ndarray
+            Two dimensional array with one row per step and one column per item
+        """
+        self._dates.append(dates.copy())
+        self._blocks.append(block.copy())
+
+    def close(self) -> None:
+        """Nothing to close, the results stay in memory."""
+        return
+
+    def results(self) -> pd.DataFrame:
+        """
+        Returns the results with a timestamp index named 'date' and one column per item.
+        Columns of numerical items are float64, items without a value in a step are NaN.
+        Other columns, e.g. of dictionaries, keep their values as objects.
+        """
+        dates = np.concatenate(self._dates) if self._dates else np.empty(0, dtype=object)
+        block = np.concatenate(self._blocks) if self._blocks else np.empty((0, len(self.items)), dtype=object)
+        columns = {}
+        for i, item in enumerate(self.items):
+            try:
+                columns[item] = block[:, i].astype(np.float64)  # None becomes NaN
+            except (TypeError, ValueError):
+                columns[item] = block[:, i]
+        return pd.DataFrame(columns, index=pd.DatetimeIndex(list(dates), name='date'), columns=self.items)
+
+
+def create_result_writer(output_file: str, items: list, output_format: str = 'csv'):
+    """
+    Returns a writer for the results of the collector.
+
+    Parameters
+    ----------
+    output_file : str
+        Path to the output file
+    items : list
+        Names of the monitored items, in the order of the columns
+    output_format : str
+        One of 'csv', 'parquet' or 'arrow', or 'memory' to keep the results in memory
+        instead of writing them to `output_file`
+
+    Returns
+    -------
+    CSVResultWriter, ArrowResultWriter or MemoryResultWriter
+        A writer with `write(dates, block)` and `close()` methods
+    """
+    if output_format == 'csv':
+        return CSVResultWriter(output_file, items)
+    if output_format == 'memory':
+        return MemoryResultWriter(items)
+    return ArrowResultWriter(output_file, items, output_format)
+
+
+class ColumnarCollector(mosaik_api.Simulator):
+    def __init__(self) -> None:
+        """
+        An in-process alternative to the `Collector`. Mosaik starts it as a `python`
+        simulator, so monitored values are not serialized over a socket on every step.
+        Values are stored in preallocated per-item column buffers which are written
+        to the output file in bulk whenever the buffers are full, and when the
+        simulation finalizes.
+
+        ...
+
+        Attributes
+        ----------
+        self.meta : dict
+            Contains metadata of the collector, shared with the `Collector`.
+        self.eid : string
+            The entity ID of the single monitor instance.
+        """
+        super().__init__(META)
+        self.eid = None
+        profiling.instrument(self, 'Collector', 'ColumnarCollector')
+
+    def init(self, sid:str, time_resolution:int, start_date, items:list, output_file:str,
+             date_format:str='%Y-%m-%d %H:%M:%S', flush_every:int=1000,
+             output_format:str='csv', results_show:dict=None) -> dict:
+        """
+        Initialize the collector and preallocate one column buffer per monitored item.
+
+        ...
+
+        Parameters
+        ----------
+        sid : str
+            The String ID of the simulator
+        time_resolution : int
+            Number of seconds that correspond to one mosaik time step
+        start_date : str
+            Start time of the simulation
+        items : list
+            Monitored items as `<model>.<attribute>`. The order determines the order of the columns.
+        output_file : str
+            Path to the CSV file the results are written to
+        date_format : str
+            The expected date formatting of `start_date`
+        flush_every : int
+            Number of steps kept in memory before the buffers are written to `output_file`
+        output_format : str
+            Format of `output_file`: 'csv', 'parquet' or 'arrow', or 'memory' to keep the
+            results in memory, see `results`
+        results_show : dict
+            Same flags as the `Collector`. Only 'write2csv' is supported in-process.
+
+        Returns
+        -------
+        self.meta : dict
+            The metadata of the class
+        """
+        if results_show is not None:
+            unsupported = [key for key in ('dashboard_show', 'database', 'mqtt') if results_show.get(key)]
+            if unsupported:
+                raise ValueError(f"The in-process collector does not support: {', '.join(unsupported)}")
+        if flush_every < 1:
+            raise ValueError(f"flush_every must be a positive integer, got {flush_every}")
+
+        self.time_resolution = time_resolution
+        self.start_date = pd.to_datetime(start_date, format=date_format).to_pydatetime()
+        self.output_file = output_file
+        self.items = list(items)
+        self.flush_every = flush_every
+
+        self._dates = np.empty(flush_every, dtype=object)
+        self._block = np.empty((flush_every, len(self.items)), dtype=object)
+        self._columns = {item: self._block[:, i] for i, item in enumerate(self.items)}  # views on the block
+        self._targets = {}  # (source, attribute) -> column buffer, resolved on first use
+        self._row = 0
+        self._writer = create_result_writer(output_file, self.items, output_format)
+
+        return self.meta
+
+    def create(self, num:int, model:str) -> list:
+        """
+        Create the single monitor instance.
+
+        ...
+
+        Parameters
+        ----------
+        num : int
+            The number of model instances to create. Must be 1.
+        model : str
+            `model` needs to be a public entry in the simulator's ``meta['models']``.
+
+        Returns
+        -------
+        list
+            A list with the description of the monitor entity.
+        """
+        if num > 1 or self.eid is not None:
+            raise RuntimeError('Can only create one instance of Monitor.')
+
+        self.eid = 'Monitor'
+        return [{'eid': self.eid, 'type': model}]
+
+    def step(self, time:int, inputs:dict, max_advance:int) -> int:
+        """
+        Store the values received at `time` in the column buffers.
+
+        ...
+
+        Parameters
+        ----------
+        time : int
+            The current mosaik time step
+        inputs : dict
+            Dict of dicts mapping entity IDs to attributes and dicts of values
+        max_advance : int
+            Unused by the collector
+
+        Returns
+        -------
+        new_step : int
+            Return the new simulation time, i.e. the time at which ``step()`` should be called again.
+        """
+        row = self._row
+        self._dates[row] = self.start_date + datetime.timedelta(seconds=time * self.time_resolution)
+
+        targets = self._targets
+        for attr, values in inputs.get(self.eid, {}).items():
+            for src, value in values.items():
+                try:
+                    column = targets[src, attr]
+                except KeyError:
+                    column = targets[src, attr] = self._columns.get(item_name(src, attr, self.items))
+                if column is not None:
+                    column[row] = value[1]
+
+        self._row = row + 1
+        if self._row == self.flush_every:
+            self.flush()
+
+        return time + 1
+
+    def flush(self) -> None:
+        """
+        Writes the buffered rows to the output file and empties the buffers.
+        """
+        rows = self._row
+        if rows == 0:
+            return
+
+        self._writer.write(self._dates[:rows], self._block[:rows])
+
+        self._row = 0
+        self._block[:rows] = None  # items without a value in a step are left empty
+
+    def finalize(self) -> None:
+        """
+        Writes the remaining buffered rows to the output file.
+        """
+        self.flush()
+        self._writer.close()
+
+    def results(self) -> pd.DataFrame:
+        """
+        Returns the results of the simulation, see `MemoryResultWriter.results`.
+        Only available with output_format 'memory'.
+        """
+        if not isinstance(self._writer, MemoryResultWriter):
+            raise ValueError("Results are only kept in memory with output_format 'memory'")
+        return self._writer.results()
+
 
 if __name__ == '__main__':
     mosaik_api.start_simulation(Collector())
\ No newline at end of file
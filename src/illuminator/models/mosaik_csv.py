@@ -1,6 +1,7 @@
 import arrow
 
 import mosaik_api_v3 as mosaik_api
+from illuminator.models.time_series import acquire_time_series, release_time_series, parse_timestamps
 
 
 __version__ = '1.2.0'
@@ -25,10 +26,10 @@ class CSV(mosaik_api.Simulator): # simulator that reads a CSV file and provides
             ???
         self.delimiter : ???
             ???
-        self.datafile : ???
-            The file object which will be used for reading
-        self.next_row : ???
-            ???
+        self.series : TimeSeries
+            The parsed time series of the data file, shared with the other models of the process
+        self.row_index : int
+            The index of the next row in `self.series`
         self.modelname : ???
             ???
         self.attrs : ???
@@ -44,8 +45,8 @@ class CSV(mosaik_api.Simulator): # simulator that reads a CSV file and provides
         self.start_date = None
         self.date_format = None
         self.delimiter = None
-        self.datafile = None
-        self.next_row = None
+        self.series = None
+        self.row_index = None
         self.modelname = None
         self.attrs = None
         self.eids = []
@@ -85,13 +86,11 @@ class CSV(mosaik_api.Simulator): # simulator that reads a CSV file and provides
         self.start_date = arrow.get(sim_start, self.date_format)
         self.next_date = self.start_date
 
-        self.datafile = open(datafile)
-        self.modelname = 'CSV' # next(self.datafile).strip() 
-        # model name in META is set to the first line of the CSV file
+        self.series = acquire_time_series(datafile, self.delimiter, self.date_format)
+        self.modelname = 'CSV'
 
-        next(self.datafile).strip() # Skip header line
         # Get attribute names and strip optional comments
-        attrs = next(self.datafile).strip().split(self.delimiter)[1:]
+        attrs = self.series.columns[1:]
         for i, attr in enumerate(attrs):
             try:
                 # Try stripping comments
@@ -110,15 +109,13 @@ class CSV(mosaik_api.Simulator): # simulator that reads a CSV file and provides
         }
 
         # Check start date
-        self._read_next_row()
-        if self.start_date < self.next_row[0]:
+        start_timestamp = int(parse_timestamps([sim_start], self.date_format)[0])
+        self.row_index = self.series.index_of(start_timestamp)
+        if self.row_index == len(self.series) or self.series.timestamps[0] > start_timestamp:
+            release_time_series(self.series)
+            self.series = None
             raise ValueError('Start date "%s" not in CSV file.' %
                              self.start_date.format(self.date_format))
-        while self.start_date > self.next_row[0]:
-            self._read_next_row()
-            if self.next_row is None:
-                raise ValueError('Start date "%s" not in CSV file.' %
-                                 self.start_date.format(self.date_format))
 
         return self.meta
 
@@ -212,26 +209,27 @@ class CSV(mosaik_api.Simulator): # simulator that reads a CSV file and provides
         new_step : int
             Return the new simulation time, i.e. the time at which ``step()`` should be called again.
         """
-        data = self.next_row
-        if data is None:
+        series = self.series
+        index = self.row_index
+        if index >= len(series):
             raise IndexError('End of CSV file reached.')
 
         # Check date
-        date = data[0]
         expected_date = self.start_date.shift(seconds=time*self.time_resolution)
-        if date != expected_date:
+        if series.timestamps[index] != expected_date.int_timestamp:
             raise IndexError('Wrong date "%s", expected "%s"' % (
-                date.format(self.date_format),
+                series.date(index),
                 expected_date.format(self.date_format)))
 
         # Put data into the cache for get_data() calls
-        self.cache = {}
-        for attr, val in zip(self.attrs, data[1:]):
-            self.cache[attr] = float(val)
+        if series.values is not None:
+            self.cache = dict(zip(self.attrs, series.values[index].tolist()))
+        else:
+            self.cache = {attr: float(val) for attr, val in zip(self.attrs, series.text[index])}
 
-        self._read_next_row()
-        if self.next_row is not None:
-            return time + int((self.next_row[0].int_timestamp - date.int_timestamp)/self.time_resolution)
+        self.row_index = index + 1
+        if self.row_index < len(series):
+            return time + int((series.timestamps[self.row_index] - series.timestamps[index])/self.time_resolution)
         else:
             return max_advance
 
@@ -284,22 +282,13 @@ class CSV(mosaik_api.Simulator): # simulator that reads a CSV file and provides
 
         return data
 
-    def _read_next_row(self) -> None:
-        """
-        Reads the next row within the file object
-        """
-        try:
-            self.next_row = next(self.datafile).strip().split(self.delimiter)
-            self.next_row[0] = arrow.get(self.next_row[0], self.date_format)
-        except StopIteration:
-            self.next_row = None
-
     def finalize(self) -> None:
         """
-        Closes the file object within `self.datafile`
+        Releases the time series within `self.series`
         """
-        self.datafile.close()
-
+        if self.series is not None:
+            release_time_series(self.series)
+            self.series = None
 
 def main():
     return mosaik_api.start_simulation(CSV(), 'mosaik-csv simulator')
@@ -0,0 +1,310 @@
+"""
+Loading of the time series read by the CSV model. A time series is parsed once
+into NumPy arrays, so that the values of any time step can be looked up by index.
+Parsed time series are shared by all models of a process, see `acquire_time_series`.
+
+Text files can be converted to a binary format (`illuminator data convert`): a header
+with the start time, the resolution and the column names, followed by the values as
+float64 columns. Binary files are memory-mapped instead of parsed.
+"""
+
+import calendar
+import contextlib
+import csv
+import datetime
+import json
+import os
+import struct
+import threading
+from dataclasses import dataclass
+import arrow
+import numpy as np
+import pandas as pd
+from dateutil import tz as dateutil_tz
+
+BINARY_MAGIC = b'ILLUMTS1'
+BINARY_SUFFIX = '.its'
+
+# arrow tokens that have an equivalent in strptime, longest first
+STRPTIME_TOKENS = {'YYYY': '%Y', 'MM': '%m', 'DD': '%d', 'HH': '%H', 'mm': '%M', 'ss': '%S'}
+
+
+def to_strptime_format(date_format: str):
+    """
+    Converts an arrow date format (e.g. 'YYYY-MM-DD HH:mm:ss') to a strptime format.
+    Returns None if the format contains tokens without an equivalent.
+    """
+    result = ''
+    i = 0
+    while i < len(date_format):
+        for token, directive in STRPTIME_TOKENS.items():
+            if date_format.startswith(token, i):
+                result += directive
+                i += len(token)
+                break
+        else:
+            if date_format[i].isalpha():
+                return None
+            result += date_format[i].replace('%', '%%')
+            i += 1
+    return result
+
+
+def parse_timestamps(texts, date_format: str) -> np.ndarray:
+    """
+    Parses timestamps to seconds since the epoch. Timestamps are taken as wall-clock
+    time, i.e. the time zone of the file is not applied.
+    """
+    strptime_format = to_strptime_format(date_format)
+    if strptime_format is not None:
+        dates = pd.to_datetime(pd.Series(texts, dtype=object), format=strptime_format)
+        return dates.to_numpy(dtype='datetime64[s]').astype(np.int64)
+    return np.array([calendar.timegm(arrow.get(text, date_format).naive.timetuple()) for text in texts],
+                    dtype=np.int64)
+
+
+def shift_wall_time(timestamp: int, seconds: int, tzinfo: datetime.tzinfo = None) -> int:
+    """
+    Shifts a wall-clock timestamp (see `parse_timestamps`) by `seconds`, like
+    `arrow.Arrow.shift` in the time zone `tzinfo`: on the wall clock, with times that do
+    not exist in the time zone (e.g. at the start of daylight saving time) moved
+    forward by the size of the gap.
+    """
+    shifted = timestamp + seconds
+    if tzinfo is None:
+        return shifted
+    wall = (datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=shifted)).replace(tzinfo=tzinfo)
+    if dateutil_tz.datetime_exists(wall):
+        return shifted
+    return calendar.timegm(dateutil_tz.resolve_imaginary(wall).replace(tzinfo=None).timetuple())
+
+
+@dataclass
+class TimeSeries:
+    """
+    A time series read from a text file.
+
+    Attributes
+    ----------
+    columns: list
+        Column names as written in the header of the file, the first one is the time column.
+    dates: np.ndarray
+        The timestamps of the rows as written in the file, None for binary files.
+    timestamps: np.ndarray
+        The timestamps of the rows in seconds since the epoch (int64).
+    text: np.ndarray
+        The values of the rows as written in the file, one column per data column.
+        None for binary files.
+    values: np.ndarray
+        The values of the rows as floats, None if a column is not numerical.
+    """
+    columns: list
+    dates: np.ndarray
+    timestamps: np.ndarray
+    text: np.ndarray
+    values: np.ndarray = None
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def index_of(self, timestamp: int) -> int:
+        """Returns the index of the first row at or after `timestamp` (seconds since the epoch)."""
+        return int(np.searchsorted(self.timestamps, timestamp, side='left'))
+
+    def date(self, index: int) -> str:
+        """Returns the timestamp of a row as text."""
+        if self.dates is not None:
+            return self.dates[index]
+        return str(datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=int(self.timestamps[index])))
+
+
+def load_time_series(file_path: str, delimiter: str = ',', date_format: str = 'YYYY-MM-DD HH:mm:ss') -> TimeSeries:
+    """
+    Reads a time series file: a title line, a header line with the column names and
+    one row per time step, with the timestamp in the first column.
+
+    Parameters
+    ----------
+    file_path: str
+        Path to the file.
+    delimiter: str
+        Column delimiter.
+    date_format: str
+        Arrow format of the timestamps, e.g. 'YYYY-MM-DD HH:mm:ss'.
+
+    Returns
+    -------
+    TimeSeries
+        The parsed time series.
+    """
+    if is_binary_time_series(file_path):
+        return read_binary_time_series(file_path)
+
+    with open(file_path, 'r', encoding='utf-8') as datafile:
+        next(datafile)  # skip the title line
+        columns = next(datafile).strip().split(delimiter)
+        rows = pd.read_csv(datafile, sep=delimiter, header=None, dtype=str, keep_default_na=False,
+                           quoting=csv.QUOTE_NONE, engine='c' if delimiter and len(delimiter) == 1 else 'python')
+
+    text = rows.to_numpy(dtype=object)
+    dates = text[:, 0]
+    series = TimeSeries(columns=columns, dates=dates, timestamps=parse_timestamps(dates, date_format),
+                        text=text[:, 1:])
+    try:
+        series.values = series.text.astype(np.float64)
+    except ValueError:
+        pass  # non-numerical data can only be sent as rows
+    return series
+
+
+def is_binary_time_series(file_path: str) -> bool:
+    """Returns True if the file is a binary time series written by `write_binary_time_series`."""
+    try:
+        with open(file_path, 'rb') as datafile:
+            return datafile.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+    except OSError:
+        return False
+
+
+def write_binary_time_series(series: TimeSeries, file_path: str) -> None:
+    """
+    Writes a time series to a binary file. All columns must be numerical.
+
+    The file starts with `BINARY_MAGIC`, the length of the header (uint64) and the header
+    as JSON (start, start_timestamp, resolution, regular, rows, columns), padded to 64 bytes.
+    If the rows are not equally spaced in time (`regular` is false, e.g. a missing leap day),
+    the timestamps follow as little-endian int64. Then the values follow as little-endian
+    float64, one column after the other.
+    """
+    if series.values is None:
+        raise ValueError('Only numerical columns can be stored in a binary file')
+    steps = np.diff(series.timestamps)
+    resolution = int(np.bincount(steps).argmax()) if len(steps) and steps.min() > 0 else 0
+    if len(steps) and resolution <= 0:
+        raise ValueError('The rows must be sorted by time to be stored in a binary file')
+    regular = bool(np.all(steps == resolution))
+
+    header = {'start': str(series.date(0)) if len(series) else None,
+              'start_timestamp': int(series.timestamps[0]) if len(series) else 0,
+              'resolution': resolution,
+              'regular': regular,
+              'rows': len(series),
+              'columns': list(series.columns)}
+    encoded = json.dumps(header).encode('utf-8')
+    data_offset = -(-(len(BINARY_MAGIC) + 8 + len(encoded)) // 64) * 64
+    encoded = encoded.ljust(data_offset - len(BINARY_MAGIC) - 8)
+
+    with open(file_path, 'wb') as datafile:
+        datafile.write(BINARY_MAGIC)
+        datafile.write(struct.pack('<Q', len(encoded)))
+        datafile.write(encoded)
+        if not regular:
+            datafile.write(np.asarray(series.timestamps, dtype='<i8').tobytes())
+        datafile.write(np.asarray(series.values, dtype='<f8').tobytes(order='F'))
+
+
+def read_binary_time_series(file_path: str) -> TimeSeries:
+    """
+    Memory-maps a binary time series. The values are read from the file when they are
+    accessed, and the pages are shared by all processes reading the same file.
+    """
+    with open(file_path, 'rb') as datafile:
+        if datafile.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(f'{file_path} is not a binary time series')
+        length = struct.unpack('<Q', datafile.read(8))[0]
+        header = json.loads(datafile.read(length))
+
+    rows, columns = header['rows'], header['columns']
+    offset = len(BINARY_MAGIC) + 8 + length
+    if rows == 0:
+        return TimeSeries(columns=columns, dates=None, timestamps=np.empty(0, dtype=np.int64), text=None,
+                          values=np.empty((0, len(columns) - 1)))
+
+    if header['regular']:
+        timestamps = header['start_timestamp'] + header['resolution'] * np.arange(rows, dtype=np.int64)
+    else:
+        timestamps = np.memmap(file_path, dtype='<i8', mode='r', offset=offset, shape=(rows,))
+        offset += 8 * rows
+    values = np.memmap(file_path, dtype='<f8', mode='r', offset=offset, shape=(rows, len(columns) - 1), order='F')
+    return TimeSeries(columns=columns, dates=None, timestamps=timestamps, text=None, values=values)
+
+
+def convert_time_series(file_path: str, delimiter: str = ',', date_format: str = 'YYYY-MM-DD HH:mm:ss',
+                        output_path: str = None) -> str:
+    """
+    Converts a time series text file to a binary file, by default next to it with the
+    suffix `BINARY_SUFFIX`. Returns the path of the binary file.
+    """
+    if output_path is None:
+        output_path = os.path.splitext(file_path)[0] + BINARY_SUFFIX
+    write_binary_time_series(load_time_series(file_path, delimiter, date_format), output_path)
+    return output_path
+
+
+# (path, modification time, delimiter, date format) -> [time series, number of references]
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _cache_key(file_path: str, delimiter: str, date_format: str) -> tuple:
+    path = os.path.realpath(file_path)
+    return (path, os.stat(path).st_mtime_ns, delimiter, date_format)
+
+
+def acquire_time_series(file_path: str, delimiter: str = ',', date_format: str = 'YYYY-MM-DD HH:mm:ss') -> TimeSeries:
+    """
+    Returns the parsed time series of a file, parsing it only if no other model in the
+    process holds it. The arrays of the time series are read-only, since they are shared.
+    Every call must be paired with a call to `release_time_series`.
+    """
+    key = _cache_key(file_path, delimiter, date_format)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            series = load_time_series(file_path, delimiter, date_format)
+            for array in (series.dates, series.timestamps, series.text, series.values):
+                if array is not None:
+                    array.flags.writeable = False
+            entry = _cache[key] = [series, 0]
+        entry[1] += 1
+        return entry[0]
+
+
+def release_time_series(series: TimeSeries) -> None:
+    """
+    Releases a time series returned by `acquire_time_series`. It is removed from the
+    cache when no model holds it anymore.
+    """
+    with _cache_lock:
+        for key, entry in _cache.items():
+            if entry[0] is series:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del _cache[key]
+                return
+
+
+@contextlib.contextmanager
+def hold_time_series(models: list):
+    """
+    Keeps the time series of the CSV models in the cache while the context is
+    active, so that simulations run one after another parse each file only once.
+
+    Parameters
+    ----------
+    models: list
+        Models as defined in the configuration file.
+    """
+    held = []
+    try:
+        for model in models:
+            parameters = model.get('parameters') or {}
+            if model.get('type') != 'CSV':
+                continue
+            file_paths = parameters.get('file_path')
+            for file_path in file_paths if isinstance(file_paths, list) else [file_paths]:
+                held.append(acquire_time_series(file_path, parameters.get('delimiter'), parameters.get('date_format')))
+        yield
+    finally:
+        for series in held:
+            release_time_series(series)
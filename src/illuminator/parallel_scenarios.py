@@ -1,19 +1,37 @@
-from illuminator.engine import Simulation
+from illuminator.engine import Simulation, compute_mosaik_end_time
+from illuminator.models.time_series import hold_time_series
+from illuminator.runner import ScenarioRunner
+from illuminator.sampling import refine, sample_indices
+from illuminator.scenario_cache import ScenarioCache, scenario_hash
 from illuminator.schema.simulation import load_config_file
-from mpi4py import MPI
 from ruamel.yaml import YAML
-from typing import List, Any
+from typing import Callable, List, Any
+import collections
+import concurrent.futures
+import contextlib
+import functools
+import importlib
 import itertools
 import os
 import csv
 import copy
+import datetime
+import time
 
-def run_parallel(simlist: List[Simulation], create_scenario_files: bool = False):
+# MPI message tags of the dynamic schedule
+TAG_READY = 1  # worker -> rank 0: status of the previous task, ready for the next one
+TAG_TASK = 2  # rank 0 -> worker: index of the next task, None when there is no work left
+
+BACKENDS = ('mpi', 'processes')
+
+def run_parallel(simlist: List[Simulation], create_scenario_files: bool = False, schedule: str = 'static',
+                 backend: str = 'mpi', workers: int = None, warm: bool = True):
     """
-    Distributes and runs a list of Simulation objects in parallel using MPI.
+    Distributes and runs a list of Simulation objects in parallel using MPI or a pool
+    of local processes.
 
-    Each simulation in the list is executed on an MPI rank. Optionally, scenario 
-    configuration files can be generated for each simulation.
+    With the MPI backend, each simulation in the list is executed on an MPI rank.
+    Optionally, scenario configuration files can be generated for each simulation.
 
     Parameters
     ----------
@@ -26,84 +44,749 @@ def run_parallel(simlist: List[Simulation], create_scenario_files: bool = False)
         If True, a YAML file containing the simulation configuration will be written 
         for each simulation. Default is False.
 
+    schedule : str, optional
+        'static' (default) splits the list in equal parts, one per rank. 'dynamic' lets
+        rank 0 hand out simulations to the other ranks when they are idle, the longest
+        expected simulations first. See `_run_dynamic`. Only used by the MPI backend.
+
+    backend : str, optional
+        'mpi' (default) runs the simulations on the ranks of MPI.COMM_WORLD. 'processes'
+        runs them in a pool of local processes and does not require MPI, see `_run_pool`.
+
+    workers : int, optional
+        Number of processes of the 'processes' backend, by default the number of CPUs.
+
+    warm : bool, optional
+        If True (default), every process runs its simulations one after another on a
+        warm world, reusing the models of the previous simulation, see
+        `illuminator.runner`. If False, every simulation creates a new Mosaik world.
+
+    Returns
+    -------
+    List[dict]
+        With the dynamic schedule or the processes backend, the completion status of
+        every simulation on rank 0, see `_run_task`. Otherwise, an empty list.
+
     Notes
     -----
-    - Scenario files are named by taking the simulation's `_results_file` path, 
+    - Scenario files are named by taking the simulation's monitor file path, 
       removing the extension, and appending "_simconfig.yaml".
     """
-    
-    rank = MPI.COMM_WORLD.Get_rank()        # id of the MPI process executing this function
-    comm_size = MPI.COMM_WORLD.Get_size()   # number of MPI processes
+    _check_backend(backend, workers)
+    models = [model for sim in simlist for model in sim.config['models']]
+    costs = [_expected_cost(sim.config) for sim in simlist]
+
+    if backend == 'processes':
+        run = functools.partial(_run_simulation, create_scenario_files=create_scenario_files, warm=warm)
+        return _run_pool(simlist, run, costs, models, workers)
+
+    comm = _comm_world()
+    rank = comm.Get_rank()        # id of the MPI process executing this function
+    comm_size = comm.Get_size()   # number of MPI processes
+    run = functools.partial(_run_simulation, create_scenario_files=create_scenario_files, rank=rank, warm=warm)
+
+    if schedule == 'dynamic':
+        with hold_time_series(models):
+            return _run_dynamic(simlist, run, costs)
 
     # Distribute simulations among MPI processes
     subset = _get_list_subset(simlist, rank, comm_size)
 
-    for sim in subset:
-        # Run the simulation
-        sim.run()
+    # input files are parsed once per process and shared by the simulations of the subset
+    with hold_time_series([model for sim in subset for model in sim.config['models']]):
+        for sim in subset:
+            run(sim)
 
-        # Write scenario configuration YAML file
-        if create_scenario_files:
-            scenariofile = os.path.splitext(sim._results_file)[0] # _results_file without extension
-            scenariofile.append("_simconfig.yaml")
-            yaml = YAML()  
-            with open(scenariofile, 'w') as f:
-                yaml.dump(sim.config, f)
-            print(f"[Rank {rank}] created {scenariofile}")
+    return []
 
-    return
 
+def run_parallel_file(scenario_file: str, schedule: str = 'static', backend: str = 'mpi', workers: int = None,
+                      create_scenario_files: bool = False, result_store: str = None, cache: str = None,
+                      warm: bool = True):
+    """
+    Runs all combinations of the multi_parameters of a scenario file in parallel using MPI
+    or a pool of local processes.
 
-def run_parallel_file(scenario_file: str):
-    rank = MPI.COMM_WORLD.Get_rank()        # id of the MPI process executing this function
-    comm_size = MPI.COMM_WORLD.Get_size()   # number of MPI processes
+    The scenario file is read and validated once. The scenario of each combination is
+    generated from it in memory and passed to `Simulation` directly.
 
-    # Check if yaml has correct the correct format and syntax
-    _ = load_config_file(scenario_file)
+    By default, every combination of the multi_parameters is run (or the aligned ones,
+    with 'align_parameters'). With a 'sampling' section in 'scenario', a sample of the
+    combinations is run instead, see `illuminator.sampling`.
+
+    Parameters
+    ----------
+    scenario_file : str
+        Path to the scenario file.
+    schedule : str, optional
+        'static' (default) splits the combinations in equal parts, one per rank. 'dynamic'
+        lets rank 0 hand out combinations to the other ranks when they are idle. Only used
+        by the MPI backend.
+    backend : str, optional
+        'mpi' (default) runs the combinations on the ranks of MPI.COMM_WORLD. 'processes'
+        runs them in a pool of local processes and does not require MPI.
+    workers : int, optional
+        Number of processes of the 'processes' backend, by default the number of CPUs.
+    create_scenario_files : bool, optional
+        If True, the scenario of each combination is written next to the scenario file
+        as `<scenario_file>_<simulationID>.yaml`. Default is False.
+    result_store : str, optional
+        If given, the results of all combinations are gathered with their parameter
+        values in a Parquet dataset in this directory, partitioned by simulationID,
+        after all combinations have run. See `illuminator.result_store`.
+    cache : str, optional
+        If given, a directory in which the results of completed combinations are kept,
+        identified by a hash of their scenario and input files. Combinations found in the
+        cache, e.g. when a sweep is run again after it was interrupted, are not run again:
+        their results are copied from the cache. See `illuminator.scenario_cache`.
+    warm : bool, optional
+        If True (default), every process runs its combinations one after another on a
+        warm world, reusing the models of the previous combination, see
+        `illuminator.runner`. If False, every combination creates a new Mosaik world.
+
+    Returns
+    -------
+    List[dict]
+        With the dynamic schedule or the processes backend, the completion status of every
+        combination on rank 0. Otherwise, an empty list.
+    """
+    _check_backend(backend, workers)
+    if backend == 'processes':
+        rank, comm_size = None, workers or os.cpu_count()
+    else:
+        comm = _comm_world()
+        rank = comm.Get_rank()        # id of the MPI process executing this function
+        comm_size = comm.Get_size()   # number of MPI processes
+    main_process = rank in (0, None)
+
+    # Check if yaml has correct the correct format and syntax. The generated scenarios
+    # only differ from it in the values of parameters, so they are not validated again.
+    config = load_config_file(scenario_file)
     
-    # Load base configuration and remove parallel items
-    base_config, removed_items = _remove_scenario_parallel_items(scenario_file)
+    # Remove parallel items from the base configuration
+    base_config, removed_items = _split_parallel_items(config)
     
     # Check which type of combination
+    sampling = base_config.get("scenario", {}).get("sampling")
     align_parameters = base_config.get("scenario", {}).get("align_parameters")
     if align_parameters is None:
         align_parameters = False
-        if rank == 0:
+        if main_process and sampling is None:
             print("Warning: 'align_parameters' is missing in 'scenario'. Setting it to False.")
 
-    # Get list of parallel-item combinations:
-    combinations = _generate_combinations_from_removed_items(removed_items, align_parameters)
-    if rank == 0:
-        print("Running ", len(combinations), "different scenarios across ", comm_size, " processes." )
-        # Write lookup table
-        outputdir = os.path.dirname(base_config.get("monitor", {}).get("file"))
-        lookuptablefile = os.path.join(outputdir, "scenariotable.csv")
-        _write_lookup_table(combinations, str(lookuptablefile))
-
-    # Get the rank's subset of the list
-    subset = _get_list_subset(combinations, rank, comm_size)
+    outputdir = os.path.dirname(base_config.get("monitor", {}).get("file"))
+    lookuptablefile = os.path.join(outputdir, "scenariotable.csv")
 
-    # Split the filename and extension
-    cf_base, cf_ext = os.path.splitext(scenario_file)
-
-    # For each item in the subset:
+    # For each combination:
     # 1. generate scenario
-    # 2. write scenario to file
+    # 2. optionally, write scenario to file
     # 3. run simulation
-    for s in subset:
-        scenario = _generate_scenario(base_config, s)
-        sim_number = s.get("simulationID")
+    scenario_cache = ScenarioCache(cache) if cache is not None else None
+    run = functools.partial(_run_combination, base_config, scenario_file, rank=rank,
+                            create_scenario_files=create_scenario_files, cache=scenario_cache, warm=warm)
+    models = base_config.get("models", [])
+
+    def run_combinations(combinations: List[dict]) -> List[dict]:
+        costs = [_expected_cost(base_config)] * len(combinations)
+        if backend == 'processes':
+            return _run_pool(combinations, run, costs, models, workers)
+
+        # input files are parsed once per process and shared by the simulations it runs
+        with hold_time_series(models):
+            if schedule == 'dynamic':
+                statuses = _run_dynamic(combinations, run, costs)
+            else:
+                # Get the rank's subset of the list
+                for s in _get_list_subset(combinations, rank, comm_size):
+                    run(s)
+                statuses = []
+        comm.Barrier()  # wait until all ranks finished their combinations
+        return statuses
+
+    if sampling is not None and sampling["method"] == "adaptive":
+        combinations, statuses = _run_adaptive(base_config, removed_items, sampling, run_combinations,
+                                               lookuptablefile if main_process else None)
+    else:
+        # Get list of parallel-item combinations:
+        if sampling is not None:
+            combinations = _sample_combinations(removed_items, sampling)
+        else:
+            combinations = _generate_combinations_from_removed_items(removed_items, align_parameters)
+        if main_process:
+            print("Running ", len(combinations), "different scenarios across ", comm_size, " processes." )
+            # Write lookup table
+            _write_lookup_table(combinations, str(lookuptablefile))
+        statuses = run_combinations(combinations)
+
+    if result_store is not None and main_process:
+        _write_result_store(base_config, combinations, result_store)
+    return statuses
+
+
+def _sample_combinations(removed_items, sampling: dict, indices: list = None, first_id: int = 1) -> List[dict]:
+    """
+    Generates combinations of the values of removed_items with a sampling design (see
+    `illuminator.sampling`), in the format of `_generate_combinations_from_removed_items`.
+
+    Args:
+        removed_items (list of tuples): 
+            Each tuple is (model_name, 'parameter', key, list_of_values)
+        sampling (dict): The 'sampling' section of the scenario: 'method', 'samples' and
+            optionally 'seed'.
+        indices (list, optional): Level indices of the combinations, instead of sampling them.
+        first_id (int, optional): simulationID of the first combination.
+
+    Returns:
+        List[dict]: One dictionary per sampled combination, at most 'samples'.
+    """
+    keys = [(model, kind, param_key) for model, kind, param_key, _ in removed_items]
+    value_lists = [values for *_, values in removed_items]
+    if indices is None:
+        indices = sample_indices([len(values) for values in value_lists], sampling["method"],
+                                 sampling["samples"], sampling.get("seed"))
+
+    result = []
+    for simnum, combo in enumerate(indices, start=first_id):
+        combo_dict = {key: values[i] for key, values, i in zip(keys, value_lists, combo)}
+        combo_dict['simulationID'] = simnum
+        result.append(combo_dict)
+    return result
+
+
+def _run_adaptive(base_config: dict, removed_items, sampling: dict, run_combinations: Callable,
+                  lookuptablefile: str = None):
+    """
+    Runs combinations in rounds: a Latin hypercube of 'initial_samples' combinations, then
+    batches of 'batch' combinations proposed by `illuminator.sampling.refine` from the mean
+    of the monitored item 'output' of every combination, until 'samples' combinations have
+    run or no new combination is proposed. All ranks compute the same rounds.
+
+    Returns:
+        The combinations that were run and their completion statuses.
+    """
+    if "output" not in sampling:
+        raise ValueError("Adaptive sampling requires 'output' in 'sampling': the monitored item "
+                         "whose mean is refined, e.g. 'Battery1.soc'")
+    budget = sampling["samples"]
+    initial = sampling.get("initial_samples", max(2, budget // 4))
+    batch = sampling.get("batch", initial)
+    levels = [len(values) for *_, values in removed_items]
+
+    indices = sample_indices(levels, "latin_hypercube", min(initial, budget), sampling.get("seed"))
+    sampled, combinations, responses, statuses = [], [], [], []
+    while indices:
+        new_combinations = _sample_combinations(removed_items, sampling, indices, first_id=len(combinations) + 1)
+        sampled += indices
+        combinations += new_combinations
+        if lookuptablefile is not None:
+            print(f"Running {len(new_combinations)} scenarios, {len(combinations)} of at most {budget}")
+            _write_lookup_table(combinations, str(lookuptablefile))
+        for status in run_combinations(new_combinations):
+            status['index'] += len(combinations) - len(new_combinations)
+            statuses.append(status)
+        responses += [_mean_output(_scenario_monitor_file(base_config, s["simulationID"]), sampling["output"])
+                      for s in new_combinations]
+        indices = refine(levels, sampled, responses, min(batch, budget - len(combinations)))
+    return combinations, statuses
+
+
+def _mean_output(monitor_file: str, item: str) -> float:
+    """Returns the mean of a monitored item over time, NaN if the results are missing."""
+    from illuminator.result_store import read_monitor_file
+    try:
+        return float(read_monitor_file(monitor_file)[item].astype(float).mean())
+    except (OSError, KeyError, ValueError):
+        return float("nan")
+
+
+def _write_result_store(base_config: dict, combinations: List[dict], store: str) -> None:
+    """Gathers the monitor files of the combinations of `run_parallel_file` in a result store."""
+    from illuminator.result_store import write_result_store
+
+    scenarios = [{'simulationID': s['simulationID'],
+                  'file': _scenario_monitor_file(base_config, s['simulationID']),
+                  'parameters': {".".join(key): value for key, value in s.items() if key != 'simulationID'}}
+                 for s in combinations]
+    written = write_result_store(store, scenarios)
+    print(f"Wrote the results of {written} scenarios to {store}")
+
+
+def run_time_parallel(config: dict, windows: int, backend: str = 'processes', workers: int = None,
+                      engine: str = 'mosaik', tolerance: float = 1e-6, max_iterations: int = None) -> dict:
+    """
+    Runs a simulation as consecutive time windows in parallel, and reconciles the states
+    at the window boundaries with iterative warm-start passes.
+
+    In the first pass, every window starts from the initial states of the configuration.
+    In every following pass, the windows whose initial states changed are run again,
+    starting from the final states of the previous window in the last pass. The passes
+    stop when no initial state changes by more than `tolerance`. After at most `windows`
+    passes, every window starts from the exact final states of the previous one, as in a
+    serial run. The results of the windows are then joined in the monitor file.
+
+    The states handed from one window to the next are the `states` of the models and the
+    attributes that are connected with `time_shifted`, as declared in the configuration.
+    Batched models and models that keep other information between steps are not handed
+    off, and models that depend on the step number rather than on the date see the step
+    number restart in every window.
+
+    Parameters
+    ----------
+    config : dict
+        A valid simulation configuration, e.g. `Simulation.config`.
+    windows : int
+        Number of time windows.
+    backend : str, optional
+        'processes' (default) runs the windows in a pool of local processes, 'mpi' on
+        the ranks of MPI.COMM_WORLD (all ranks must call this function).
+    workers : int, optional
+        Number of processes of the 'processes' backend, by default the number of CPUs.
+    engine : str, optional
+        Engine that runs every window, see `Simulation.run`.
+    tolerance : float, optional
+        Largest change of a numerical initial state that is considered converged.
+    max_iterations : int, optional
+        Maximum number of passes, by default `windows`.
+
+    Returns
+    -------
+    dict
+        A convergence report: the number of 'windows' and 'iterations', whether the states
+        'converged', and per pass ('history') the windows that ran and the largest change
+        of an initial state.
+    """
+    _check_backend(backend, workers)
+    if windows < 1:
+        raise ValueError(f"'windows' must be a positive integer, got {windows}")
+    max_iterations = max_iterations or windows
+
+    scenario = config['scenario']
+    time_resolution = scenario.get('time_resolution', 900)
+    start = datetime.datetime.strptime(scenario['start_time'], '%Y-%m-%d %H:%M:%S')
+    steps = compute_mosaik_end_time(scenario['start_time'], scenario['end_time'], time_resolution)
+    bounds = [round(i * steps / windows) for i in range(windows + 1)]
+    handoff = _handoff_items(config)
+    items = list(config['monitor']['items'])
+    output_format = config['monitor'].get('format', 'csv')
+    monitor_base, monitor_ext = os.path.splitext(config['monitor']['file'])
+
+    def window_config(i: int, initial: dict) -> dict:
+        window = copy.deepcopy(config)
+        window_start = start + datetime.timedelta(seconds=bounds[i] * time_resolution)
+        window_end = start + datetime.timedelta(seconds=bounds[i + 1] * time_resolution)
+        window['scenario']['start_time'] = window_start.strftime('%Y-%m-%d %H:%M:%S')
+        window['scenario']['end_time'] = window_end.strftime('%Y-%m-%d %H:%M:%S')
+        for model in window['models']:
+            parameters = model.get('parameters') or {}
+            if model['type'] == 'CSV' and 'start' in parameters:
+                # the offset of the data from the scenario start is kept
+                offset = datetime.datetime.strptime(parameters['start'], '%Y-%m-%d %H:%M:%S') - start
+                parameters['start'] = (window_start + offset).strftime('%Y-%m-%d %H:%M:%S')
+        for (section, model_name, key), value in initial.items():
+            model = next(m for m in window['models'] if m['name'] == model_name)
+            model[section][key] = value
+        window['monitor']['items'] = items + [item for item in handoff.values() if item not in items]
+        window['monitor']['file'] = f"{monitor_base}_window{i}{monitor_ext}"
+        return window
+
+    if backend == 'processes':
+        rank = None
+    else:
+        comm = _comm_world()
+        rank = comm.Get_rank()
+    main_process = rank in (0, None)
+    run = functools.partial(_run_window, engine=engine)
+    resources = contextlib.ExitStack()
+    if backend == 'processes':
+        # the processes of the pool are reused by all passes
+        pool = resources.enter_context(_create_pool(config['models'], workers))
+
+    def run_windows(configs: List[dict]) -> List[dict]:
+        if backend == 'processes':
+            return _run_pool(configs, run, [1] * len(configs), config['models'], pool=pool)
+        statuses = _run_dynamic(configs, run, [1] * len(configs))
+        comm.Barrier()  # wait until all windows of the pass finished
+        return statuses
+
+    guesses = [{key: _get_handoff_value(config, key) for key in handoff} for _ in range(windows)]
+    finals = [None] * windows
+    to_run = list(range(windows))
+    history = []
+    with resources:
+        while to_run:
+            configs = [window_config(i, guesses[i]) for i in to_run]
+            statuses = run_windows(configs)
+            failed = [to_run[status['index']] for status in statuses if status['status'] == 'failed']
+            if failed:
+                raise RuntimeError(f"Time windows {failed} failed: "
+                                   f"{[status['error'] for status in statuses if status['status'] == 'failed']}")
+            for i, window in zip(to_run, configs):
+                finals[i] = _read_final_values(window['monitor']['file'], handoff, output_format)
+
+            # the next pass starts every window from the final states of the previous one
+            changes = {}
+            for i in range(1, windows):
+                change = max((_change(guesses[i][key], finals[i - 1][key]) for key in handoff), default=0.0)
+                if change > tolerance:
+                    changes[i] = change
+                    guesses[i] = dict(finals[i - 1])
+            history.append({'iteration': len(history) + 1, 'windows': to_run,
+                            'max_change': max(changes.values(), default=0.0)})
+            if main_process:
+                print(f"Pass {len(history)}: ran windows {to_run}, largest change of an initial state: "
+                      f"{history[-1]['max_change']:.6g}")
+            to_run = sorted(changes)
+            if len(history) == max_iterations:
+                break
+
+    window_files = [window_config(i, {})['monitor']['file'] for i in range(windows)]
+    if main_process:
+        _join_windows(window_files, items, config['monitor']['file'], output_format)
+        for window_file in window_files:
+            os.remove(window_file)
+    report = {'windows': windows, 'iterations': len(history), 'converged': not to_run, 'history': history}
+    if main_process:
+        print(f"Time-parallel run {'converged' if report['converged'] else 'did not converge'} "
+              f"after {report['iterations']} passes over {windows} windows.")
+    return report
+
+
+def _run_window(config: dict, engine: str = 'mosaik') -> None:
+    """Runs a time window of `run_time_parallel`."""
+    Simulation(config).run(engine=engine)
+
+
+def _handoff_items(config: dict) -> dict:
+    """
+    Returns the values handed from a time window to the next one: a dictionary from
+    (section, model, key) of the configuration to the monitor item with the value.
+    The states of the models are handed off, and the inputs that receive values
+    from time-shifted connections, as their initial value.
+    """
+    handoff = {}
+    for model in config['models']:
+        if model.get('entities', 1) > 1 or model['type'] == 'CSV':
+            continue  # entities of batched models can not be set individually, CSV states come from the data
+        for state in model.get('states') or {}:
+            handoff[('states', model['name'], state)] = f"{model['name']}.{state}"
+    for connection in config.get('connections', []):
+        if connection.get('time_shifted', False):
+            to_model, to_attr = connection['to'].split('.')
+            if '[' not in connection['from'] + to_model:
+                handoff[('inputs', to_model, to_attr)] = connection['from']
+    return handoff
+
+
+def _get_handoff_value(config: dict, key: tuple):
+    section, model_name, attr = key
+    return next(m for m in config['models'] if m['name'] == model_name)[section][attr]
+
+
+def _parse_value(text: str):
+    """Converts a value written to a CSV monitor file back to a number or bool where possible."""
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return {'True': True, 'False': False}.get(text, text)
+
+
+def _read_window(monitor_file: str, output_format: str):
+    """Reads the results of a time window written in a binary format ('parquet' or 'arrow')."""
+    import pandas as pd
+    if output_format == 'parquet':
+        return pd.read_parquet(monitor_file).reset_index()
+    return pd.read_feather(monitor_file).reset_index()
+
+
+def _read_final_values(monitor_file: str, handoff: dict, output_format: str = 'csv') -> dict:
+    """Reads the values of the handoff items at the last step of a time window."""
+    if output_format == 'csv':
+        with open(monitor_file, 'r', newline='') as f:
+            rows = list(csv.reader(f))
+        header, last = rows[0], rows[-1]
+        return {key: _parse_value(last[header.index(item)]) for key, item in handoff.items()}
+    last = _read_window(monitor_file, output_format).iloc[-1]
+    return {key: last[item].item() for key, item in handoff.items()}
+
+
+def _change(old, new) -> float:
+    """Returns how much an initial state changed: the absolute difference of numbers,
+    and 0 or infinity for other values."""
+    try:
+        return abs(float(new) - float(old))
+    except (TypeError, ValueError):
+        return 0.0 if new == old else float('inf')
+
+
+def _join_windows(window_files: List[str], items: List[str], monitor_file: str, output_format: str = 'csv') -> None:
+    """Joins the results of the time windows in the monitor file, keeping only the monitored items."""
+    if output_format == 'csv':
+        # rows are copied as text, so the file is identical to the one of a serial run
+        with open(monitor_file, 'w', newline='') as out:
+            writer = csv.writer(out, lineterminator='\n')
+            for i, window_file in enumerate(window_files):
+                with open(window_file, 'r', newline='') as f:
+                    reader = csv.reader(f)
+                    header = next(reader)
+                    columns = [0] + [header.index(item) for item in items]
+                    if i == 0:
+                        writer.writerow([header[c] for c in columns])
+                    writer.writerows([row[c] for c in columns] for row in reader)
+        return
+
+    from illuminator.models.collector import create_result_writer
+    writer = create_result_writer(monitor_file, items, output_format)
+    for window_file in window_files:
+        df = _read_window(window_file, output_format)
+        writer.write(df['date'].to_numpy(), df[items].to_numpy())
+    writer.close()
+
+
+def _check_backend(backend: str, workers: int) -> None:
+    """Raises a ValueError for an unknown backend or an invalid number of workers."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', use one of {', '.join(BACKENDS)}")
+    if workers is not None and (not isinstance(workers, int) or workers < 1):
+        raise ValueError(f"'workers' must be a positive integer, got {workers}")
+
+
+def _comm_world():
+    """
+    Returns MPI.COMM_WORLD. mpi4py is imported when it is first needed, so that the
+    processes backend runs without an MPI installation.
+    """
+    from mpi4py import MPI
+    return MPI.COMM_WORLD
+
+
+def _process_name(rank: int = None) -> str:
+    """Names the process in messages: its MPI rank, or its process id in a pool."""
+    return f"Rank {rank}" if rank is not None else f"Worker {os.getpid()}"
+
+
+# the runner of the scenarios of this process, see `_run_scenario`
+_scenario_runner = None
+
+
+def _run_scenario(config: dict, warm: bool = True) -> None:
+    """Runs a scenario on the warm world of this process, or on a new Mosaik world if `warm` is False."""
+    global _scenario_runner
+    if not warm:
+        Simulation(config).run()
+        return
+    if _scenario_runner is None:
+        _scenario_runner = ScenarioRunner()
+    _scenario_runner.run(config)
 
-        # Serialize scenario into yaml file
+
+def _run_simulation(sim: Simulation, create_scenario_files: bool = False, rank: int = None,
+                    warm: bool = True) -> None:
+    """Runs a simulation of `run_parallel` and optionally writes its configuration."""
+    _run_scenario(sim.config, warm)
+
+    # Write scenario configuration YAML file
+    if create_scenario_files:
+        scenariofile = os.path.splitext(sim.config['monitor']['file'])[0] # monitor file without extension
+        scenariofile += "_simconfig.yaml"
+        yaml = YAML()  
+        with open(scenariofile, 'w') as f:
+            yaml.dump(sim.config, f)
+        print(f"[{_process_name(rank)}] created {scenariofile}")
+
+
+def _run_combination(base_config: dict, scenario_file: str, s: dict, rank: int = None,
+                     create_scenario_files: bool = False, cache: ScenarioCache = None, warm: bool = True) -> bool:
+    """Generates the scenario of a combination of `run_parallel_file`, optionally writes it
+    next to the scenario file, and runs it unless its results are in the cache.
+    Returns True if the results were copied from the cache."""
+    scenario = _generate_scenario(base_config, s)
+    sim_number = s.get("simulationID")
+
+    # Serialize scenario into yaml file
+    if create_scenario_files:
+        cf_base, cf_ext = os.path.splitext(scenario_file)
         scenariofile =  f"{cf_base}_{sim_number}{cf_ext}"
         yaml = YAML()  
         with open(scenariofile, 'w') as f:
             yaml.dump(scenario, f)
-        print(f"[Rank {rank}] Wrote scenario {sim_number} to {scenariofile}")
+        print(f"[{_process_name(rank)}] Wrote scenario {sim_number} to {scenariofile}")
+
+    # Copy the results of a completed run of the same scenario
+    if cache is not None:
+        key = scenario_hash(scenario)
+        if cache.restore(key, scenario["monitor"]["file"]):
+            print(f"[{_process_name(rank)}] Restored scenario {sim_number} from the cache")
+            return True
+
+    # Run simulation
+    _run_scenario(scenario, warm)
+
+    if cache is not None:
+        cache.store(key, scenario, scenario["monitor"]["file"])
+    return False
+
+
+def _expected_cost(config: dict) -> float:
+    """
+    Estimates the run time of a scenario as its number of time steps times its number of models.
+    """
+    scenario = config['scenario']
+    steps = compute_mosaik_end_time(scenario['start_time'], scenario['end_time'], scenario.get('time_resolution', 900))
+    return steps * len(config.get('models', []))
+
+
+def _run_task(task: Any, index: int, run: Callable[[Any], None], rank: int = None) -> dict:
+    """
+    Runs a task and returns its completion status: a dictionary with the index of the task,
+    the MPI rank (None in a process pool) and the process id that ran it, 'status' ('done'
+    or 'failed'), the 'error' if it failed, whether the results were 'cached' (`run`
+    returned True) and the run time in 'seconds'.
+    """
+    start = time.perf_counter()
+    try:
+        cached = run(task)
+    except (Exception, SystemExit) as e:  # the engine exits on invalid connections
+        print(f"[{_process_name(rank)}] Task {index} failed: {e!r}")
+        status = {'status': 'failed', 'error': repr(e), 'cached': False}
+    else:
+        status = {'status': 'done', 'error': None, 'cached': bool(cached)}
+    return {'index': index, 'rank': rank, 'pid': os.getpid(), **status, 'seconds': time.perf_counter() - start}
+
+
+def _report(statuses: List[dict], name: str) -> List[dict]:
+    """Sorts the completion statuses by task index and prints how many tasks failed."""
+    statuses.sort(key=lambda status: status['index'])
+    failed = [status['index'] for status in statuses if status['status'] == 'failed']
+    cached = sum(status.get('cached', False) for status in statuses)
+    print(f"[{name}] Completed {len(statuses) - len(failed)} of {len(statuses)} tasks"
+          + (f" ({cached} from the cache)." if cached else ".")
+          + (f" Failed: {failed}" if failed else ""))
+    return statuses
+
+
+def _longest_first(costs: List[float]) -> List[int]:
+    """Returns the task indices sorted by expected cost, longest first, keeping the order of equal costs."""
+    return sorted(range(len(costs)), key=lambda i: costs[i], reverse=True)
+
+
+def _run_dynamic(tasks: List[Any], run: Callable[[Any], None], costs: List[float], comm=None) -> List[dict]:
+    """
+    Runs tasks with a master/worker schedule. Rank 0 keeps a queue of the tasks, sorted by
+    their expected cost (longest first), and sends the next task to a worker whenever the
+    worker reports the status of its previous task. With a single process, all tasks are
+    run by rank 0.
+
+    Parameters
+    ----------
+    tasks : List[Any]
+        The tasks, identical on all ranks. Only their indices are communicated.
+    run : Callable
+        Runs a single task.
+    costs : List[float]
+        The expected cost of each task.
+    comm : MPI.Comm, optional
+        The communicator, MPI.COMM_WORLD by default.
+
+    Returns
+    -------
+    List[dict]
+        On rank 0, the completion status of every task ordered by index (see `_run_task`).
+        On the other ranks, an empty list.
+    """
+    from mpi4py import MPI
+    comm = comm or MPI.COMM_WORLD
+    rank = comm.Get_rank()
+    comm_size = comm.Get_size()
+    queue = collections.deque(_longest_first(costs))
+
+    if comm_size == 1:
+        statuses = [_run_task(tasks[i], i, run, rank) for i in queue]
+    elif rank == 0:
+        statuses = []
+        active_workers = comm_size - 1
+        while active_workers:
+            mpi_status = MPI.Status()
+            report = comm.recv(source=MPI.ANY_SOURCE, tag=TAG_READY, status=mpi_status)
+            if report is not None:
+                statuses.append(report)
+            if queue:
+                comm.send(queue.popleft(), dest=mpi_status.Get_source(), tag=TAG_TASK)
+            else:
+                comm.send(None, dest=mpi_status.Get_source(), tag=TAG_TASK)  # no work left, stop the worker
+                active_workers -= 1
+    else:
+        report = None
+        while True:
+            comm.send(report, dest=0, tag=TAG_READY)
+            index = comm.recv(source=0, tag=TAG_TASK)
+            if index is None:
+                return []
+            report = _run_task(tasks[index], index, run, rank)
+
+    return _report(statuses, _process_name(rank))
+
+
+# resources that the worker processes of a pool keep while they are alive
+_worker_resources = contextlib.ExitStack()
+
+
+def _init_worker(models: List[dict]) -> None:
+    """
+    Prepares a process of the pool: the modules of the models are imported and the input
+    files of the models are parsed once, and reused by all the tasks that the process runs.
+    """
+    registry = importlib.import_module('illuminator.models')
+    for model in models:
+        try:
+            getattr(registry, model['type'])
+        except (AttributeError, ImportError):
+            pass  # the error is reported by the tasks that use the model
+    try:
+        _worker_resources.enter_context(hold_time_series(models))
+    except (OSError, ValueError):
+        pass  # the error is reported by the tasks that read the files
 
-        # Run simulation
-        simulation = Simulation(scenariofile)
-        simulation.run()
+
+def _create_pool(models: List[dict], workers: int = None) -> concurrent.futures.ProcessPoolExecutor:
+    """Creates a pool of at most `workers` processes prepared by `_init_worker`."""
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(models,))
+
+
+def _run_pool(tasks: List[Any], run: Callable[[Any], None], costs: List[float], models: List[dict],
+              workers: int = None, pool: concurrent.futures.ProcessPoolExecutor = None) -> List[dict]:
+    """
+    Runs tasks in a pool of local processes, at most `workers` at a time (by default
+    the number of CPUs). Tasks are submitted longest expected first, and a process
+    runs a new task as soon as it finishes the previous one.
+
+    Parameters
+    ----------
+    tasks : List[Any]
+        The tasks, they must be picklable.
+    run : Callable
+        Runs a single task, it must be picklable (a module-level function).
+    costs : List[float]
+        The expected cost of each task.
+    models : List[dict]
+        The models of the tasks, see `_init_worker`.
+    workers : int, optional
+        Maximum number of processes.
+    pool : concurrent.futures.ProcessPoolExecutor, optional
+        A pool created by `_create_pool` to reuse for several calls, instead of a new one.
+
+    Returns
+    -------
+    List[dict]
+        The completion status of every task ordered by index (see `_run_task`).
+    """
+    if pool is None:
+        with _create_pool(models, workers) as pool:
+            return _run_pool(tasks, run, costs, models, workers, pool)
+    futures = [pool.submit(_run_task, tasks[i], i, run) for i in _longest_first(costs)]
+    statuses = [future.result() for future in futures]
+    return _report(statuses, 'Pool')
 
 
 def _remove_scenario_parallel_items(yaml_file_path: str):
@@ -124,6 +807,22 @@ def _remove_scenario_parallel_items(yaml_file_path: str):
     with open(yaml_file_path, 'r') as f:
         yaml_data = yaml_parser.load(f)
 
+    return _split_parallel_items(yaml_data)
+
+
+def _split_parallel_items(yaml_data: dict):
+    """
+    Removes the multi_parameters sections of the models of a configuration, in place.
+    See `_remove_scenario_parallel_items`.
+
+    Args:
+        yaml_data (dict): The configuration, e.g. as returned by `load_config_file`.
+
+    Returns:
+        cleaned_data (dict): The configuration without multi_parameters.
+        removed_items (list of tuples): List of removed items in format 
+            (model_name, 'parameter', key, value)
+    """
     removed_items = []
 
     for model in yaml_data.get('models', []):
@@ -259,9 +958,9 @@ def _generate_scenario(base_config: dict, item_to_add: dict):
     """
     new_config = copy.deepcopy(base_config)
 
-    # Remove align_parameters from base_config
-    if 'align_parameters' in new_config['scenario']:
-        new_config['scenario'].pop('align_parameters')
+    # Remove align_parameters and sampling from base_config
+    new_config['scenario'].pop('align_parameters', None)
+    new_config['scenario'].pop('sampling', None)
 
     # Add item_to_add to the correct model
     for key, value in item_to_add.items():
@@ -284,13 +983,18 @@ def _generate_scenario(base_config: dict, item_to_add: dict):
     simID = item_to_add.get('simulationID')
     if simID is None:
         raise ValueError(f"simulationID is missing in combination: {item_to_add}")
-    outputfile = new_config.get("monitor", {}).get("file")
-    of_base, of_ext = os.path.splitext(outputfile)
-    new_config["monitor"]["file"] = f"{of_base}_{simID}{of_ext}"
+    new_config["monitor"]["file"] = _scenario_monitor_file(base_config, simID)
         
     return new_config
 
 
+def _scenario_monitor_file(base_config: dict, simID: int) -> str:
+    """Returns the monitor file of a scenario: the file of the base configuration with the simulation ID appended."""
+    outputfile = base_config.get("monitor", {}).get("file")
+    of_base, of_ext = os.path.splitext(outputfile)
+    return f"{of_base}_{simID}{of_ext}"
+
+
 def _write_lookup_table(simulation_list: List[dict], filepath: str):
     """
     Writes a CSV file mapping each simulation ID to the combination of parameter values used.
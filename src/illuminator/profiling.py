@@ -0,0 +1,185 @@
+"""
+Opt-in timing of the models of a simulation, to find the models that dominate a run::
+
+    simulation.run(profile='profile.json')
+
+While a profiler is active, every model built on `ModelConstructor` and the
+in-process collector time their calls of `step` and `get_data`, and the models also
+their calls of `unpack_inputs` and `set_outputs` (which are part of their `step`).
+The number of calls, the total, mean and 99th percentile wall time of every method
+are summarized per model name. The durations are not kept: the percentile is
+estimated from a histogram of fixed size (see `Timing`), so the memory used by the
+profiler does not grow with the length of the run. Simulators in other processes,
+such as the default collector with Mosaik, are not timed.
+"""
+
+import contextlib
+import functools
+import json
+import math
+import time
+
+# methods timed by `instrument`, if the simulator has them
+METHODS = ('step', 'get_data', 'unpack_inputs', 'set_outputs')
+
+# the histogram of `Timing` has BUCKETS_PER_DECADE logarithmic buckets per decade from
+# 10**MIN_DECADE to 10**MAX_DECADE seconds, the estimated percentiles are within 1.2 %
+BUCKETS_PER_DECADE = 100
+MIN_DECADE = -7
+MAX_DECADE = 3
+
+# the profiler of the running simulation, see `profile_steps`
+_active = None
+
+
+class Timing:
+    """
+    The statistics of the calls of a method, in constant memory however many calls
+    are recorded: their number, total and longest duration, and a histogram of the
+    durations with logarithmic buckets for the percentiles.
+
+    Attributes
+    ----------
+    calls : int
+        Number of calls.
+    total : float
+        Total duration of the calls in seconds.
+    longest : float
+        Longest duration of a call in seconds.
+    buckets : list
+        Number of calls per bucket of durations. The first bucket counts the calls
+        shorter than 10**MIN_DECADE seconds, the last one those longer than
+        10**MAX_DECADE seconds.
+    """
+    __slots__ = ('calls', 'total', 'longest', 'buckets')
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total = 0.0
+        self.longest = 0.0
+        self.buckets = [0] * ((MAX_DECADE - MIN_DECADE) * BUCKETS_PER_DECADE + 2)
+
+    def add(self, seconds: float) -> None:
+        """Adds the duration of a call."""
+        self.calls += 1
+        self.total += seconds
+        self.longest = max(self.longest, seconds)
+        if seconds > 0:
+            bucket = math.floor((math.log10(seconds) - MIN_DECADE) * BUCKETS_PER_DECADE) + 1
+            self.buckets[min(max(bucket, 0), len(self.buckets) - 1)] += 1
+        else:
+            self.buckets[0] += 1
+
+    def percentile(self, q: float) -> float:
+        """
+        Returns an estimate of the `q`-th percentile of the durations in seconds: the
+        geometric center of the bucket that contains it, at most the longest duration.
+        """
+        rank = math.ceil(q / 100 * (self.calls - 1))  # calls before the percentile
+        for bucket, count in enumerate(self.buckets):
+            rank -= count
+            if rank < 0:
+                break
+        if bucket == len(self.buckets) - 1:
+            return self.longest  # longer than the histogram
+        center = 10 ** (MIN_DECADE + (bucket - 0.5) / BUCKETS_PER_DECADE)
+        return min(center, self.longest)
+
+
+class StepProfiler:
+    """
+    Collects the wall time of the calls of the methods of the models.
+
+    Attributes
+    ----------
+    timings : dict
+        The `Timing` of the calls, by model name and method.
+    types : dict
+        The type of every model name.
+    """
+
+    def __init__(self) -> None:
+        self.timings = {}
+        self.types = {}
+
+    def record(self, model: str, method: str, seconds: float) -> None:
+        """Adds the duration of a call."""
+        methods = self.timings.setdefault(model, {})
+        if method not in methods:
+            methods[method] = Timing()
+        methods[method].add(seconds)
+
+    def summary(self) -> dict:
+        """
+        Returns the statistics of every model and method: a dictionary from model name to
+        its 'type' and, per method, the number of 'calls' and the 'total', 'mean' and
+        'p99' (99th percentile, estimated, see `Timing`) wall time in seconds. Models are
+        sorted by the total time of their steps, the slowest first.
+        """
+        summary = {}
+        for model, methods in self.timings.items():
+            summary[model] = {'type': self.types.get(model)}
+            for method in (method for method in METHODS if method in methods):
+                timing = methods[method]
+                summary[model][method] = {'calls': timing.calls,
+                                          'total': timing.total,
+                                          'mean': timing.total / timing.calls,
+                                          'p99': timing.percentile(99)}
+        step_time = lambda item: item[1].get('step', {}).get('total', 0.0)
+        return dict(sorted(summary.items(), key=step_time, reverse=True))
+
+    def table(self) -> str:
+        """Returns the summary as a text table, one row per model and method."""
+        header = f"{'model':<24} {'method':<14} {'calls':>8} {'total [s]':>10} {'mean [ms]':>10} {'p99 [ms]':>10}"
+        lines = [header, '-' * len(header)]
+        for model, methods in self.summary().items():
+            for method, stats in methods.items():
+                if method != 'type':
+                    lines.append(f"{model:<24} {method:<14} {stats['calls']:>8} {stats['total']:>10.3f} "
+                                 f"{stats['mean'] * 1000:>10.3f} {stats['p99'] * 1000:>10.3f}")
+        return '\n'.join(lines)
+
+    def write(self, file_path: str, **info) -> None:
+        """Writes the summary to a JSON file, with the `info` items (e.g. the scenario name) at the top level."""
+        with open(file_path, 'w', encoding='utf-8') as profile_file:
+            json.dump({**info, 'models': self.summary()}, profile_file, indent=2)
+
+
+@contextlib.contextmanager
+def profile_steps():
+    """Activates a new `StepProfiler` for the simulators constructed in the context, and yields it."""
+    global _active
+    previous, _active = _active, StepProfiler()
+    try:
+        yield _active
+    finally:
+        _active = previous
+
+
+def _timed(profiler: StepProfiler, model: str, method: str, function):
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler.record(model, method, time.perf_counter() - start)
+    return timed
+
+
+def instrument(simulator, model: str, model_type: str = None) -> None:
+    """
+    Times the calls of the `METHODS` of a simulator under the name `model`, if a
+    profiler is active. Called by the constructor of the simulator. Without an active
+    profiler, the timing of a previous run (of a reused simulator) is removed.
+    """
+    if _active is None:
+        for method in METHODS:
+            simulator.__dict__.pop(method, None)
+        return
+    _active.types[model] = model_type
+    for method in METHODS:
+        function = getattr(type(simulator), method, None)
+        if function is not None:
+            # an instance attribute, so that the simulators of other runs are not timed
+            setattr(simulator, method, _timed(_active, model, method, function.__get__(simulator)))
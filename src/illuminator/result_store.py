@@ -0,0 +1,137 @@
+"""
+A consolidated store for the results of parallel scenarios. The monitor files of
+all scenarios are gathered in a Parquet dataset partitioned by simulation ID, so
+that a sweep can be analysed by reading a single dataset, e.g.::
+
+    import pandas as pd
+    df = pd.read_parquet('results/store', columns=['Battery1.soc', 'PV1.parameter.peak_power'])
+
+Every row holds the timestamp ('date'), the monitored items, the parameter values
+of its scenario and its 'simulationID'. Requires the optional dependency `pyarrow`.
+"""
+
+import os
+import shutil
+import warnings
+import numbers
+import pandas as pd
+
+# index of the scenarios in the store, ignored when the store is read as a dataset
+SCENARIO_INDEX = '_scenarios.parquet'
+
+
+def _require_pyarrow() -> None:
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("A result store requires pyarrow. Install it with 'pip install pyarrow'.")
+
+
+def read_monitor_file(file_path: str) -> pd.DataFrame:
+    """
+    Reads the results written by the monitor in any of its formats ('csv', 'parquet'
+    or 'arrow'), as a data frame with a 'date' column and one column per item.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.parquet':
+        return pd.read_parquet(file_path).reset_index()
+    if extension in ('.arrow', '.feather'):
+        return pd.read_feather(file_path).reset_index()
+    return pd.read_csv(file_path, parse_dates=['date'])
+
+
+def _parameter_dtype(values: list) -> str:
+    """Returns a single column type for the values of a parameter across all scenarios."""
+    if all(isinstance(value, bool) for value in values):
+        return 'bool'
+    if all(isinstance(value, numbers.Integral) and not isinstance(value, bool) for value in values):
+        return 'int64'
+    if all(isinstance(value, numbers.Real) and not isinstance(value, bool) for value in values):
+        return 'float64'
+    return 'str'
+
+
+def write_result_store(store: str, scenarios: list) -> int:
+    """
+    Writes the results of a set of scenarios to a Parquet dataset, one partition
+    (`<store>/simulationID=<id>/results.parquet`) per scenario, and the parameters of
+    all scenarios to `<store>/_scenarios.parquet`. An existing store is replaced.
+
+    Parameters
+    ----------
+    store : str
+        Path to the directory of the store.
+    scenarios : list
+        One dictionary per scenario, with its 'simulationID', the monitor 'file' with
+        its results and its 'parameters' as a dictionary of column names and values.
+
+    Returns
+    -------
+    int
+        Number of scenarios written. Scenarios whose monitor file does not exist,
+        e.g. because they failed, are skipped with a warning.
+    """
+    _require_pyarrow()
+    if os.path.isdir(store):
+        shutil.rmtree(store)
+    os.makedirs(store)
+
+    names = list(dict.fromkeys(name for scenario in scenarios for name in scenario['parameters']))
+    dtypes = {name: _parameter_dtype([scenario['parameters'].get(name) for scenario in scenarios]) for name in names}
+
+    written = []
+    for scenario in scenarios:
+        if not os.path.exists(scenario['file']):
+            warnings.warn(f"Results of scenario {scenario['simulationID']} not found in {scenario['file']}, "
+                          "it is not added to the result store.")
+            continue
+        df = read_monitor_file(scenario['file'])
+        for column in df.columns:
+            if df[column].dtype.kind in 'iu':  # same type in all partitions, as in the binary monitor formats
+                df[column] = df[column].astype('float64')
+        for name in names:
+            df[name] = pd.Series([scenario['parameters'].get(name)] * len(df), dtype=dtypes[name])
+        partition = os.path.join(store, f"simulationID={scenario['simulationID']}")
+        os.makedirs(partition)
+        df.to_parquet(os.path.join(partition, 'results.parquet'), index=False)
+        written.append(scenario)
+
+    index = pd.DataFrame({'simulationID': [scenario['simulationID'] for scenario in written],
+                          'file': [scenario['file'] for scenario in written]})
+    for name in names:
+        index[name] = pd.Series([scenario['parameters'].get(name) for scenario in written], dtype=dtypes[name])
+    index.to_parquet(os.path.join(store, SCENARIO_INDEX), index=False)
+    return len(written)
+
+
+def read_result_store(store: str, columns: list = None, simulation_ids: list = None) -> pd.DataFrame:
+    """
+    Reads the results of a store written by `write_result_store`.
+
+    Parameters
+    ----------
+    store : str
+        Path to the directory of the store.
+    columns : list, optional
+        Columns to read, all by default. 'simulationID' is always included.
+    simulation_ids : list, optional
+        Scenarios to read, all by default. Only their partitions are read.
+
+    Returns
+    -------
+    pd.DataFrame
+        The results of the scenarios, one row per time step and scenario.
+    """
+    _require_pyarrow()
+    filters = [('simulationID', 'in', list(simulation_ids))] if simulation_ids is not None else None
+    if columns is not None:
+        columns = list(dict.fromkeys(['simulationID', *columns]))
+    df = pd.read_parquet(store, columns=columns, filters=filters)
+    df['simulationID'] = df['simulationID'].astype('int64')
+    return df.sort_values(['simulationID'], kind='stable').reset_index(drop=True)
+
+
+def read_scenario_index(store: str) -> pd.DataFrame:
+    """Reads the simulation IDs, monitor files and parameter values of the scenarios of a store."""
+    _require_pyarrow()
+    return pd.read_parquet(os.path.join(store, SCENARIO_INDEX))
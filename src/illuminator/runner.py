@@ -0,0 +1,110 @@
+"""
+A runner for many scenarios in the same process, e.g. the scenarios of a parameter
+sweep. Running a scenario with `Simulation.run` creates a new world, starts the
+collector in a separate process, instantiates every model and parses its input
+files. For scenarios of a few days, this takes longer than the simulation itself.
+
+A `ScenarioRunner` keeps a warm world of the direct engine (see
+`illuminator.direct`) between scenarios. The models are reset to the initial values
+of the next scenario (see `ModelConstructor.reset`) instead of being instantiated,
+and the time series of the input files stay parsed::
+
+    runner = ScenarioRunner()
+    for config in scenarios:
+        runner.run(config)
+    runner.close()
+
+Scenarios that the direct engine can not run, e.g. with event-based models, are run
+with Mosaik instead. Both give the same results.
+"""
+
+import contextlib
+import copy
+from illuminator.direct import DirectWorld, UnsupportedSimulatorError
+from illuminator.engine import Simulation, apply_default_values, collector_instance, generate_engine_configuration, \
+    results_in_memory, setup_world
+from illuminator.models.time_series import hold_time_series
+
+
+class ScenarioRunner:
+    """
+    Runs scenarios one after another on a warm world. Use it as a context manager, or
+    call `close` after the last scenario.
+
+    Attributes
+    ----------
+    runs : int
+        Number of scenarios run.
+    warm_runs : int
+        Number of scenarios that reused the simulators of a previous scenario.
+    """
+
+    def __init__(self) -> None:
+        self._world = None
+        self._held = contextlib.ExitStack()
+        self._unsupported = []  # simulator configurations that the direct engine can not run
+        self.runs = 0
+        self.warm_runs = 0
+
+    def __enter__(self) -> 'ScenarioRunner':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def run(self, config: dict, return_results: bool = False):
+        """
+        Runs a scenario, with the same results as `Simulation(config).run()`.
+
+        Parameters
+        ----------
+        config : dict
+            A valid scenario configuration, it is not modified.
+        return_results : bool
+            If True, the results are kept in memory and returned instead of written to
+            the monitor file, see `Simulation.run`.
+
+        Returns
+        -------
+        pandas.DataFrame or None
+            With `return_results`, the results of the scenario. Otherwise None.
+        """
+        # the models update the states of their definition while they run
+        config = apply_default_values(copy.deepcopy(config))
+        if return_results:
+            config = results_in_memory(config)
+        sim_config = generate_engine_configuration(config, 'direct')
+        self.runs += 1
+        if sim_config in self._unsupported:
+            return Simulation(config).run(return_results=return_results)
+
+        held = contextlib.ExitStack()
+        held.enter_context(hold_time_series(config['models']))
+        self._held.close()
+        self._held = held
+
+        time_resolution = config['scenario']['time_resolution']
+        if self._world is None:
+            self._world = DirectWorld(sim_config, time_resolution=time_resolution)
+        else:
+            self._world.reset(sim_config, time_resolution)
+        self._world._start_time = config['scenario']['start_time']
+
+        try:
+            until = setup_world(self._world, config)
+            collector = collector_instance(self._world)
+            self._world.run(until=until)
+        except UnsupportedSimulatorError:
+            self._world.finalize()  # release the files and time series of the simulators started so far
+            self._world = None
+            self._unsupported.append(sim_config)
+            return Simulation(config).run(return_results=return_results)
+        self.warm_runs += self._world.reused > 0
+        return collector.results() if return_results else None
+
+    def close(self) -> None:
+        """Releases the world and the time series of the last scenario."""
+        if self._world is not None:
+            self._world.finalize()
+            self._world = None
+        self._held.close()
@@ -0,0 +1,131 @@
+"""
+Sampling designs for parallel scenarios. Instead of running every combination of
+the values of the multi_parameters, a sample of the combinations is run:
+
+- 'random': values are drawn independently and uniformly.
+- 'latin_hypercube': every parameter is split in as many strata as samples, and
+  every stratum is sampled once.
+- 'sobol': a scrambled Sobol sequence (requires scipy).
+- 'adaptive': a Latin hypercube is refined with new samples between the samples
+  whose outputs differ the most, see `refine`.
+
+The values of a parameter are taken as ordered levels; samples in the unit
+hypercube are mapped to the index of a level, so that parameters with numbers,
+ranges or file names are sampled in the same way.
+"""
+
+import math
+import warnings
+import numpy as np
+
+METHODS = ('random', 'latin_hypercube', 'sobol', 'adaptive')
+
+
+def sample_unit(method: str, samples: int, dimensions: int, seed: int = None) -> np.ndarray:
+    """
+    Returns `samples` points of the unit hypercube [0, 1)^dimensions.
+
+    Parameters
+    ----------
+    method : str
+        'random', 'latin_hypercube' or 'sobol'.
+    samples : int
+        Number of points.
+    dimensions : int
+        Number of parameters.
+    seed : int, optional
+        Seed of the random generator, for reproducible designs.
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (samples, dimensions).
+    """
+    rng = np.random.default_rng(seed)
+    if method == 'random':
+        return rng.random((samples, dimensions))
+    if method == 'latin_hypercube':
+        strata = np.column_stack([rng.permutation(samples) for _ in range(dimensions)]) if dimensions else \
+            np.empty((samples, 0))
+        return (strata + rng.random((samples, dimensions))) / samples
+    if method == 'sobol':
+        try:
+            from scipy.stats import qmc
+        except ImportError:
+            raise ImportError("Sobol sampling requires scipy. Install it with 'pip install scipy' "
+                              "or use 'latin_hypercube'.")
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')  # balance warning when samples is not a power of 2
+            return qmc.Sobol(dimensions, scramble=True, seed=seed).random(samples)
+    raise ValueError(f"Unknown sampling method '{method}', use one of {', '.join(METHODS)}")
+
+
+def sample_indices(levels: list, method: str, samples: int, seed: int = None) -> list:
+    """
+    Samples combinations of levels. Returns at most `samples` distinct tuples with
+    the index of the selected level of every parameter, in the order they were drawn.
+
+    Parameters
+    ----------
+    levels : list
+        Number of levels (values) of every parameter.
+    """
+    if method == 'adaptive':
+        method = 'latin_hypercube'
+    points = sample_unit(method, samples, len(levels), seed)
+    indices = np.minimum((points * np.array(levels)).astype(int), np.array(levels) - 1)
+    return list(dict.fromkeys(tuple(int(i) for i in row) for row in indices))
+
+
+def refine(levels: list, sampled: list, responses: list, batch: int, neighbours: int = 3) -> list:
+    """
+    Proposes new combinations of levels where the output changes fastest. The rate
+    of change between every sample and its nearest sampled neighbours is the
+    difference of their responses divided by their distance (with the levels of
+    every parameter scaled to [0, 1]). New samples are placed halfway between the
+    pairs with the highest rate, until `batch` new combinations are found.
+
+    Parameters
+    ----------
+    levels : list
+        Number of levels of every parameter.
+    sampled : list
+        Level indices of the combinations that were run.
+    responses : list
+        Output of each sampled combination, NaN if it failed.
+    batch : int
+        Maximum number of new combinations.
+    neighbours : int, optional
+        Number of nearest neighbours of every sample that are compared.
+
+    Returns
+    -------
+    list
+        Level indices of the new combinations, an empty list if no new
+        combination lies between the samples.
+    """
+    valid = [i for i, response in enumerate(responses) if not math.isnan(response)]
+    if len(valid) < 2 or batch < 1:
+        return []
+    points = np.array([sampled[i] for i in valid], dtype=float)
+    values = np.array([responses[i] for i in valid], dtype=float)
+    scale = np.maximum(np.array(levels, dtype=float) - 1, 1)
+    distances = np.linalg.norm((points[:, None, :] - points[None, :, :]) / scale, axis=2)
+
+    pairs = {}
+    for i in range(len(points)):
+        for j in np.argsort(distances[i])[1:neighbours + 1]:
+            pair = (min(i, int(j)), max(i, int(j)))
+            if distances[pair] > 0:
+                pairs[pair] = abs(values[pair[0]] - values[pair[1]]) / distances[pair]
+
+    taken = set(map(tuple, sampled))
+    proposals = []
+    for (i, j), _ in sorted(pairs.items(), key=lambda item: item[1], reverse=True):
+        midpoint = tuple(int(index) for index in np.floor((points[i] + points[j]) / 2 + 0.5))
+        if midpoint not in taken:
+            taken.add(midpoint)
+            proposals.append(midpoint)
+            if len(proposals) == batch:
+                break
+    return proposals
@@ -0,0 +1,153 @@
+"""
+A cache of scenario results, used to resume and memoize parallel scenarios.
+
+Every scenario is identified by a hash of its configuration, the checksums of
+the input files it reads and the version of Illuminator. The results of a
+completed scenario are copied to the cache directory, next to a manifest entry::
+
+    <cache>/<hash>.json   # manifest entry: scenario, results file, completion time
+    <cache>/<hash>.csv    # copy of the monitor file (or .parquet, .arrow)
+
+A scenario with the same hash, in the same or in another sweep, is not run again:
+its results are copied from the cache to its monitor file.
+"""
+
+import copy
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import threading
+from importlib import metadata
+
+# (real path, modification time, size) -> checksum of the file
+_checksums = {}
+_checksums_lock = threading.Lock()
+
+
+def package_version() -> str:
+    """Returns the installed version of Illuminator."""
+    try:
+        return metadata.version('illuminator')
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+
+
+def file_checksum(file_path: str) -> str:
+    """Returns the SHA-256 of a file. Checksums are remembered while the file is not modified."""
+    path = os.path.realpath(file_path)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _checksums_lock:
+        if key in _checksums:
+            return _checksums[key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as datafile:
+        for block in iter(lambda: datafile.read(1 << 20), b''):
+            digest.update(block)
+    with _checksums_lock:
+        _checksums[key] = digest.hexdigest()
+    return _checksums[key]
+
+
+def _input_files(config: dict) -> list:
+    """Returns the paths of the existing files given as parameters of the models."""
+    files = []
+    for model in config.get('models', []):
+        for value in (model.get('parameters') or {}).values():
+            for item in value if isinstance(value, list) else [value]:
+                if isinstance(item, str) and os.path.isfile(item):
+                    files.append(item)
+    return files
+
+
+def scenario_hash(config: dict) -> str:
+    """
+    Returns a stable hash of a scenario. It covers the configuration, except the name
+    of the scenario and the monitor file (which do not change the results), the
+    checksums of the input files of the models and the version of Illuminator.
+
+    Parameters
+    ----------
+    config : dict
+        A valid scenario configuration, without multi_parameters.
+
+    Returns
+    -------
+    str
+        A hexadecimal SHA-256 hash.
+    """
+    content = copy.deepcopy(config)
+    content.get('scenario', {}).pop('name', None)
+    content.get('monitor', {}).pop('file', None)
+    identity = {
+        'config': content,
+        'inputs': {path: file_checksum(path) for path in _input_files(config)},
+        'version': package_version(),
+    }
+    encoded = json.dumps(identity, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class ScenarioCache:
+    """
+    A directory with the results and manifest entries of completed scenarios.
+    Entries are written atomically, so the cache can be shared by concurrent processes.
+
+    Parameters
+    ----------
+    directory : str
+        The cache directory, it is created if it does not exist.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.json')
+
+    def lookup(self, key: str) -> dict:
+        """Returns the manifest entry of a completed scenario, or None if it is not in the cache."""
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as entry_file:
+                entry = json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(os.path.join(self.directory, entry['results'])):
+            return None
+        return entry
+
+    def restore(self, key: str, output_file: str) -> bool:
+        """Copies the cached results of a scenario to `output_file`. Returns False if the scenario is not cached."""
+        entry = self.lookup(key)
+        if entry is None:
+            return False
+        shutil.copyfile(os.path.join(self.directory, entry['results']), output_file)
+        return True
+
+    def store(self, key: str, config: dict, output_file: str) -> None:
+        """Adds the results of a completed scenario, written to `output_file`, to the cache."""
+        results = key + os.path.splitext(output_file)[1]
+        temporary = os.path.join(self.directory, f'.{results}.{os.getpid()}')
+        shutil.copyfile(output_file, temporary)
+        os.replace(temporary, os.path.join(self.directory, results))
+
+        entry = {'hash': key, 'results': results, 'scenario': config, 'version': package_version(),
+                 'completed': datetime.datetime.now().isoformat(timespec='seconds')}
+        temporary = os.path.join(self.directory, f'.{key}.json.{os.getpid()}')
+        with open(temporary, 'w', encoding='utf-8') as entry_file:
+            json.dump(entry, entry_file, indent=2, default=str)
+        os.replace(temporary, self._entry_path(key))
+
+    def manifest(self) -> list:
+        """Returns the manifest entries of all completed scenarios."""
+        entries = []
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith('.json') and not name.startswith('.'):
+                entry = self.lookup(name[:-len('.json')])
+                if entry is not None:
+                    entries.append(entry)
+        return entries
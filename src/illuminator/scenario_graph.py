@@ -0,0 +1,235 @@
+"""
+Static validation of a scenario, before any simulator is started.
+
+The attributes of every model are known from the configuration file, or from the
+defaults of its model class when a category (inputs, outputs, states) is not given.
+`validate_scenario` checks the connections, the monitor items and the triggers
+against them and reports every inconsistency at once::
+
+    validate_scenario(config)  # raises a ValueError listing all errors
+
+The attributes of models that add attributes while they are constructed (e.g. the
+columns of the `CSV` model, see `ModelConstructor.runtime_attributes`) or that are
+not built on `ModelConstructor` are not checked. The result is remembered per
+structure of the scenario (models, their attributes, connections and monitor items),
+so scenarios that only differ in parameters are validated once.
+"""
+
+import hashlib
+import json
+
+import illuminator.models
+from illuminator.engine import split_item
+
+# hash of the structure of a scenario -> its errors, see `validate_scenario`
+_validated = {}
+
+CATEGORIES = ('inputs', 'outputs', 'states')
+
+
+def model_attributes(model: dict) -> dict | None:
+    """
+    Returns the inputs, outputs and states of a model, by category, as they are
+    defined when the model is constructed. Returns None when they cannot be known
+    before the model is constructed.
+
+    Raises
+    ------
+    AttributeError
+        If the type of the model does not exist.
+    """
+    from illuminator.builder import ModelConstructor  # local import, the builder imports the engine
+
+    model_class = getattr(illuminator.models, model['type'])
+    if not (isinstance(model_class, type) and issubclass(model_class, ModelConstructor)) \
+            or model_class.runtime_attributes:
+        return None
+    return {category: set(model.get(category, getattr(model_class, category))) for category in CATEGORIES}
+
+
+def is_batched(model: dict) -> bool:
+    """
+    Returns whether the type of a model steps several entities, i.e. is built on
+    `BatchedModelConstructor`. Other models create a single entity.
+
+    Raises
+    ------
+    AttributeError
+        If the type of the model does not exist.
+    """
+    from illuminator.builder import BatchedModelConstructor  # local import, the builder imports the engine
+
+    model_class = getattr(illuminator.models, model['type'])
+    return isinstance(model_class, type) and issubclass(model_class, BatchedModelConstructor)
+
+
+class ScenarioGraph:
+    """
+    The models of a scenario, indexed by name, with their attributes and number of
+    entities, to check the items of a scenario against.
+
+    Parameters
+    ----------
+    models : list
+        The models in the configuration file.
+
+    Attributes
+    ----------
+    models : dict
+        The configuration of every model, by name.
+    attributes : dict
+        The inputs, outputs and states of every model, by category, or None if they
+        are not known before the model is constructed.
+    entities : dict
+        The number of entities of every model.
+    errors : list
+        The errors in the definition of the models: duplicate names, unknown types and
+        several entities of a model that is not batched.
+    """
+
+    def __init__(self, models: list[dict]) -> None:
+        self.models = {}
+        self.attributes = {}
+        self.entities = {}
+        self.errors = []
+        for model in models:
+            name = model['name']
+            if name in self.models:
+                self.errors.append(f"Multiple models found with name '{name}'.")
+                continue
+            self.models[name] = model
+            self.entities[name] = model.get('entities', 1)
+            try:
+                self.attributes[name] = model_attributes(model)
+                if self.entities[name] != 1 and not is_batched(model):
+                    self.errors.append(f"model {name}: type '{model['type']}' simulates a single entity, 'entities' "
+                                       "can only be set for batched models (BatchedModelConstructor).")
+            except AttributeError:
+                self.errors.append(f"model {name}: type '{model['type']}' not found in illuminator.models "
+                                   "or the models registered by other packages.")
+                self.attributes[name] = None
+            except ImportError as e:
+                self.errors.append(f"model {name}: type '{model['type']}' could not be imported: {e}")
+                self.attributes[name] = None
+
+    def has_attribute(self, model: str, attr: str, categories: tuple = CATEGORIES) -> bool:
+        """Returns whether an attribute is in one of the categories of a model, True if they are not known."""
+        attributes = self.attributes[model]
+        return attributes is None or any(attr in attributes[category] for category in categories)
+
+    def item_errors(self, item: str, where: str) -> tuple[list, int]:
+        """
+        Checks an item `<model>.<attr>` or `<model>[<index>].<attr>`. Returns the errors,
+        prefixed with `where`, and the number of entities the item addresses (0 if the
+        model does not exist).
+        """
+        model, index, attr = split_item(item)
+        if model not in self.models:
+            return [f"{where}: Model with name '{model}' not found in models list."], 0
+        errors = []
+        count = self.entities[model]
+        if index is not None:
+            if index >= count:
+                errors.append(f"{where}: Model '{model}' has {count} entities, entity {index} does not exist.")
+            count = 1
+        if not self.has_attribute(model, attr):
+            errors.append(f"{where}: '{attr}' is not an input, output or state of model '{model}'.")
+        return errors, count
+
+    def connection_errors(self, connections: list[dict]) -> list:
+        """
+        Checks the connections: their models, entities and attributes, the number of
+        entities on both sides, physical splits, and the initial values of time-shifted
+        connections.
+        """
+        errors = []
+        origins = set()  # the origins of the connections so far, for checking physical splits
+        for connection in connections:
+            where = f"connection {connection['from']} -> {connection['to']}"
+            from_errors, from_count = self.item_errors(connection['from'], where)
+            to_errors, to_count = self.item_errors(connection['to'], where)
+            errors += from_errors + to_errors
+            if not (from_count and to_count):
+                continue  # a model does not exist
+            if from_count != to_count and 1 not in (from_count, to_count):
+                errors.append(f"{where}: Cannot connect {from_count} entities to {to_count} entities. Use the same "
+                              "number of entities, a single entity or select entities with <model>[<index>].<item>")
+
+            from_model, _, from_attr = split_item(connection['from'])
+            to_model, _, to_attr = split_item(connection['to'])
+            from_model_config = self.models[from_model]
+            # check if the connection is a physical split
+            if connection['from'] in origins:
+                if from_attr in from_model_config.get('outputs', {}):
+                    errors.append(f"{where}: Split detected in physical connection for {connection['from']}.")
+                elif from_attr not in from_model_config.get('states', {}):
+                    # it is okay if a non-physical connection (state) goes to multiple destinations
+                    errors.append(f"{where}: Split detected for connection {connection['from']}. "
+                                  "I can't check if this is a non-physical connection (states). "
+                                  "If so, add the attribute to the states of the model configuration. (e.g., in the .yaml file)")
+            origins.add(connection['from'])
+
+            # the initial value of a time-shifted connection is the initial value of its destination
+            if connection.get('time_shifted'):
+                if from_attr not in from_model_config.get('outputs', {}) and \
+                        from_attr not in from_model_config.get('states', {}):
+                    errors.append(f"{where}: Attribute {from_attr} not found in outputs or states of model {from_model}")
+                if to_attr not in self.models[to_model].get('inputs', {}):
+                    errors.append(f"{where}: Attribute {to_attr} not found in inputs of model {to_model}, "
+                                  "a time-shifted connection requires its initial value.")
+        return errors
+
+    def monitor_errors(self, items: list) -> list:
+        """Checks the models, entities and attributes of the monitor items."""
+        return [error for item in items for error in self.item_errors(item, f"monitor item {item}")[0]]
+
+    def trigger_errors(self) -> list:
+        """Checks that the triggers of the models are inputs, outputs or states."""
+        return [f"model {name}: trigger '{trigger}' is not an input, output or state."
+                for name, model in self.models.items()
+                for trigger in model.get('triggers', [])
+                if not self.has_attribute(name, trigger)]
+
+
+def scenario_errors(config: dict) -> list:
+    """Returns all inconsistencies between the models, connections and monitor items of a scenario."""
+    graph = ScenarioGraph(config['models'])
+    return (graph.errors + graph.trigger_errors()
+            + graph.connection_errors(config['connections'])
+            + graph.monitor_errors(config['monitor']['items']))
+
+
+def structure_hash(config: dict) -> str:
+    """
+    Returns a hash of the parts of a scenario checked by `validate_scenario`: the names,
+    types, attribute names, entities and triggers of the models, the connections and
+    the monitor items. Parameters and initial values are left out.
+    """
+    models = [{'name': model['name'], 'type': model['type'], 'entities': model.get('entities'),
+               'triggers': model.get('triggers'),
+               **{category: list(model[category]) for category in CATEGORIES if category in model}}
+              for model in config['models']]
+    structure = {'models': models, 'connections': config['connections'], 'monitor': config['monitor']['items']}
+    return hashlib.sha256(json.dumps(structure, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def validate_scenario(config: dict) -> None:
+    """
+    Checks the connections, monitor items and triggers of a scenario against its models,
+    without starting any simulator. Scenarios with the same structure are checked once.
+
+    Parameters
+    ----------
+    config : dict
+        A scenario configuration, as returned by `load_config_file`.
+
+    Raises
+    ------
+    ValueError
+        Listing every inconsistency in the scenario.
+    """
+    key = structure_hash(config)
+    if key not in _validated:
+        _validated[key] = scenario_errors(config)
+    if _validated[key]:
+        raise ValueError(f"Invalid scenario '{config['scenario']['name']}':\n - " + "\n - ".join(_validated[key]))
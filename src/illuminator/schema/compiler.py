@@ -0,0 +1,244 @@
+"""
+Compiles a schema of the `schema` library into nested functions, which validate
+data in a single pass without building `Schema` objects for every value.
+
+The compiled function returns the same data and raises the same exceptions, with
+the same messages, as `Schema.validate`, for the parts of the library used by the
+schemas of Illuminator: `Schema`, `And`, `Or`, `Regex`, `Use`, `Optional` keys
+(with defaults), types, callables, literals, mappings and sequences. Other
+validators are called as they are.
+
+A subclass of `Schema` that checks more than its schema implements `check(data)`,
+which is called with the validated data and returns it.
+
+The compiler reads private attributes of the library (`_error`, `_ignore_extra_keys`,
+`_pattern`, `_callable`). If a version of the library does not have them, the
+schema is not compiled and `compile_schema` returns `Schema.validate`.
+"""
+
+from typing import Callable
+from schema import (Schema, And, Or, Regex, Use, Optional, SchemaError, SchemaMissingKeyError,
+                    SchemaWrongKeyError, SchemaUnexpectedTypeError)
+
+
+def compile_schema(schema) -> Callable:
+    """
+    Returns a function that validates data against `schema`, see `Schema.validate`.
+
+    Parameters
+    ----------
+    schema : Schema
+        The schema, or any value accepted by `Schema`.
+
+    Returns
+    -------
+    Callable
+        A function of the data that returns the validated data or raises a `SchemaError`.
+        `Schema.validate` if the library does not have the attributes the compiler reads.
+    """
+    try:
+        return _compile(schema, None)
+    except AttributeError:  # the internals of this version of the library differ
+        return (schema if isinstance(schema, Schema) else Schema(schema)).validate
+
+
+def _formatted(error: str | None, data) -> str | None:
+    return error.format(data) if error else None
+
+
+def _with_error(validate: Callable, error: str | None) -> Callable:
+    """Adds the error of the enclosing schema to the errors of a validator, like `Schema.validate`."""
+    if error is None:
+        return validate
+
+    def validate_with_error(data):
+        try:
+            return validate(data)
+        except SchemaError as x:
+            raise SchemaError([None] + x.autos, [error.format(data)] + x.errors)
+    return validate_with_error
+
+
+def _compile(schema, error: str | None, ignore_extra_keys: bool = False) -> Callable:
+    if isinstance(schema, Schema) and not isinstance(schema, Optional):
+        validate = _compile(schema.schema, schema._error, schema._ignore_extra_keys)
+        if hasattr(schema, 'check'):
+            inner = validate
+            validate = lambda data: schema.check(inner(data))
+        return _with_error(validate, error)
+    if isinstance(schema, Or) and not schema.only_one:  # before And, Or is a subclass of And
+        return _with_error(_compile_or(schema, schema.args), error)
+    if type(schema) is And:
+        return _with_error(_compile_and(schema), error)
+    if isinstance(schema, Regex):
+        return _with_error(_compile_regex(schema), error)
+    if isinstance(schema, Use):
+        return _with_error(_compile_use(schema), error)
+    if isinstance(schema, dict):
+        return _compile_dict(schema, error, ignore_extra_keys)
+    if isinstance(schema, (list, tuple, set, frozenset)):
+        return _compile_sequence(schema, error, ignore_extra_keys)
+    if isinstance(schema, type):
+        return _compile_type(schema, error)
+    if hasattr(schema, 'validate'):  # any other validator is called as it is
+        return Schema(schema, error=error, ignore_extra_keys=ignore_extra_keys).validate
+    if callable(schema):
+        return _compile_callable(schema, error)
+    return _compile_literal(schema, error)
+
+
+def _compile_and(schema: And) -> Callable:
+    validators = [_compile(arg, schema._error, schema._ignore_extra_keys) for arg in schema.args]
+
+    def validate_and(data):
+        for validate in validators:
+            data = validate(data)
+        return data
+    return validate_and
+
+
+def _compile_or(schema, alternatives) -> Callable:
+    error = schema._error
+    validators = [_compile(alternative, error, schema._ignore_extra_keys) for alternative in alternatives]
+
+    def validate_or(data):
+        autos, errors = [], []
+        for validate in validators:
+            try:
+                return validate(data)
+            except SchemaError as x:
+                autos += x.autos
+                errors += x.errors
+        raise SchemaError([f"{schema!r} did not validate {data!r}"] + autos, [_formatted(error, data)] + errors)
+    return validate_or
+
+
+def _compile_regex(schema: Regex) -> Callable:
+    search = schema._pattern.search
+    error = schema._error
+
+    def validate_regex(data):
+        try:
+            if search(data):
+                return data
+            raise SchemaError(error.format(data) if error else f"{data!r} does not match {schema.pattern_str!r}")
+        except TypeError:
+            raise SchemaError(error.format(data) if error else f"{data!r} is not string nor buffer")
+    return validate_regex
+
+
+def _compile_use(schema: Use) -> Callable:
+    function = schema._callable
+    error = schema._error
+
+    def validate_use(data):
+        try:
+            return function(data)
+        except SchemaError as x:
+            raise SchemaError([None] + x.autos, [_formatted(error, data)] + x.errors)
+        except BaseException as x:
+            raise SchemaError(f"{_callable_name(function)}({data!r}) raised {x!r}", _formatted(error, data))
+    return validate_use
+
+
+def _compile_dict(schema: dict, error: str | None, ignore_extra_keys: bool) -> Callable:
+    literals = {}  # key -> validator of its value
+    patterns = []  # (schema key, validator of the key, validator of the value)
+    required = set()  # schema keys that must be matched
+    defaults = {}  # key -> default value of an optional key
+    for skey, svalue in schema.items():
+        key = skey.schema if isinstance(skey, Optional) else skey
+        validate_value = _compile(svalue, error, ignore_extra_keys)
+        if isinstance(key, (str, int, float, bool)):
+            literals[key] = validate_value
+        else:
+            patterns.append((skey, _compile(key, error), validate_value))
+        if not isinstance(skey, Optional):
+            required.add(skey)
+        elif hasattr(skey, 'default'):
+            defaults[skey.key] = skey.default
+    validate_type = _compile_type(dict, error)
+
+    def validate_dict(data):
+        data = validate_type(data)
+        new = type(data)()
+        coverage = set()
+        # like the schema library, values that are dictionaries are validated last
+        items = [item for item in data.items() if not isinstance(item[1], dict)]
+        items += [item for item in data.items() if isinstance(item[1], dict)]
+        for key, value in items:
+            if key in literals:
+                validate_value, nkey, skey = literals[key], key, key
+            else:
+                for skey, validate_key, validate_value in patterns:
+                    try:
+                        nkey = validate_key(key)
+                        break
+                    except SchemaError:
+                        pass
+                else:
+                    continue  # a wrong key
+            try:
+                new[nkey] = validate_value(value)
+            except SchemaError as x:
+                raise SchemaError([f"Key '{nkey}' error:"] + x.autos, [_formatted(error, data)] + x.errors)
+            coverage.add(skey)
+
+        if not required.issubset(coverage):
+            missing_keys = required - coverage
+            raise SchemaMissingKeyError(f"Missing key{'s' if len(missing_keys) > 1 else ''}: "
+                                        + ", ".join(repr(k) for k in sorted(missing_keys, key=repr)),
+                                        _formatted(error, data))
+        if not ignore_extra_keys and len(new) != len(data):
+            wrong_keys = set(data.keys()) - set(new.keys())
+            raise SchemaWrongKeyError(f"Wrong key{'s' if len(wrong_keys) > 1 else ''} "
+                                      + ", ".join(repr(k) for k in sorted(wrong_keys, key=repr)) + f" in {data!r}",
+                                      _formatted(error, data))
+        for key, default in defaults.items():
+            if key not in coverage:
+                new[key] = default() if callable(default) else default
+        return new
+    return validate_dict
+
+
+def _compile_sequence(schema, error: str | None, ignore_extra_keys: bool) -> Callable:
+    validate_type = _compile_type(type(schema), error)
+    validate_item = _compile_or(Or(*schema, error=error, ignore_extra_keys=ignore_extra_keys), schema)
+
+    def validate_sequence(data):
+        data = validate_type(data)
+        return type(data)(validate_item(item) for item in data)
+    return validate_sequence
+
+
+def _compile_type(schema: type, error: str | None) -> Callable:
+    def validate_type(data):
+        if isinstance(data, schema) and not (isinstance(data, bool) and schema == int):
+            return data
+        raise SchemaUnexpectedTypeError(f"{data!r} should be instance of {schema.__name__!r}", _formatted(error, data))
+    return validate_type
+
+
+def _callable_name(function: Callable) -> str:
+    return getattr(function, '__name__', str(function))
+
+
+def _compile_callable(schema: Callable, error: str | None) -> Callable:
+    def validate_callable(data):
+        try:
+            if schema(data):
+                return data
+        except SchemaError as x:
+            raise SchemaError([None] + x.autos, [_formatted(error, data)] + x.errors)
+        except BaseException as x:
+            raise SchemaError(f"{_callable_name(schema)}({data!r}) raised {x!r}", _formatted(error, data))
+        raise SchemaError(f"{_callable_name(schema)}({data!r}) should evaluate to True", _formatted(error, data))
+    return validate_callable
+
+
+def _compile_literal(schema, error: str | None) -> Callable:
+    def validate_literal(data):
+        if schema == data:
+            return data
+        raise SchemaError(f"{schema!r} does not match {data!r}", _formatted(error, data))
+    return validate_literal
@@ -3,25 +3,33 @@ A schema for validating a simulation configuration file (YAML)
 in the Illuminator. 
 """
 
+import copy
 import datetime
+import hashlib
 import re
 import os
 import json as json_module
 from ruamel.yaml import YAML
 from schema import Schema, And, Use, Regex, Optional, SchemaError, SchemaUnexpectedTypeError, Or
+from illuminator.schema.compiler import compile_schema
 
 # valid format for start and end times: YYYY-MM-DD HH:MM:SS"
 valid_start_time = r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$'
 # Ip versions 4 and 6 are valid
 ipv4_pattern = r'^(?:[0-9]{1,3}\.){3}[0-9]{1,3}$'
 # monitor and connections sections enforce a format such as 
-# <model>.<input/output/state>
-valid_model_item_format = r'^\w+\.\w+$'
+# <model>.<input/output/state>, or <model>[<index>].<input/output/state> for a single
+# entity of a batched model
+valid_model_item_format = r'^\w+(\[\d+\])?\.\w+$'
 # valid_model_item_format = r'^([\w-]+\.?)+$' # This is kept here as an alternative. I believe this might be useful later on
 valid_key_format = r'^.+$'
 valid_range_format = r'^(range\([-\s\d]+,[-\s\d]+,[-\s\d]+\))$' # range(1,2,3)
 # valid_range_format = r'^(range\([-\s\d]+,[-\s\d]+[,]?[-\s\d]*\))$' # range(1,2,) # Alternative to allow range without step size
 
+# (SHA-256 of the content of a configuration file, working directory) -> its validated content
+_validated_files = {}
+_VALIDATED_FILES_SIZE = 64  # the oldest entries are dropped first
+
 
 
 def load_config_file(config_file: str, json:bool=False) -> dict | str:
@@ -39,13 +47,27 @@ def load_config_file(config_file: str, json:bool=False) -> dict | str:
     -------
     dict
         The content of the configuration file as a dictionary.
+
+    Notes
+    -----
+    A file with the same content is validated once per working directory. Only the
+    directory of the monitor file is checked again when the file is loaded again.
     """
 
     try:
-        with open(config_file, 'r', encoding='utf-8') as _file:
+        with open(config_file, 'rb') as _file:
+            content = _file.read()
+        # identical files are validated once, relative paths depend on the working directory
+        key = (hashlib.sha256(content).hexdigest(), os.getcwd())
+        if key not in _validated_files:
             yaml = YAML(typ='safe')
-            data = yaml.load(_file)
-        valid_data = schema.validate(data)
+            data = yaml.load(content.decode('utf-8'))
+            if len(_validated_files) >= _VALIDATED_FILES_SIZE:
+                del _validated_files[next(iter(_validated_files))]
+            _validated_files[key] = validate_config(data)
+        elif 'file' in _validated_files[key]['monitor']:
+            monitor_file_schema.validate(_validated_files[key]['monitor']['file'])  # it may have been removed since
+        valid_data = copy.deepcopy(_validated_files[key])  # callers may modify the configuration
     except FileNotFoundError:
         raise FileNotFoundError(f"Error: The file {config_file} was not found.")
     except PermissionError:
@@ -59,6 +81,28 @@ def load_config_file(config_file: str, json:bool=False) -> dict | str:
     return valid_data
 
 
+def validate_config(data: dict) -> dict:
+    """
+    Validates a simulation configuration against the Illuminator's Schema, with the
+    schema compiled once (see `compile_schema`). The result and the errors are the
+    same as those of `schema.validate(data)`.
+
+    Parameters
+    ----------
+    data : dict
+        The content of a configuration file.
+
+    Returns
+    -------
+    dict
+        The validated configuration, with default values applied.
+    """
+    global _compiled_schema
+    if _compiled_schema is None:
+        _compiled_schema = compile_schema(schema)
+    return _compiled_schema(data)
+
+
 def validate_model_item_format(items: list) -> list:
     """
     Validates the monitor section of the simulation configuration file, as
@@ -86,7 +130,6 @@ def validate_directory_path(file_path: str) -> str:
     Validates that a  directory exists.
     """
     directory = os.path.dirname( os.path.abspath(file_path))
-    print(directory)
     if not os.path.isdir(directory):
         raise SchemaError(f"Directory does not exist: {directory}")
     return file_path
@@ -102,8 +145,13 @@ class ScenarioSchema(Schema):
         data = super(ScenarioSchema, self).validate(data,
                                                     _is_scenario_schema=False)
         
-        if _is_scenario_schema and data.get("start_time", None) and \
-                data.get("end_time", None):
+        if _is_scenario_schema:
+            data = self.check(data)
+        return data
+
+    def check(self, data):
+        """Checks that the scenario ends after it starts, see `compile_schema`."""
+        if data.get("start_time", None) and data.get("end_time", None):
             # convert strings to datetime objects
             start_time_ = datetime.datetime.strptime(data["start_time"],
                                                      "%Y-%m-%d %H:%M:%S")
@@ -115,7 +163,12 @@ class ScenarioSchema(Schema):
         return data
 
 
+# the directory of the monitor file is checked again when a validated file is loaded from the cache
+monitor_file_schema = And(str, len, Use(validate_directory_path, error="Path for 'file' does not exists..."),
+                          error="you must provide a non-empty string for 'file'")
+
 # Define the schema for the simulation configuration file
+_compiled_schema = None  # see validate_config
 schema = Schema(  # a mapping of mappings
             {
                 "scenario": ScenarioSchema(
@@ -132,6 +185,17 @@ schema = Schema(  # a mapping of mappings
                                                   "positive integer"),
                         Optional("align_parameters"): And(bool, lambda x: x in [True, False],
                                                     error="align_parameters must be True or False"),
+                        Optional("sampling"): Schema(
+                            {
+                                "method": Or("random", "latin_hypercube", "sobol", "adaptive",
+                                             error="sampling method must be 'random', 'latin_hypercube', 'sobol' or 'adaptive'"),
+                                "samples": And(int, lambda n: n > 0, error="samples must be a positive integer"),
+                                Optional("seed"): And(int, error="seed must be an integer"),
+                                Optional("initial_samples"): And(int, lambda n: n > 1, error="initial_samples must be an integer larger than 1"),
+                                Optional("batch"): And(int, lambda n: n > 0, error="batch must be a positive integer"),
+                                Optional("output"): Regex(valid_model_item_format, error="Invalid format for 'output'. Must be in the format: <model>.<item>"),
+                            }
+                        ),
                     }
                 ),
                 "models": Schema(  # a sequence of mappings
@@ -165,6 +229,8 @@ schema = Schema(  # a mapping of mappings
                             }
                             ),
                         Optional("time_step_size"): int,
+                        Optional("entities"): And(int, lambda n: n > 0, error="entities must be a positive integer"),
+                        Optional("debug"): And(bool, error="debug must be True or False"),
             } ]
         ),
         "connections":  Schema( # a sequence of mappings
@@ -176,20 +242,18 @@ schema = Schema(  # a mapping of mappings
         ),
         "monitor":  Schema(
             {
-                Optional("file"): And(str, len, Use(validate_directory_path, error="Path for 'file' does not exists..."), error="you must provide a non-empty string for 'file'"),
+                Optional("file"): monitor_file_schema,
                 "items": And(list, len, Use(validate_model_item_format, error="Items in 'monitor' must have the format: <model>.<item>"), 
-                        error="you must provide at least one item to monitor")
+                        error="you must provide at least one item to monitor"),
+                Optional("in_process"): And(bool, error="in_process must be True or False"),
+                Optional("flush_every"): And(int, lambda n: n > 0, error="flush_every must be a positive integer"),
+                Optional("format"): Or("csv", "parquet", "arrow", error="format must be one of 'csv', 'parquet' or 'arrow'"),
             }
         )
     }
 )
 
 
-# TODO: write a validator for model types. It should check that a model exist in the illuminator.models package
-# We could generate a list of names in the models package and check that the model name is in that list.
-# The list should be updates when new models are added to the package
-# TODO: Write a more rubust validator for the monitor section
-# Any input, output, or state declared in the monitor section must be declared in the models section
-# TODO: Write a more rubust validator for connections section
-# Any input, output, or state declared in the connection section must be declared in the models section
-# TODO: write a validator for triggers. It should check that the trigger has been declared as input, output, or state. 
+# The model types, and the items in the monitor and connections sections and the
+# triggers, are checked against the inputs, outputs and states of the models before
+# a simulation starts, see illuminator.scenario_graph.
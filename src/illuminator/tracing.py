@@ -0,0 +1,144 @@
+"""
+A timeline of a simulation run in the Chrome trace-event format, which can be opened
+in Perfetto (https://ui.perfetto.dev) or chrome://tracing::
+
+    simulation.run(trace='run.json')
+
+Every simulator has its own track, with an event for each of its steps ('step'), each
+request of its outputs ('get_data') and, for a collector in the same process, each
+write of buffered results ('flush'). Events are tagged with the model name and the
+simulation time of the step. With Mosaik, the events are timed as seen by the
+scheduler, so the steps of remote simulators include the time spent communicating
+with them.
+"""
+
+import contextlib
+import functools
+import inspect
+import json
+import os
+import time
+
+import mosaik
+
+# methods traced by `trace_world`, with the category of their events
+METHODS = {'step': 'step', 'get_data': 'data', 'flush': 'write'}
+
+
+class TraceRecorder:
+    """
+    Collects the events of a timeline. Timestamps are in microseconds since the
+    recorder was created.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the timeline, e.g. the name of the scenario.
+    """
+
+    def __init__(self, name: str = None) -> None:
+        self.name = name
+        self.events = []
+        self.tracks = {}  # track name -> thread id in the trace
+        self._start = time.perf_counter()
+
+    def now(self) -> float:
+        """Returns the current timestamp in microseconds."""
+        return (time.perf_counter() - self._start) * 1e6
+
+    def track(self, name: str) -> int:
+        """Returns the thread id of the track of a simulator, adding the track if it is new."""
+        return self.tracks.setdefault(name, len(self.tracks) + 1)
+
+    def complete(self, name: str, category: str, track: str, start: float, end: float, **args) -> None:
+        """Adds an event that started at `start` and ended at `end` (microseconds)."""
+        self.events.append({'name': name, 'cat': category, 'ph': 'X', 'pid': os.getpid(),
+                            'tid': self.track(track), 'ts': start, 'dur': end - start, 'args': args})
+
+    def trace_events(self) -> list:
+        """Returns the events, preceded by the names of the process and the tracks."""
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'args': {'name': self.name or 'Illuminator'}}]
+        metadata += [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': track}}
+                     for track, tid in self.tracks.items()]
+        return metadata + self.events
+
+    def write(self, file_path: str) -> None:
+        """Writes the timeline to a JSON file in the Chrome trace-event format."""
+        with open(file_path, 'w', encoding='utf-8') as trace_file:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, trace_file)
+
+
+def _traced(recorder: TraceRecorder, sid: str, method: str, function, times: dict):
+    """Wraps a method of a simulator so that every call adds an event to the recorder."""
+    model = sid.rsplit('-', 1)[0]  # simulator ids are '<model name>-<n>'
+
+    def record(start: float, args: tuple) -> None:
+        if method == 'step':
+            times[sid] = args[0]
+        recorder.complete(method, METHODS[method], sid, start, recorder.now(), model=model, time=times.get(sid))
+
+    if inspect.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def traced(*args, **kwargs):
+            start = recorder.now()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                record(start, args)
+    else:
+        @functools.wraps(function)
+        def traced(*args, **kwargs):
+            start = recorder.now()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(start, args)
+    return traced
+
+
+def local_instance(runner):
+    """Returns the simulator instance behind a Mosaik simulator runner if it runs in this process, else None."""
+    proxy = getattr(runner, '_proxy', None)
+    while proxy is not None and not hasattr(proxy, 'sim'):
+        proxy = getattr(proxy, '_out', None)  # the adapters between API versions
+    return getattr(proxy, 'sim', None)
+
+
+def _traced_objects(world) -> list:
+    """Returns (simulator id, object, methods) of the objects of a world whose calls are traced."""
+    if hasattr(world, 'compile'):  # Mosaik: the steps and data requests of the scheduler
+        runners = world.compile()
+        objects = [(sid, runner, ('step', 'get_data')) for sid, runner in runners.items()]
+        objects += [(sid, instance, ('flush',)) for sid, instance in
+                    ((sid, local_instance(runner)) for sid, runner in runners.items()) if instance is not None]
+        return objects
+    if isinstance(world, mosaik.World):
+        raise RuntimeError(f"Tracing a Mosaik world requires Mosaik 3.6 or later, which can compile the "
+                           f"simulators of a world; Mosaik {mosaik.__version__} is installed. "
+                           f"Upgrade Mosaik or run with engine='direct'.")
+    # DirectWorld: the calls of the simulator instances
+    return [(sid, sim.instance, ('step', 'get_data', 'flush')) for sid, sim in world.sims.items()]
+
+
+@contextlib.contextmanager
+def trace_world(world, recorder: TraceRecorder):
+    """
+    Records the calls of the simulators of a world (a Mosaik world or a `DirectWorld`)
+    in the context. The simulators must have been started.
+    """
+    times = {}  # simulator id -> time of its last step
+    traced = []  # (object, method, its previous instance attribute or None)
+    for sid, obj, methods in _traced_objects(world):
+        for method in methods:
+            function = getattr(obj, method, None)
+            if callable(function):
+                traced.append((obj, method, obj.__dict__.get(method)))
+                setattr(obj, method, _traced(recorder, sid, method, function, times))
+    try:
+        yield recorder
+    finally:
+        for obj, method, previous in traced:
+            if previous is None:
+                del obj.__dict__[method]
+            else:
+                obj.__dict__[method] = previous  # e.g. the timing of `illuminator.profiling`
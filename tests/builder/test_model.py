@@ -0,0 +1,156 @@
+import pytest
+import illuminator.engine as engine
+from illuminator.builder import ModelConstructor, Message
+
+
+class Sink(ModelConstructor):
+    """A model that only receives inputs"""
+    inputs = {'power': 0, 'soc': 0}
+
+    def step(self, time, inputs=None, max_advance=None) -> int:
+        return time + 1
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    monkeypatch.setattr(engine, 'current_model', {'type': 'Sink'})
+    return Sink()
+
+
+def make_inputs(attr, origin, *values):
+    return {'time-based_0': {attr: {f'Source{i}-0.time-based_0': Message((origin, value))
+                                    for i, value in enumerate(values)}}}
+
+
+class TestUnpackInputs():
+    """
+    Tests for ModelConstructor.unpack_inputs
+    """
+
+    def test_outputs_are_summed(self, sink):
+        """Physical connections are added up"""
+        assert sink.unpack_inputs(make_inputs('power', 'output', 1.5)) == {'power': 1.5}
+        assert sink.unpack_inputs(make_inputs('power', 'output', 1.5, 2)) == {'power': 3.5}
+
+    def test_states_are_listed(self, sink):
+        """Data connections keep one value per source"""
+        assert sink.unpack_inputs(make_inputs('soc', 'state', 10)) == {'soc': 10}
+        assert sink.unpack_inputs(make_inputs('soc', 'state', 10, 20)) == {'soc': [10, 20]}
+
+    def test_return_sources(self, sink):
+        """Sources are returned along with the values"""
+        data = sink.unpack_inputs(make_inputs('soc', 'state', 10, 20), return_sources=True)
+        assert data == {'soc': {'value': [10, 20], 'sources': ['Source0-0.time-based_0', 'Source1-0.time-based_0']}}
+
+    def test_messages_validated_once(self, sink):
+        """Messages are only validated the first time an input is received"""
+        sink.unpack_inputs(make_inputs('power', 'output', 1, 2))
+
+        mixed = make_inputs('power', 'output', 1, 2)
+        mixed['time-based_0']['power']['Source1-0.time-based_0'] = Message(('state', 2))
+        assert sink.unpack_inputs(mixed) == {'power': 3}
+
+        sink.debug = True
+        with pytest.raises(RuntimeError):
+            sink.unpack_inputs(mixed)
+
+    def test_invalid_messages(self, sink):
+        """Values that were not sent with set_outputs() or set_states() are rejected"""
+        with pytest.raises(RuntimeError):
+            sink.unpack_inputs({'time-based_0': {'power': {'Source0-0.time-based_0': 1.5}}})
+        with pytest.raises(RuntimeError):
+            sink.unpack_inputs(make_inputs('power', 'input', 1.5))
+
+    def test_serialized_messages(self, sink):
+        """Messages from remote simulators arrive as lists"""
+        inputs = {'time-based_0': {'power': {'Source0-0.time-based_0': ['output', 1.5]}}}
+        assert sink.unpack_inputs(inputs) == {'power': 1.5}
+
+
+class TestMessages():
+    """
+    Tests for the messages created by set_outputs() and set_states()
+    """
+
+    def test_set_outputs(self, sink):
+        sink._model.outputs['power'] = 0
+        sink.set_outputs({'power': 2.5})
+        message = sink._model.outputs['power']
+        assert message == ('output', 2.5)
+        assert (message.origin, message.value) == ('output', 2.5)
+
+    def test_get_state(self, sink):
+        sink._model.states['soc'] = [1, 2]  # initial values are not messages, even if they are pairs
+        assert sink.get_state('soc') == [1, 2]
+        sink.set_states({'soc': ('output', 3)})
+        assert sink._model.states['soc'] == ('state', ('output', 3))
+        assert sink.get_state('soc') == ('output', 3)
+
+
+class Storage(ModelConstructor):
+    """A model with a state derived by its constructor"""
+    parameters = {'capacity': 10}
+    constructed = 0
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        type(self).constructed += 1
+        self.soc = self._model.states['soc']
+        self.history = []
+
+    def step(self, time, inputs=None, max_advance=None) -> int:
+        self.soc += 1
+        self.history.append(time)
+        self.set_states({'soc': self.soc})
+        self.last_step = time
+        return time + 1
+
+
+def storage_definition(**definition):
+    """The definition of a Storage model, as set by the engine before a simulation"""
+    return {'name': 'Storage1', 'type': 'Storage', 'states': {'soc': 5}, **definition}
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    monkeypatch.setattr(engine, 'current_model', storage_definition())
+    monkeypatch.setattr(Storage, 'constructed', 0)
+    model = Storage()
+    model.init('Storage1-0', time_resolution=900, sim_params={'Storage1': {}})
+    model.create(1, 'Storage')
+    for time in range(3):
+        model.step(time)
+    return model
+
+
+class TestReset():
+    """
+    Tests for ModelConstructor.reset
+    """
+
+    def test_restores_initial_values(self, storage):
+        """The values after construction are restored without constructing the model again"""
+        engine.current_model = storage_definition()  # the definition of the next simulation
+        storage.reset()
+
+        assert Storage.constructed == 1
+        assert (storage.soc, storage.history, storage.sid) == (5, [], None)
+        assert storage._model.states == {'soc': 5}
+        assert not hasattr(storage, 'last_step')
+
+        storage.init('Storage1-0', time_resolution=900, sim_params={'Storage1': {}})
+        storage.create(1, 'Storage')
+        storage.step(0)
+        assert storage.soc == 6
+        engine.current_model = storage_definition()
+        storage.reset()
+        assert (Storage.constructed, storage.soc) == (1, 5)
+
+    def test_other_definition(self, storage):
+        """A model is constructed again for another definition"""
+        engine.current_model = storage_definition(parameters={'capacity': 20})
+        storage.reset()
+
+        assert Storage.constructed == 2
+        assert storage._model.parameters == {'capacity': 20}
+        assert storage.soc == 5
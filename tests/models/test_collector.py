@@ -0,0 +1,161 @@
+import pytest
+from illuminator.models.collector import Collector, ColumnarCollector
+
+
+def make_inputs(flow, soc):
+    """Builds the inputs the monitor receives from mosaik for a single step."""
+    return {'Monitor': {'flow2b': {'Controller1-0.time-based_0': ('output', flow)},
+                        'soc': {'Battery1-0.time-based_0': ('state', soc)}}}
+
+
+class TestColumnarCollector():
+    """
+    Unit tester for the in-process collector
+    """
+
+    def create_collector(self, output_file, flush_every=1000):
+        """
+        Creates the collector with a monitor entity.
+        This method was created to avoid boilerplate code.
+        """
+        collector = ColumnarCollector()
+        collector.init('Collector-0', time_resolution=900, start_date='2012-06-01 23:30:00',
+                       items=['Battery1.soc', 'Controller1.flow2b'], output_file=str(output_file),
+                       flush_every=flush_every)
+        collector.create(1, 'Monitor')
+        return collector
+
+    def test_single_instance(self, tmp_path):
+        """
+        Only one monitor can be created per collector
+        """
+        collector = self.create_collector(tmp_path / 'out.csv')
+        with pytest.raises(RuntimeError):
+            collector.create(1, 'Monitor')
+
+    def test_unsupported_results_show(self, tmp_path):
+        """
+        Databases, dashboards and MQTT are only available in the Collector
+        """
+        collector = ColumnarCollector()
+        with pytest.raises(ValueError):
+            collector.init('Collector-0', time_resolution=900, start_date='2012-06-01 00:00:00',
+                           items=['Battery1.soc'], output_file=str(tmp_path / 'out.csv'),
+                           results_show={'write2csv': True, 'database': True})
+
+    def test_buffered_write(self, tmp_path):
+        """
+        Nothing is written before the buffers are full, columns follow the order of the items
+        """
+        output_file = tmp_path / 'out.csv'
+        collector = self.create_collector(output_file, flush_every=2)
+
+        assert collector.step(0, make_inputs(0.5, 10), 10) == 1
+        assert not output_file.exists()
+
+        collector.step(1, make_inputs(-0.25, 12.5), 10)
+        collector.step(2, make_inputs(0, 11), 10)
+        collector.finalize()
+
+        assert output_file.read_text().splitlines() == [
+            'date,Battery1.soc,Controller1.flow2b',
+            '2012-06-01 23:30:00,10,0.5',
+            '2012-06-01 23:45:00,12.5,-0.25',
+            '2012-06-02,11,0',
+        ]
+
+
+class TestCollector():
+    """
+    Unit tester for the buffered CSV output of the Collector
+    """
+
+    def test_flush_every(self, tmp_path):
+        """
+        Rows are written in blocks of `flush_every` steps, the remainder when finalizing
+        """
+        output_file = tmp_path / 'out.csv'
+        collector = Collector()
+        collector.init('Collector-0', time_resolution=900, start_date='2012-06-01 23:30:00',
+                       items=['Controller1.flow2b', 'Battery1.soc'],
+                       results_show={'write2csv': True, 'dashboard_show': False, 'database': False, 'mqtt': False},
+                       output_file=str(output_file), flush_every=2)
+        collector.create(1, 'Monitor')
+
+        collector.step(0, make_inputs(0.5, 10), 10)
+        assert not output_file.exists()
+        collector.step(1, make_inputs(-0.25, 12.5), 10)
+        assert len(output_file.read_text().splitlines()) == 3
+
+        collector.step(2, make_inputs(0, 11), 10)
+        collector.finalize()
+
+        assert output_file.read_text().splitlines() == [
+            'date,Controller1.flow2b,Battery1.soc',
+            '2012-06-01 23:30:00,0.5,10',
+            '2012-06-01 23:45:00,-0.25,12.5',
+            '2012-06-02,0,11',
+        ]
+
+    def test_invalid_flush_every(self, tmp_path):
+        """
+        flush_every must be a positive integer
+        """
+        with pytest.raises(ValueError):
+            Collector().init('Collector-0', time_resolution=900, start_date='2012-06-01 00:00:00',
+                             items=['Battery1.soc'], results_show={'write2csv': True},
+                             output_file=str(tmp_path / 'out.csv'), flush_every=0)
+
+
+@pytest.mark.parametrize('output_format', ['parquet', 'arrow'])
+def test_binary_formats(tmp_path, output_format):
+    """
+    Binary formats keep a timestamp index and float64 columns
+    """
+    pd = pytest.importorskip('pandas')
+    pytest.importorskip('pyarrow')
+
+    output_file = tmp_path / f'out.{output_format}'
+    collector = ColumnarCollector()
+    collector.init('Collector-0', time_resolution=900, start_date='2012-06-01 23:30:00',
+                   items=['Battery1.soc', 'Controller1.flow2b'], output_file=str(output_file),
+                   flush_every=2, output_format=output_format)
+    collector.create(1, 'Monitor')
+    for time, (flow, soc) in enumerate([(0.5, 10), (-0.25, 12.5), (0, 11)]):
+        collector.step(time, make_inputs(flow, soc), 10)
+    collector.finalize()
+
+    if output_format == 'parquet':
+        df = pd.read_parquet(output_file, columns=['Battery1.soc'])
+    else:
+        df = pd.read_feather(output_file)
+
+    assert list(df.index) == list(pd.date_range('2012-06-01 23:30:00', periods=3, freq='15min'))
+    assert df['Battery1.soc'].dtype == 'float64'
+    assert list(df['Battery1.soc']) == [10, 12.5, 11]
+
+
+@pytest.mark.parametrize('collector_class', [Collector, ColumnarCollector])
+def test_results_in_memory(tmp_path, collector_class):
+    """
+    With the 'memory' format, results are kept in memory and no file is written
+    """
+    pd = pytest.importorskip('pandas')
+
+    output_file = tmp_path / 'out.csv'
+    collector = collector_class()
+    collector.init('Collector-0', time_resolution=900, start_date='2012-06-01 23:30:00',
+                   items=['Battery1.soc', 'Controller1.flow2b'], output_file=str(output_file),
+                   results_show={'write2csv': True, 'dashboard_show': False, 'database': False, 'mqtt': False},
+                   flush_every=2, output_format='memory')
+    collector.create(1, 'Monitor')
+    for time, (flow, soc) in enumerate([(0.5, 10), (-0.25, 12.5), (0, 11)]):
+        collector.step(time, make_inputs(flow, soc), 10)
+    collector.finalize()
+    results = collector.results()
+
+    assert not output_file.exists()
+    assert list(results.index) == list(pd.date_range('2012-06-01 23:30:00', periods=3, freq='15min'))
+    assert list(results.columns) == ['Battery1.soc', 'Controller1.flow2b']
+    assert list(results.dtypes) == ['float64', 'float64']
+    assert list(results['Battery1.soc']) == [10, 12.5, 11]
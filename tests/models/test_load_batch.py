@@ -0,0 +1,81 @@
+import pytest
+import numpy as np
+import illuminator.engine as engine
+from illuminator.models.Load.load_batch_v3 import LoadBatch
+
+
+@pytest.fixture
+def load_batch(monkeypatch):
+    """A LoadBatch simulator with three entities and a time resolution of 15 minutes"""
+    monkeypatch.setattr(engine, 'current_model', {'type': 'LoadBatch',
+                                                  'parameters': {'houses': [1, 2, 4],
+                                                                 'input_type': 'power',
+                                                                 'output_type': ['power', 'energy', 'power']},
+                                                  'inputs': {'load': 0},
+                                                  'outputs': {'load_dem': 0}})
+    model = LoadBatch()
+    model.init('Houses-0', time_resolution=900, sim_params={'Houses': {}})
+    model.create(3, 'LoadBatch')
+    return model
+
+
+def make_inputs(eid, load):
+    return {eid: {'load': {'CSVload-0.time-based_0': ('state', load)}}}
+
+
+class TestLoadBatch():
+    """
+    Unit tester for the batched load model
+    """
+
+    def test_arrays(self, load_batch):
+        """
+        Parameters are stored with one value per entity
+        """
+        assert load_batch.num_entities == 3
+        assert list(load_batch.parameter_values['houses']) == [1, 2, 4]
+        assert list(load_batch.parameter_values['input_type']) == ['power'] * 3
+
+    def test_default_parameters(self, monkeypatch):
+        """
+        Parameters left out of the configuration file take the defaults of the model
+        """
+        monkeypatch.setattr(engine, 'current_model', {'type': 'LoadBatch', 'parameters': {'houses': [1, 2, 3]}})
+        model = LoadBatch()
+        model.init('Houses-0', time_resolution=900, sim_params={'Houses': {}})
+        model.create(3, 'LoadBatch')
+
+        assert list(model.parameter_values['houses']) == [1, 2, 3]
+        assert list(model.parameter_values['input_type']) == ['energy'] * 3
+        assert list(model.parameter_values['output_type']) == ['power'] * 3
+
+    def test_step(self, load_batch):
+        """
+        All entities are stepped at once, entities without new inputs keep their last input
+        """
+        inputs = {**make_inputs('time-based_0', 2.0), **make_inputs('time-based_1', 2.0)}
+        assert load_batch.step(0, inputs) == 1
+        np.testing.assert_allclose(load_batch.output_values['load_dem'], [2.0, 1.0, 0.0])
+
+        load_batch.step(1, make_inputs('time-based_2', 1.0))
+        np.testing.assert_allclose(load_batch.output_values['load_dem'], [2.0, 1.0, 4.0])
+
+    def test_get_data(self, load_batch):
+        """
+        Entities are addressed one by one by mosaik
+        """
+        load_batch.step(0, {**make_inputs('time-based_1', 2.0), **make_inputs('time-based_2', 3.0)})
+        data = load_batch.get_data({'time-based_2': ['load_dem']})
+        assert data == {'time-based_2': {'load_dem': ('output', 12.0)}}
+
+        with pytest.raises(RuntimeError):
+            load_batch.get_data({'time-based_0': ['load']})
+
+    def test_invalid_type(self, monkeypatch):
+        """
+        Only 'power' and 'energy' are valid input and output types
+        """
+        monkeypatch.setattr(engine, 'current_model', {'type': 'LoadBatch', 'parameters': {'input_type': 'watts'}})
+        model = LoadBatch()
+        with pytest.raises(ValueError):
+            model.create(2, 'LoadBatch')
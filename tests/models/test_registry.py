@@ -0,0 +1,45 @@
+"""
+Unit tests for the registry of models.
+"""
+
+import subprocess
+import sys
+import pytest
+import illuminator.models as models
+
+
+def test_lazy_import():
+    """Importing the registry does not import the modules of the models"""
+    code = ("import sys, illuminator.models as models; "
+            "print(any(name in sys.modules for name in models.MODELS.values())); "
+            "models.PV; print(models.MODELS['PV'] in sys.modules, models.MODELS['Battery'] in sys.modules)")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+
+    assert output.split() == ['False', 'True', 'False']
+
+
+def test_subpackage_name():
+    """Importing a subpackage with the name of a model does not hide the model"""
+    import illuminator.models.Battery.battery_model  # noqa: F401
+
+    assert models.Battery.__name__ == 'Battery'
+    assert isinstance(models.Battery, type)
+
+
+class FakeEntryPoint:
+    name = 'MyModel'
+
+    def load(self):
+        return type('MyModel', (), {})
+
+
+def test_entry_points(monkeypatch):
+    """Models of other packages are registered with entry points"""
+    monkeypatch.setattr(models, '_entry_points', {'MyModel': FakeEntryPoint()})
+    monkeypatch.delitem(vars(models), 'MyModel', raising=False)
+
+    assert 'MyModel' in models.available_models()
+    assert models.MyModel.__name__ == 'MyModel'
+    with pytest.raises(AttributeError):
+        models.NoModel
+    monkeypatch.delitem(vars(models), 'MyModel')
@@ -0,0 +1,187 @@
+import calendar
+import os
+import arrow
+import pytest
+import illuminator.engine as engine
+from illuminator.models import CSV
+from illuminator.models.mosaik_csv import CSV as MosaikCSV
+import illuminator.models.time_series as time_series
+from illuminator.models.time_series import (acquire_time_series, convert_time_series, hold_time_series, is_binary_time_series,
+                                            load_time_series, release_time_series, shift_wall_time, to_strptime_format)
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'data.txt'
+    path.write_text('Data\n'
+                    'time,load # kW,price\n'
+                    '2012-01-01 00:00:00,0.1,3\n'
+                    '2012-01-01 00:15:00,0.25,4\n'
+                    '2012-01-01 00:30:00,1e-3,5\n')
+    return path
+
+
+def create_csv(monkeypatch, data_file, start, **parameters):
+    """Creates a CSV model for the data file"""
+    parameters = {'file_path': str(data_file), 'delimiter': ',', 'date_format': 'YYYY-MM-DD HH:mm:ss',
+                  'start': start, **parameters}
+    monkeypatch.setattr(engine, 'current_model', {'type': 'CSV', 'parameters': parameters})
+    import illuminator.models.CSV_reader_v3 as reader
+    monkeypatch.setattr(reader, 'current_model', engine.current_model)
+    csv = CSV()
+    csv.init('CSV-0', time_resolution=900, sim_params={'CSV': {}})
+    csv.create(1, 'CSV')
+    return csv
+
+
+def test_to_strptime_format():
+    assert to_strptime_format('YYYY-MM-DD HH:mm:ss') == '%Y-%m-%d %H:%M:%S'
+    assert to_strptime_format('DD/MM/YYYY HH:mm') == '%d/%m/%Y %H:%M'
+    assert to_strptime_format('X') is None
+
+
+def test_load_time_series(data_file):
+    series = load_time_series(str(data_file))
+    assert series.columns == ['time', 'load # kW', 'price']
+    assert len(series) == 3
+    assert list(series.timestamps[1:] - series.timestamps[:-1]) == [900, 900]
+    assert series.values.tolist() == [[0.1, 3], [0.25, 4], [0.001, 5]]
+    assert series.index_of(series.timestamps[0] + 1) == 1
+
+
+@pytest.mark.parametrize('start', ['2012-01-01 00:00:00', '2012-01-01 00:15:00'])
+def test_steps(monkeypatch, data_file, start):
+    """Every step sends the values of the row of its time, from the start date on"""
+    csv = create_csv(monkeypatch, data_file, start)
+    states = []
+    for time in range(3 if start.endswith('00:00:00') else 2):
+        next_time = csv.step(time, {}, max_advance=10)
+        states.append((next_time, csv.get_state('load'), csv.get_state('price')))
+    with pytest.raises(IndexError):
+        csv.step(time + 1, {})
+    csv.finalize()
+
+    expected = [(1, 0.1, 3), (2, 0.25, 4), (10, 1e-3, 5)]
+    assert states == (expected if start.endswith('00:00:00') else [(1, 0.25, 4), (10, 1e-3, 5)])
+
+
+def test_start_not_in_file(monkeypatch, data_file):
+    with pytest.raises(ValueError):
+        create_csv(monkeypatch, data_file, '2012-01-02 00:00:00')
+    assert time_series._cache == {}
+
+
+@pytest.mark.parametrize('local_time', [False, True])
+def test_daylight_saving_time(monkeypatch, tmp_path, local_time):
+    """Steps are timed on the wall clock of the time zone, like arrow, the gap at the start of summer time is skipped"""
+    times = ['01:30', '01:45'] + ([] if local_time else ['02:00', '02:15', '02:30', '02:45']) + ['03:00']
+    data_file = tmp_path / 'data.txt'
+    data_file.write_text('Data\ntime,load\n' + ''.join(f'2012-03-25 {time}:00,{i}\n' for i, time in enumerate(times)))
+    csv = create_csv(monkeypatch, data_file, '2012-03-25 01:30:00', tzinfo='Europe/Amsterdam')
+    csv.step(0, {})
+    csv.step(1, {})
+    if local_time:
+        csv.step(2, {})
+        assert csv.get_state('load') == 2
+    else:
+        with pytest.raises(IndexError, match='expected "2012-03-25T03:00:00'):
+            csv.step(2, {})
+    csv.finalize()
+
+
+def test_shift_wall_time():
+    """Wall-clock timestamps are shifted like arrow shifts dates"""
+    start = arrow.get('2012-03-25 01:00:00', 'YYYY-MM-DD HH:mm:ss', tzinfo='Europe/Amsterdam')
+    timestamp = calendar.timegm(start.naive.timetuple())
+    for seconds in (0, 3600, 5400, 7200, 217 * 86400 + 3600):
+        expected = calendar.timegm(start.shift(seconds=seconds).naive.timetuple())
+        assert shift_wall_time(timestamp, seconds, start.tzinfo) == expected
+    assert shift_wall_time(timestamp, 3600) == timestamp + 3600
+
+
+@pytest.mark.parametrize('gap', [False, True])
+def test_binary_round_trip(data_file, gap):
+    """Binary files keep the timestamps, columns and values of the text file"""
+    if gap:
+        data_file.write_text(data_file.read_text() + '2012-01-01 01:30:00,2,6\n')
+    output_file = convert_time_series(str(data_file))
+    assert output_file.endswith('.its') and is_binary_time_series(output_file)
+    assert not is_binary_time_series(str(data_file))
+
+    text, binary = load_time_series(str(data_file)), load_time_series(output_file)
+    assert binary.columns == text.columns
+    assert binary.timestamps.tolist() == text.timestamps.tolist()
+    assert binary.values.tolist() == text.values.tolist()
+    assert binary.date(1) == text.date(1) == '2012-01-01 00:15:00'
+
+
+def test_binary(monkeypatch, data_file):
+    """The CSV model reads binary files by index"""
+    binary_file = convert_time_series(str(data_file))
+    csv = create_csv(monkeypatch, binary_file, '2012-01-01 00:15:00')
+    assert csv.step(0, {}) == 1
+    assert (csv.get_state('load'), csv.get_state('price')) == (0.25, 4)
+    csv.finalize()
+
+
+class TestCache():
+    """
+    Tests for the process-wide cache of parsed time series
+    """
+
+    def test_shared_until_released(self, data_file):
+        first = acquire_time_series(str(data_file))
+        second = acquire_time_series(str(data_file))
+        assert first is second
+        assert not first.values.flags.writeable
+
+        release_time_series(first)
+        assert acquire_time_series(str(data_file)) is first
+        release_time_series(first)
+        release_time_series(first)
+        assert time_series._cache == {}
+
+    def test_modified_file(self, data_file):
+        """A modified file is parsed again"""
+        first = acquire_time_series(str(data_file))
+        data_file.write_text(data_file.read_text() + '2012-01-01 00:45:00,2,6\n')
+        os.utime(data_file, ns=(0, 10**9))
+        second = acquire_time_series(str(data_file))
+        assert len(second) == 4
+        release_time_series(first)
+        release_time_series(second)
+
+    def test_models_share_file(self, monkeypatch, data_file):
+        """CSV models reading the same file share the parsed time series"""
+        with hold_time_series([{'type': 'CSV', 'parameters': {'file_path': str(data_file), 'delimiter': ',',
+                                                              'date_format': 'YYYY-MM-DD HH:mm:ss'}}]):
+            csvs = [create_csv(monkeypatch, data_file, '2012-01-01 00:00:00') for _ in range(2)]
+            assert csvs[0].series is csvs[1].series
+            for csv in csvs:
+                csv.finalize()
+            assert len(time_series._cache) == 1
+        assert time_series._cache == {}
+
+    def test_mosaik_csv(self, data_file):
+        """The mosaik CSV simulator reads the shared time series and releases it on finalize"""
+        sims = [MosaikCSV() for _ in range(2)]
+        for i, sim in enumerate(sims):
+            meta = sim.init(f'CSV-{i}', time_resolution=900, sim_start='2012-01-01 00:15:00', datafile=str(data_file))
+            sim.create(1, 'CSV')
+        assert meta['models']['CSV']['attrs'] == ['load', 'price']
+        assert sims[0].series is sims[1].series
+
+        assert sims[0].step(0, {}, 10) == 1
+        assert sims[0].get_data({'CSV_0': ['load', 'price']}) == {'CSV_0': {'load': 0.25, 'price': 4.0}}
+        assert sims[0].step(1, {}, 10) == 10
+        assert sims[0].get_data({'CSV_0': ['load']}) == {'CSV_0': {'load': 1e-3}}
+        with pytest.raises(IndexError, match='Wrong date'):
+            sims[1].step(1, {}, 10)
+
+        for sim in sims:
+            sim.finalize()
+        assert time_series._cache == {}
+
+        with pytest.raises(ValueError, match='not in CSV file'):
+            MosaikCSV().init('CSV-2', time_resolution=900, sim_start='2011-12-31 23:45:00', datafile=str(data_file))
+        assert time_series._cache == {}
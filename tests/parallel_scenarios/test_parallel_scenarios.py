@@ -1,9 +1,10 @@
 from illuminator import parallel_scenarios
-from illuminator.engine import Simulation
+from illuminator.engine import Simulation, compute_mosaik_end_time
 import pytest
 from ruamel.yaml import YAML
 import csv
 import copy
+import importlib.util
 from pathlib import Path
 import pandas as pd
 import numpy as np
@@ -307,6 +308,20 @@ def test_generate_combinations_aligned_raises():
         parallel_scenarios._generate_combinations_from_removed_items(items, align=True)
 
 
+def test_sample_combinations():
+    """Sampled combinations have the format of the generated ones, at most 'samples' of them"""
+    items = [
+        ('model1', 'parameter', 'p1', [1, 2, 3, 4]),
+        ('model2', 'parameter', 'pC', ["file1.txt", "file2.txt"]),
+    ]
+    result = parallel_scenarios._sample_combinations(items, {'method': 'latin_hypercube', 'samples': 4, 'seed': 3})
+
+    assert [combination['simulationID'] for combination in result] == [1, 2, 3, 4]
+    assert sorted(combination[('model1', 'parameter', 'p1')] for combination in result) == [1, 2, 3, 4]
+    assert all(combination[('model2', 'parameter', 'pC')] in ("file1.txt", "file2.txt") for combination in result)
+    assert result == parallel_scenarios._sample_combinations(items, {'method': 'latin_hypercube', 'samples': 4, 'seed': 3})
+
+
 # Test _get_list_subset
 
 # Case 1: More simulations than MPI processes, divides evenly
@@ -365,6 +380,178 @@ def test_get_list_subset_empty_list():
         assert result == [], f"Rank {rank} should get empty list, got {result}"
 
 
+# Test _run_dynamic
+
+class FakeComm:
+    """Communicator of rank 0 receiving scripted (source, report) messages from its workers."""
+
+    def __init__(self, size, rank=0, messages=()):
+        self.size, self.rank = size, rank
+        self.messages = list(messages)
+        self.sent = []
+
+    def Get_size(self):
+        return self.size
+
+    def Get_rank(self):
+        return self.rank
+
+    def recv(self, source=None, tag=None, status=None):
+        worker, report = self.messages.pop(0)
+        status.Set_source(worker)
+        return report
+
+    def send(self, obj, dest, tag):
+        self.sent.append((dest, obj))
+
+
+def test_run_dynamic_single_process():
+    """With one process, rank 0 runs all tasks, the longest expected first"""
+    ran = []
+    def run(task):
+        ran.append(task)
+        if task == 'b':
+            raise RuntimeError('failed')
+
+    statuses = parallel_scenarios._run_dynamic(['a', 'b', 'c'], run, [1, 3, 2], comm=FakeComm(1))
+
+    assert ran == ['b', 'c', 'a']
+    assert [s['index'] for s in statuses] == [0, 1, 2]
+    assert [s['status'] for s in statuses] == ['done', 'failed', 'done']
+    assert 'failed' in statuses[1]['error']
+
+
+def test_run_dynamic_master():
+    """Rank 0 hands out the next task to the worker that reports, and stops idle workers"""
+    done = lambda index, rank: {'index': index, 'rank': rank, 'status': 'done', 'error': None, 'seconds': 0}
+    comm = FakeComm(3, messages=[(1, None), (2, None), (2, done(1, 2)), (2, done(2, 2)), (1, done(0, 1))])
+
+    statuses = parallel_scenarios._run_dynamic(['a', 'b', 'c'], lambda task: None, [2, 3, 1], comm=comm)
+
+    assert comm.sent == [(1, 1), (2, 0), (2, 2), (2, None), (1, None)]
+    assert [s['index'] for s in statuses] == [0, 1, 2]
+
+
+def test_expected_cost(scenario):
+    """The expected cost is the number of time steps times the number of models"""
+    steps = compute_mosaik_end_time('2007-07-02 00:00:00', '2007-07-02 23:45:00', 900)
+    assert parallel_scenarios._expected_cost(scenario) == steps * len(scenario['models'])
+
+
+
+# Test the processes backend
+
+def test_run_parallel_processes(tmp_path):
+    """A pool of local processes writes the same results as a simulation run in this process"""
+    simlist = []
+    for name in ('a', 'b'):
+        simulation = Simulation('tests/data/Tutorial_1.yaml')
+        simulation.set_monitor_param('file', str(tmp_path / f'{name}.csv'))
+        simlist.append(simulation)
+    expected = Simulation('tests/data/Tutorial_1.yaml')
+    expected.set_monitor_param('file', str(tmp_path / 'expected.csv'))
+    expected.run()
+
+    statuses = parallel_scenarios.run_parallel(simlist, backend='processes', workers=2)
+
+    assert [(s['index'], s['rank'], s['status']) for s in statuses] == [(0, None, 'done'), (1, None, 'done')]
+    for name in ('a', 'b'):
+        assert (tmp_path / f'{name}.csv').read_text() == (tmp_path / 'expected.csv').read_text()
+
+
+def test_run_parallel_file_in_memory(tmp_path):
+    """Scenarios are generated in memory, and only written when create_scenario_files is set"""
+    yaml = YAML()
+    with open('tests/data/Tutorial_1.yaml') as f:
+        config = yaml.load(f)
+    load = next(model for model in config['models'] if model['name'] == 'Load1')
+    load['multi_parameters'] = {'houses': [1, 3]}
+    config['monitor']['file'] = str(tmp_path / 'out.csv')
+    scenario_file = tmp_path / 'sweep.yaml'
+    with open(scenario_file, 'w') as f:
+        yaml.dump(config, f)
+
+    statuses = parallel_scenarios.run_parallel_file(str(scenario_file), backend='processes', workers=2,
+                                                    result_store=str(tmp_path / 'store'))
+
+    assert [s['status'] for s in statuses] == ['done', 'done']
+    if importlib.util.find_spec('pyarrow'):
+        store = pd.read_parquet(tmp_path / 'store', columns=['simulationID', 'Load1.parameter.houses'])
+        assert sorted(set(zip(store['simulationID'].astype(int), store['Load1.parameter.houses']))) == [(1, 1), (2, 3)]
+    assert (tmp_path / 'out_1.csv').read_text() != (tmp_path / 'out_2.csv').read_text()
+    assert not (tmp_path / 'sweep_1.yaml').exists()
+
+    parallel_scenarios.run_parallel_file(str(scenario_file), backend='processes', workers=1, create_scenario_files=True)
+
+    with open(tmp_path / 'sweep_2.yaml') as f:
+        scenario = yaml.load(f)
+    assert next(model for model in scenario['models'] if model['name'] == 'Load1')['parameters']['houses'] == 3
+
+
+def test_run_parallel_file_cache(tmp_path):
+    """Scenarios that completed before are restored from the cache instead of run"""
+    yaml = YAML()
+    with open('tests/data/Tutorial_1.yaml') as f:
+        config = yaml.load(f)
+    load = next(model for model in config['models'] if model['name'] == 'Load1')
+    load['multi_parameters'] = {'houses': [1, 3]}
+    config['monitor']['file'] = str(tmp_path / 'out.csv')
+    scenario_file = tmp_path / 'sweep.yaml'
+    with open(scenario_file, 'w') as f:
+        yaml.dump(config, f)
+    cache = str(tmp_path / 'cache')
+
+    first = parallel_scenarios.run_parallel_file(str(scenario_file), backend='processes', workers=2, cache=cache)
+    results = (tmp_path / 'out_2.csv').read_text()
+    (tmp_path / 'out_2.csv').unlink()
+    second = parallel_scenarios.run_parallel_file(str(scenario_file), backend='processes', workers=2, cache=cache)
+
+    assert [s['cached'] for s in first] == [False, False]
+    assert [s['cached'] for s in second] == [True, True]
+    assert (tmp_path / 'out_2.csv').read_text() == results
+
+
+# Test run_time_parallel
+
+def test_handoff_items():
+    """States and the inputs of time-shifted connections are handed off, CSV states are not"""
+    handoff = parallel_scenarios._handoff_items(Simulation('tests/data/Tutorial_1.yaml').config)
+
+    assert handoff == {
+        ('states', 'Wind1', 'u60'): 'Wind1.u60',
+        ('states', 'Battery1', 'mod'): 'Battery1.mod',
+        ('states', 'Battery1', 'soc'): 'Battery1.soc',
+        ('states', 'Battery1', 'flag'): 'Battery1.flag',
+        ('inputs', 'Battery1', 'flow2b'): 'Controller1.flow2b',
+    }
+
+
+def test_run_time_parallel(tmp_path):
+    """Time windows with state handoff give the same results as a serial run"""
+    def simulation(output_file):
+        simulation = Simulation('tests/data/Tutorial_1.yaml')
+        simulation.config['scenario']['end_time'] = '2012-06-03 00:00:00'
+        for model in simulation.config['models']:
+            if model['type'] == 'CSV':
+                model['parameters']['preload'] = True
+        simulation.set_monitor_param('file', str(output_file))
+        return simulation
+
+    simulation(tmp_path / 'serial.csv').run(engine='direct')
+    report = simulation(tmp_path / 'windows.csv').run_time_parallel(3, workers=2, engine='direct')
+
+    assert report['converged']
+    assert report['history'][0]['windows'] == [0, 1, 2]
+    assert (tmp_path / 'windows.csv').read_text() == (tmp_path / 'serial.csv').read_text()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['serial.csv', 'windows.csv']
+
+
+@pytest.mark.parametrize('backend, workers', [('threads', None), ('processes', 0)])
+def test_invalid_backend(backend, workers):
+    with pytest.raises(ValueError):
+        parallel_scenarios.run_parallel([], backend=backend, workers=workers)
+
+
 # Test _generate_scenario
 def test_generate_scenario(scenario, scenario_multiparams_removed):
     """Test that parameters are correctly injected and simulationID appended to monitor file."""
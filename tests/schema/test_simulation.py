@@ -2,8 +2,13 @@
 Unit tests for the simulation.py of the schemas module.
 """
 
-from illuminator.schema.simulation import load_config_file
+import copy
+import pytest
+from illuminator.schema import simulation
+from illuminator.schema.compiler import compile_schema
+from illuminator.schema.simulation import load_config_file, schema, validate_config
 from ruamel.yaml import YAML
+from schema import Optional, Regex, Schema, SchemaError
 
 SCENARIO_FILE = './tests/schema/scenario.example.yaml'
 
@@ -13,5 +18,75 @@ def test_load_config_file():
     load_config_file(SCENARIO_FILE)
 
 
-# TOOD: add tests to check if exceptions are raised
-    
\ No newline at end of file
+def test_compiled_schema():
+    """The compiled schema gives the same results and errors as the schema"""
+
+    with open(SCENARIO_FILE, 'r', encoding='utf-8') as _file:
+        data = YAML(typ='safe').load(_file)
+
+    assert validate_config(copy.deepcopy(data)) == schema.validate(copy.deepcopy(data))
+
+    data['connections'][0]['from'] = 'CSVB'
+    data['models'][0]['multi_parameters'] = {'m_tilt': 'range(1, 2)'}
+    for invalid in ({**data, 'monitor': {}}, {**data, 'connections': data['connections'][:1]}, {**data, 'models': data['models'][:1]}):
+        with pytest.raises(simulation.SchemaError) as expected:
+            schema.validate(copy.deepcopy(invalid))
+        with pytest.raises(type(expected.value)) as compiled:
+            validate_config(copy.deepcopy(invalid))
+        assert compiled.value.code == expected.value.code
+
+
+class RenamedRegex(Regex):
+    """A `Regex` of a version of the schema library that stores its pattern under another name"""
+
+    def __init__(self, pattern):
+        super().__init__(pattern)
+        self._compiled = self.__dict__.pop('_pattern')
+
+    def validate(self, data, **kwargs):
+        if isinstance(data, str) and self._compiled.search(data):
+            return data
+        raise SchemaError(f"{data!r} does not match {self.pattern_str!r}")
+
+
+def test_compile_fallback():
+    """Schemas that use other internals of the schema library are validated by the library"""
+
+    name_schema = Schema({'name': RenamedRegex(r'^\w+$'), Optional('entities', default=1): int})
+    validate = compile_schema(name_schema)
+
+    assert validate.__self__ is name_schema  # Schema.validate, not compiled
+    assert validate({'name': 'PV1'}) == {'name': 'PV1', 'entities': 1}
+    with pytest.raises(SchemaError, match="does not match"):
+        validate({'name': 'PV 1'})
+
+
+def test_cached_config_file(monkeypatch):
+    """Identical files are validated once, and every call returns its own copy"""
+
+    calls = []
+    monkeypatch.setattr(simulation, '_validated_files', {})
+    monkeypatch.setattr(simulation, 'validate_config', lambda data: calls.append(data) or data)
+
+    first = load_config_file(SCENARIO_FILE)
+    first['models'].clear()
+    second = load_config_file(SCENARIO_FILE)
+
+    assert len(calls) == 1
+    assert second['models']
+
+
+def test_cached_config_file_directory(monkeypatch, tmp_path):
+    """The directory of the monitor file is checked every time a cached file is loaded"""
+
+    monkeypatch.setattr(simulation, '_validated_files', {})
+    directory = tmp_path / 'results'
+    directory.mkdir()
+    scenario = tmp_path / 'scenario.yaml'
+    content = open(SCENARIO_FILE, encoding='utf-8').read()
+    scenario.write_text(content.replace("file: './out.csv'", f"file: '{directory / 'out.csv'}'"))
+
+    assert load_config_file(str(scenario))['monitor']['file'] == str(directory / 'out.csv')
+    directory.rmdir()
+    with pytest.raises(SchemaError, match="Path for 'file' does not exists"):
+        load_config_file(str(scenario))
@@ -0,0 +1,62 @@
+"""
+Unit tests for the direct-execution engine.
+"""
+
+import pytest
+from illuminator.direct import DirectEntity, DirectSimulator, DirectWorld
+from illuminator.engine import Simulation
+
+
+def add_simulator(world, sid):
+    """Adds a time-based simulator without a model instance to the world"""
+    sim = world.sims[sid] = DirectSimulator(sid, instance=None, meta={'type': 'time-based', 'models': {}})
+    return sim
+
+
+class TestDirectWorld:
+
+    def test_step_order(self):
+        """Simulators are sorted by their connections, time-shifted connections are ignored"""
+        world = DirectWorld({})
+        controller, battery, pv = (add_simulator(world, sid) for sid in ('Controller-0', 'Battery-0', 'PV-0'))
+        world.connect(DirectEntity('PV-0', 'e', 'PV'), DirectEntity('Controller-0', 'e', 'Controller'), ('pv_gen', 'pv_gen'))
+        world.connect(DirectEntity('Battery-0', 'e', 'Battery'), DirectEntity('Controller-0', 'e', 'Controller'), ('soc', 'soc'))
+        world.connect(DirectEntity('Controller-0', 'e', 'Controller'), DirectEntity('Battery-0', 'e', 'Battery'),
+                      ('flow2b', 'flow2b'), time_shifted=True, initial_data={'flow2b': 0})
+
+        assert world.step_order() == [battery, pv, controller]
+
+    def test_cycle(self):
+        """Connections without time shift must not form a cycle"""
+        world = DirectWorld({})
+        add_simulator(world, 'A-0')
+        add_simulator(world, 'B-0')
+        world.connect(DirectEntity('A-0', 'e', 'A'), DirectEntity('B-0', 'e', 'B'), ('x', 'x'))
+        world.connect(DirectEntity('B-0', 'e', 'B'), DirectEntity('A-0', 'e', 'A'), ('y', 'y'))
+
+        with pytest.raises(ValueError):
+            world.step_order()
+
+    def test_time_shifted_initial_data(self):
+        """Time-shifted connections read the initial data before the first step"""
+        world = DirectWorld({})
+        add_simulator(world, 'A-0')
+        b = add_simulator(world, 'B-0')
+        with pytest.raises(ValueError):
+            world.connect(DirectEntity('A-0', 'e', 'A'), DirectEntity('B-0', 'e', 'B'), ('x', 'x'), time_shifted=True)
+        world.connect(DirectEntity('A-0', 'e', 'A'), DirectEntity('B-0', 'e', 'B'), ('x', 'x'),
+                      time_shifted=True, initial_data={'x': 1})
+
+        assert world.get_input_data(b, 0) == {'e': {'x': {'A-0.e': 1}}}
+
+
+def test_same_results_as_mosaik(tmp_path):
+    """The direct engine writes the same results as Mosaik"""
+    outputs = {}
+    for engine in ('mosaik', 'direct'):
+        simulation = Simulation('tests/data/Tutorial_1.yaml')
+        simulation.set_monitor_param('file', str(tmp_path / f'{engine}.csv'))
+        simulation.run(engine=engine)
+        outputs[engine] = (tmp_path / f'{engine}.csv').read_text()
+
+    assert outputs['direct'] == outputs['mosaik']
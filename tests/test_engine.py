@@ -4,7 +4,8 @@ Unit tests for main.py of CLI package.
 
 import pytest
 import mosaik
-from illuminator.engine import start_simulators, compute_mosaik_end_time
+from illuminator.engine import start_simulators, compute_mosaik_end_time, split_item, pair_entities, expand_monitor_items, \
+    plan_connections, build_connections
 
 
 @pytest.fixture
@@ -117,3 +118,102 @@ class TestStartSimulators:
 
         with pytest.raises(ValueError):
             start_simulators(mosaik_world, yaml_models)
+
+
+class TestBatchedItems:
+    """
+    Tests for addressing entities of batched models in connections and the monitor.
+    """
+
+    def test_split_item(self):
+        """Items with and without an entity index are split into model, index and attribute"""
+
+        assert split_item('Load1.load_dem') == ('Load1', None, 'load_dem')
+        assert split_item('Houses[12].load_dem') == ('Houses', 12, 'load_dem')
+
+    def test_pair_entities(self):
+        """Equal lengths are paired element-wise, single entities are broadcast"""
+
+        assert pair_entities(['a0', 'a1'], ['b0', 'b1']) == [('a0', 'b0'), ('a1', 'b1')]
+        assert pair_entities(['a0'], ['b0', 'b1']) == [('a0', 'b0'), ('a0', 'b1')]
+        assert pair_entities(['a0', 'a1'], ['b0']) == [('a0', 'b0'), ('a1', 'b0')]
+
+        with pytest.raises(ValueError):
+            pair_entities(['a0', 'a1'], ['b0', 'b1', 'b2'])
+
+    def test_expand_monitor_items(self):
+        """Items of batched models are monitored per entity"""
+
+        models = [{'name': 'Houses', 'type': 'LoadBatch', 'entities': 3},
+                  {'name': 'Battery1', 'type': 'Battery'}]
+        items = ['Battery1.soc', 'Houses.load_dem', 'Houses[1].consumption']
+
+        assert expand_monitor_items(items, models) == ['Battery1.soc', 'Houses[0].load_dem', 'Houses[1].load_dem',
+                                                       'Houses[2].load_dem', 'Houses[1].consumption']
+
+
+
+class FakeEntity:
+    def __init__(self, full_id):
+        self.full_id = full_id
+
+
+class FakeWorld:
+    def __init__(self):
+        self.connections = []
+
+    def connect(self, src, dest, *attr_pairs, **kwargs):
+        self.connections.append((src.full_id, dest.full_id, attr_pairs, kwargs))
+
+
+class TestBuildConnections:
+    """
+    Tests for validating the connections and connecting the entities in bulk.
+    """
+
+    models = [{'name': 'PV1', 'type': 'PV', 'inputs': {'u': 0}, 'outputs': {'pv_gen': 0}, 'states': {'g_aoi': 0}},
+              {'name': 'Houses', 'type': 'LoadBatch', 'entities': 2, 'outputs': {'load_dem': 0}},
+              {'name': 'Controller1', 'type': 'Controller', 'inputs': {'pv_gen': 0, 'load_dem': 0, 'soc': 0},
+               'outputs': {'flow2b': 0}}]
+
+    @staticmethod
+    def connection(origin, destination, time_shifted=False):
+        return {'from': origin, 'to': destination, 'time_shifted': time_shifted}
+
+    def test_bulk_connections(self):
+        """Attributes connected between the same entities are connected in a single call"""
+
+        model_entities = {'PV1': [FakeEntity('PV1-0.PV1')],
+                          'Houses': [FakeEntity('Houses-0.Houses_0'), FakeEntity('Houses-0.Houses_1')],
+                          'Controller1': [FakeEntity('Controller1-0.Controller1')]}
+        connections = [self.connection('PV1.pv_gen', 'Controller1.pv_gen'),
+                       self.connection('Houses[1].load_dem', 'Controller1.load_dem'),
+                       self.connection('PV1.g_aoi', 'Controller1.soc'),
+                       self.connection('Controller1.flow2b', 'PV1.u', time_shifted=True)]
+        world = build_connections(FakeWorld(), model_entities, connections, self.models)
+
+        assert [connection[:3] for connection in world.connections] == [
+            ('Controller1-0.Controller1', 'PV1-0.PV1', (('flow2b', 'u'),)),
+            ('PV1-0.PV1', 'Controller1-0.Controller1', (('pv_gen', 'pv_gen'), ('g_aoi', 'soc'))),
+            ('Houses-0.Houses_1', 'Controller1-0.Controller1', (('load_dem', 'load_dem'),))]
+        assert world.connections[0][3]['time_shifted']
+
+    def test_all_errors(self):
+        """All invalid connections are reported at once"""
+
+        connections = [self.connection('PV1.pv_gen', 'Controller1.pv_gen'),
+                       self.connection('PV1.pv_gen', 'Controller1.load_dem'),  # physical split
+                       self.connection('Wind1.wind_gen', 'Controller1.pv_gen'),  # unknown model
+                       self.connection('Houses[2].load_dem', 'Controller1.load_dem'),  # unknown entity
+                       self.connection('PV1.g_aoi', 'Controller1.soc'),
+                       self.connection('PV1.g_aoi', 'Controller1.load_dem')]  # split of a state is allowed
+
+        with pytest.raises(ValueError) as error:
+            plan_connections(connections, self.models)
+        assert str(error.value).count('\n - ') == 3
+
+    def test_duplicate_model_names(self):
+        """Model names must be unique"""
+
+        with pytest.raises(ValueError):
+            plan_connections([], self.models + [{'name': 'PV1', 'type': 'PV'}])
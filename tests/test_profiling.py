@@ -0,0 +1,73 @@
+"""
+Unit tests for the timing of the models of a simulation.
+"""
+
+import json
+import numpy as np
+import pytest
+from illuminator.engine import Simulation
+from illuminator.profiling import StepProfiler, Timing, profile_steps
+from illuminator.runner import ScenarioRunner
+
+
+def test_summary():
+    """Calls are summarized per model and method, the slowest steps first"""
+    profiler = StepProfiler()
+    for seconds in (0.1, 0.3):
+        profiler.record('Battery1', 'step', seconds)
+    profiler.record('PV1', 'step', 1.0)
+    profiler.record('PV1', 'set_outputs', 0.5)
+
+    summary = profiler.summary()
+
+    assert list(summary) == ['PV1', 'Battery1']
+    assert summary['Battery1']['step']['calls'] == 2
+    assert summary['Battery1']['step']['total'] == pytest.approx(0.4)
+    assert summary['Battery1']['step']['mean'] == pytest.approx(0.2)
+    assert summary['Battery1']['step']['p99'] == pytest.approx(0.298, rel=0.012)
+    assert 'PV1' in profiler.table()
+
+
+def test_timing():
+    """Percentiles are estimated from a histogram of fixed size"""
+    durations = [1e-5 * 1.001 ** i for i in range(10000)] + [0.0, 2e3]
+    timing = Timing()
+    for seconds in durations:
+        timing.add(seconds)
+
+    assert timing.calls == len(durations)
+    assert timing.total == pytest.approx(sum(durations))
+    assert len(timing.buckets) == 1002
+    expected = np.percentile(durations, 99)
+    assert timing.percentile(99) == pytest.approx(expected, rel=0.012)
+    assert timing.percentile(100) == 2e3
+
+
+def test_profile_run(tmp_path):
+    """A profiled run times the steps of every model and of the collector"""
+    simulation = Simulation('tests/data/Tutorial_1.yaml')
+    simulation.set_monitor_param('file', str(tmp_path / 'out.csv'))
+    simulation.run(engine='direct', profile=str(tmp_path / 'profile.json'))
+
+    profile = json.loads((tmp_path / 'profile.json').read_text())
+    names = {model['name'] for model in simulation.config['models']} | {'Collector'}
+    assert profile['scenario'] == 'Tutorial 1'
+    assert set(profile['models']) == names
+    assert profile['models']['Battery1']['type'] == 'Battery'
+    assert all(model['step']['calls'] == 95 for model in profile['models'].values())
+    assert profile['models']['PV1']['set_outputs']['calls'] == 95
+
+
+def test_reused_models(tmp_path):
+    """Models reused by a runner are only timed while the profiler is active"""
+    simulation = Simulation('tests/data/Tutorial_1.yaml')
+    simulation.set_monitor_param('file', str(tmp_path / 'out.csv'))
+    for model in simulation.config['models']:
+        if model['type'] == 'CSV':
+            model['parameters']['preload'] = True
+    with ScenarioRunner() as runner:
+        with profile_steps() as profiler:
+            runner.run(simulation.config)
+        runner.run(simulation.config)
+
+    assert profiler.summary()['Battery1']['step']['calls'] == 95
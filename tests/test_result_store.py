@@ -0,0 +1,54 @@
+"""
+Unit tests for the result store of parallel scenarios.
+"""
+
+import pytest
+from illuminator.result_store import read_result_store, read_scenario_index, write_result_store
+
+pytest.importorskip('pyarrow')
+
+
+def write_monitor_file(path, values):
+    path.write_text('date,Battery1.soc\n' + ''.join(f'2012-06-01 00:{15 * i:02d}:00,{v}\n' for i, v in enumerate(values)))
+    return str(path)
+
+
+def test_write_and_read(tmp_path):
+    """All scenarios are read as one data frame, with their parameters as columns"""
+    scenarios = [
+        {'simulationID': 1, 'file': write_monitor_file(tmp_path / 'out_1.csv', [10, 11, 12]),
+         'parameters': {'Battery1.parameter.max_energy': 50, 'PV1.parameter.file': 'a.txt'}},
+        {'simulationID': 2, 'file': write_monitor_file(tmp_path / 'out_2.csv', [10.5, 11, 11.5]),
+         'parameters': {'Battery1.parameter.max_energy': 60.5, 'PV1.parameter.file': 'b.txt'}},
+    ]
+    store = tmp_path / 'store'
+
+    assert write_result_store(str(store), scenarios) == 2
+
+    df = read_result_store(str(store))
+    assert list(df['simulationID']) == [1, 1, 1, 2, 2, 2]
+    assert list(df['Battery1.soc']) == [10, 11, 12, 10.5, 11, 11.5]
+    assert df['Battery1.soc'].dtype == 'float64'
+    assert list(df['Battery1.parameter.max_energy']) == [50, 50, 50, 60.5, 60.5, 60.5]
+    assert list(df['PV1.parameter.file'].astype(str)) == ['a.txt'] * 3 + ['b.txt'] * 3
+
+    selected = read_result_store(str(store), columns=['Battery1.soc'], simulation_ids=[2])
+    assert list(selected.columns) == ['simulationID', 'Battery1.soc']
+    assert list(selected['Battery1.soc']) == [10.5, 11, 11.5]
+
+    index = read_scenario_index(str(store))
+    assert list(index['simulationID']) == [1, 2]
+    assert list(index['Battery1.parameter.max_energy']) == [50, 60.5]
+
+
+def test_missing_results(tmp_path):
+    """Scenarios without results are skipped"""
+    scenarios = [
+        {'simulationID': 1, 'file': write_monitor_file(tmp_path / 'out_1.csv', [1]), 'parameters': {'p': 1}},
+        {'simulationID': 2, 'file': str(tmp_path / 'out_2.csv'), 'parameters': {'p': 2}},
+    ]
+
+    with pytest.warns(UserWarning):
+        assert write_result_store(str(tmp_path / 'store'), scenarios) == 1
+
+    assert list(read_scenario_index(str(tmp_path / 'store'))['simulationID']) == [1]
@@ -0,0 +1,86 @@
+"""
+Unit tests for the runner of many scenarios in the same process.
+"""
+
+import copy
+import pandas as pd
+import illuminator.runner as runner_module
+from illuminator.direct import DirectWorld, UnsupportedSimulatorError
+from illuminator.engine import Simulation
+from illuminator.models import time_series
+from illuminator.runner import ScenarioRunner
+from illuminator.schema.simulation import load_config_file
+
+
+def make_config(houses, monitor_file):
+    config = load_config_file('tests/data/Tutorial_1.yaml')
+    for model in config['models']:
+        if model['type'] == 'CSV':
+            model['parameters']['preload'] = True
+        if model['name'] == 'Load1':
+            model['parameters']['houses'] = houses
+    config['monitor']['file'] = str(monitor_file)
+    return config
+
+
+def test_same_results_as_simulation(tmp_path):
+    """Scenarios run on a warm world give the same results as new simulations"""
+    expected = {}
+    for houses in (1, 3):
+        Simulation(make_config(houses, tmp_path / f'expected_{houses}.csv')).run()
+        expected[houses] = (tmp_path / f'expected_{houses}.csv').read_text()
+
+    with ScenarioRunner() as runner:
+        for houses in (1, 3, 1):
+            runner.run(make_config(houses, tmp_path / f'warm_{houses}.csv'))
+            assert (tmp_path / f'warm_{houses}.csv').read_text() == expected[houses]
+
+    assert runner.runs == 3
+    assert runner.warm_runs == 2
+
+
+def test_initial_states(tmp_path):
+    """The states of the models are restored to the configuration for every scenario"""
+    config = make_config(5, tmp_path / 'out.csv')
+    initial = copy.deepcopy(config)
+    with ScenarioRunner() as runner:
+        runner.run(config)
+        first = (tmp_path / 'out.csv').read_text()
+        runner.run(config)
+
+    assert (tmp_path / 'out.csv').read_text() == first
+    assert config == initial
+
+
+def test_return_results(tmp_path):
+    """Results returned in memory are those written to the monitor file"""
+    Simulation(make_config(3, tmp_path / 'expected.csv')).run()
+    expected = pd.read_csv(tmp_path / 'expected.csv', index_col='date', parse_dates=True)
+
+    results = Simulation(make_config(3, tmp_path / 'simulation.csv')).run(return_results=True)
+    with ScenarioRunner() as runner:
+        runner.run(make_config(3, tmp_path / 'warm.csv'))
+        warm_results = runner.run(make_config(3, tmp_path / 'warm.csv'), return_results=True)
+
+    for df in (results, warm_results):
+        pd.testing.assert_frame_equal(df, expected, check_dtype=False, check_freq=False)
+        assert (df.dtypes == 'float64').all()
+    assert not (tmp_path / 'simulation.csv').exists()
+
+
+def test_unsupported_scenario(tmp_path, monkeypatch):
+    """The simulators started for a scenario that the direct engine can not run are finalized"""
+    def validate(world):
+        raise UnsupportedSimulatorError('event-based')
+
+    runs = []
+    monkeypatch.setattr(DirectWorld, '_validate', validate)
+    monkeypatch.setattr(runner_module, 'Simulation', lambda config: type('Run', (), {
+        'run': lambda self, return_results: runs.append(config)})())
+    with ScenarioRunner() as runner:
+        runner.run(make_config(1, tmp_path / 'out.csv'))
+        runner.run(make_config(1, tmp_path / 'out.csv'))
+
+    assert len(runs) == 2
+    assert runner.warm_runs == 0
+    assert time_series._cache == {}  # the preloaded files were released by the CSV models
@@ -0,0 +1,55 @@
+"""
+Unit tests for the sampling designs of parallel scenarios.
+"""
+
+import math
+import pytest
+from illuminator.sampling import refine, sample_indices, sample_unit
+
+
+@pytest.mark.parametrize('method', ['random', 'latin_hypercube', 'sobol'])
+def test_reproducible(method):
+    """Designs are in the unit hypercube and the same for the same seed"""
+    points = sample_unit(method, 16, 3, seed=7)
+
+    assert points.shape == (16, 3)
+    assert ((points >= 0) & (points < 1)).all()
+    assert (sample_unit(method, 16, 3, seed=7) == points).all()
+
+
+def test_latin_hypercube_strata():
+    """With as many levels as samples, every level of every parameter is sampled once"""
+    indices = sample_indices([10, 10, 10], 'latin_hypercube', 10, seed=1)
+
+    assert len(indices) == 10
+    for dimension in range(3):
+        assert sorted(index[dimension] for index in indices) == list(range(10))
+
+
+def test_distinct_samples():
+    """Samples are distinct combinations, so there are at most as many as combinations"""
+    indices = sample_indices([2, 2], 'random', 50, seed=1)
+
+    assert len(indices) == len(set(indices)) <= 4
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        sample_unit('grid', 4, 2)
+
+
+class TestRefine:
+
+    def test_fastest_change(self):
+        """New samples are placed between the samples whose outputs differ the most"""
+        sampled = [(0,), (4,), (8,)]
+        responses = [0.0, 0.1, 5.0]
+
+        assert refine([9], sampled, responses, batch=1) == [(6,)]
+        assert refine([9], sampled, responses, batch=2) == [(6,), (2,)]
+
+    def test_failed_and_exhausted(self):
+        """Failed samples are ignored, and nothing is proposed between neighbouring levels"""
+        assert refine([9], [(0,), (2,), (8,)], [0.0, math.nan, 1.0], batch=1) == [(4,)]
+        assert refine([2], [(0,), (1,)], [0.0, 1.0], batch=2) == []
+        assert refine([9], [(0,), (8,)], [0.0, 1.0], batch=0) == []
@@ -0,0 +1,67 @@
+"""
+Unit tests for the cache of scenario results.
+"""
+
+import copy
+from illuminator.scenario_cache import ScenarioCache, scenario_hash
+
+
+def make_config(input_file):
+    return {
+        'scenario': {'name': 'sweep', 'start_time': '2012-06-01 00:00:00', 'end_time': '2012-06-01 01:00:00'},
+        'models': [{'name': 'CSV1', 'type': 'CSV', 'parameters': {'file_path': str(input_file), 'preload': True}},
+                   {'name': 'Battery1', 'type': 'Battery', 'parameters': {'max_energy': 50}}],
+        'connections': [],
+        'monitor': {'file': 'out_1.csv', 'items': ['Battery1.soc']},
+    }
+
+
+class TestScenarioHash:
+
+    def test_results_location(self, tmp_path):
+        """The name of the scenario and its monitor file do not change the hash"""
+        input_file = tmp_path / 'data.txt'
+        input_file.write_text('data')
+        config = make_config(input_file)
+        other = copy.deepcopy(config)
+        other['scenario']['name'] = 'another sweep'
+        other['monitor']['file'] = 'results/out_7.csv'
+
+        assert scenario_hash(other) == scenario_hash(config)
+        assert config['monitor']['file'] == 'out_1.csv'
+
+    def test_parameters(self, tmp_path):
+        """Different parameters give different hashes"""
+        input_file = tmp_path / 'data.txt'
+        input_file.write_text('data')
+        config = make_config(input_file)
+        other = copy.deepcopy(config)
+        other['models'][1]['parameters']['max_energy'] = 60
+
+        assert scenario_hash(other) != scenario_hash(config)
+
+    def test_input_files(self, tmp_path):
+        """The content of the input files is part of the hash"""
+        input_file = tmp_path / 'data.txt'
+        input_file.write_text('data')
+        config = make_config(input_file)
+        before = scenario_hash(config)
+
+        input_file.write_text('other data')
+
+        assert scenario_hash(config) != before
+
+
+def test_store_and_restore(tmp_path):
+    """Stored results are restored to another monitor file and listed in the manifest"""
+    cache = ScenarioCache(str(tmp_path / 'cache'))
+    results = tmp_path / 'out_1.csv'
+    results.write_text('date,Battery1.soc\n')
+
+    assert not cache.restore('abc', str(tmp_path / 'out_2.csv'))
+    cache.store('abc', {'scenario': {}}, str(results))
+
+    assert cache.restore('abc', str(tmp_path / 'out_2.csv'))
+    assert (tmp_path / 'out_2.csv').read_text() == 'date,Battery1.soc\n'
+    assert [entry['hash'] for entry in cache.manifest()] == ['abc']
+    assert cache.manifest()[0]['results'] == 'abc.csv'
@@ -0,0 +1,95 @@
+"""
+Unit tests for the static validation of scenarios.
+"""
+
+import copy
+import pytest
+from illuminator import scenario_graph
+from illuminator.engine import Simulation
+from illuminator.scenario_graph import ScenarioGraph, scenario_errors, validate_scenario
+from illuminator.schema.simulation import load_config_file
+
+
+@pytest.fixture
+def config():
+    return load_config_file('tests/data/Tutorial_1.yaml')
+
+
+def test_valid_scenario(config):
+    """The tutorial scenario is consistent"""
+
+    assert scenario_errors(config) == []
+
+
+def test_all_errors(config):
+    """Every inconsistency is reported"""
+
+    config['models'].append({'name': 'Wind2', 'type': 'Turbine'})
+    config['models'][3]['triggers'] = ['load', 'speed']  # Load1
+    config['connections'].append({'from': 'PV1.pv_power', 'to': 'Controller1.pv_gen', 'time_shifted': False})
+    config['connections'].append({'from': 'Wind3.wind_gen', 'to': 'Controller1.pv_gen', 'time_shifted': False})
+    config['monitor']['items'] += ['Battery1.charge', 'Load1[2].load_dem']
+
+    errors = scenario_errors(config)
+
+    assert len(errors) == 6
+    assert "type 'Turbine' not found" in errors[0]
+    assert "trigger 'speed'" in errors[1]
+    assert "'pv_power' is not an input, output or state of model 'PV1'" in errors[2]
+    assert "'Wind3' not found" in errors[3]
+    assert "'charge' is not an input" in errors[4]
+    assert "entity 2 does not exist" in errors[5]
+
+
+def test_defaults_and_runtime_attributes():
+    """Categories without a definition use the defaults of the model, CSV columns are not checked"""
+
+    graph = ScenarioGraph([{'name': 'A', 'type': 'Adder', 'inputs': {'x': 0}},
+                           {'name': 'Data', 'type': 'CSV'}])
+
+    assert graph.has_attribute('A', 'x')
+    assert not graph.has_attribute('A', 'in1')  # replaced by the inputs of the configuration
+    assert graph.has_attribute('A', 'out1')  # default output of the Adder
+    assert graph.has_attribute('Data', 'any_column')
+
+
+def test_entities_of_batched_models():
+    """Only batched models simulate several entities"""
+
+    graph = ScenarioGraph([{'name': 'Houses', 'type': 'LoadBatch', 'entities': 3},
+                           {'name': 'PV1', 'type': 'PV', 'entities': 1},
+                           {'name': 'Load1', 'type': 'Load', 'entities': 2}])
+
+    assert len(graph.errors) == 1
+    assert "model Load1: type 'Load' simulates a single entity" in graph.errors[0]
+
+
+def test_cache(config, monkeypatch):
+    """Scenarios with the same structure are validated once"""
+
+    calls = []
+    monkeypatch.setattr(scenario_graph, '_validated', {})
+    monkeypatch.setattr(scenario_graph, 'scenario_errors', lambda config: calls.append(config) or [])
+    other = copy.deepcopy(config)
+    other['models'][3]['parameters']['houses'] = 10
+
+    validate_scenario(config)
+    validate_scenario(other)
+    assert len(calls) == 1
+
+    other['monitor']['items'].append('Load1.consumption')
+    validate_scenario(other)
+    assert len(calls) == 2
+
+
+def test_fails_before_start(config, monkeypatch):
+    """An inconsistent scenario fails before any simulator is started"""
+
+    def start_simulators(*args):
+        raise AssertionError('simulators were started')
+
+    monkeypatch.setattr('illuminator.engine.start_simulators', start_simulators)
+    config['monitor']['items'].append('Battery1.charge')
+
+    with pytest.raises(ValueError, match="monitor item Battery1.charge"):
+        Simulation(config).run(engine='direct')
@@ -0,0 +1,64 @@
+"""
+Unit tests for the timeline of a simulation run.
+"""
+
+import asyncio
+import json
+import mosaik
+import pytest
+from illuminator.engine import Simulation
+from illuminator.tracing import TraceRecorder, trace_world
+
+
+class FakeRunner:
+    """A simulator runner of Mosaik with a coroutine step"""
+
+    async def step(self, time, inputs, max_advance):
+        return time + 1
+
+
+class FakeWorld:
+    def __init__(self, runners):
+        self.runners = runners
+
+    def compile(self):
+        return self.runners
+
+
+def test_run_trace(tmp_path):
+    """A traced run writes a step event per simulator and time step, tagged with the model and time"""
+    simulation = Simulation('tests/data/Tutorial_1.yaml')
+    simulation.set_monitor_param('file', str(tmp_path / 'out.csv'))
+    simulation.run(engine='direct', trace=str(tmp_path / 'run.json'))
+
+    events = json.loads((tmp_path / 'run.json').read_text())['traceEvents']
+    tracks = {event['args']['name'] for event in events if event['name'] == 'thread_name'}
+    steps = [event for event in events if event['ph'] == 'X' and event['name'] == 'step']
+    assert 'Battery1-0' in tracks
+    assert [event['args']['time'] for event in steps if event['args']['model'] == 'Battery1'] == list(range(95))
+    assert all(event['dur'] >= 0 for event in steps)
+    assert any(event.get('cat') == 'write' for event in events)  # the results of the in-process collector
+
+
+def test_coroutines():
+    """The coroutines of Mosaik's simulator runners are timed until they complete"""
+    runner = FakeRunner()
+    recorder = TraceRecorder('test')
+    with trace_world(FakeWorld({'PV1-0': runner}), recorder):
+        assert asyncio.run(runner.step(4, {}, 10)) == 5
+    assert 'step' not in runner.__dict__
+
+    event, = recorder.events
+    assert (event['name'], event['args']) == ('step', {'model': 'PV1', 'time': 4})
+
+
+def test_mosaik_without_compile(monkeypatch):
+    """A Mosaik world that can not compile its simulators can not be traced, instead of tracing nothing"""
+    monkeypatch.delattr(mosaik.World, 'compile', raising=False)
+    world = mosaik.World({})
+    try:
+        with pytest.raises(RuntimeError, match='Mosaik 3.6'):
+            with trace_world(world, TraceRecorder('test')):
+                pass
+    finally:
+        world.shutdown()